@@ -1,11 +1,352 @@
 import numpy as np
 import cv2
-import matplotlib.pyplot as plt
+import atexit
 import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
-# Remove hardcoded image loading from module level
+# Gradient direction bins used by non-maximum suppression, as (dy, dx) offsets
+# of the first neighbour. The second neighbour is the opposite offset.
+_NMS_OFFSETS = (
+    (0, -1),   # 0 deg: horizontal gradient, compare left/right
+    (-1, -1),  # 45 deg: compare up-left/down-right
+    (-1, 0),   # 90 deg: compare up/down
+    (1, -1),   # 135 deg: compare down-left/up-right
+)
 
-def Canny_detector(img):
+
+# Floating point types of the gradient, by precision name. float32 halves the memory
+# of every intermediate; float64 reproduces Canny_detector_loop exactly.
+PRECISIONS = {'float32': np.float32, 'float64': np.float64}
+DEFAULT_PRECISION = 'float32'
+
+# Bytes of scratch buffers kept per thread (worker processes run one job at a time).
+# The buffers of the most recent frame size are kept even when they alone are over
+# it; those of other sizes are freed beyond it, oldest first.
+SCRATCH_BYTES = 64 * 1024 * 1024
+# Pixels per block of the label lookup in hysteresis
+HYSTERESIS_BLOCK = 1 << 16
+
+
+class CannyScratch:
+    """Preallocated intermediates of one frame size and precision, reused between runs."""
+
+    def __init__(self, shape, dtype):
+        self.shape = shape
+        self.gray = np.empty(shape, dtype=np.uint8)
+        self.gx = np.empty(shape, dtype=dtype)
+        self.gy = np.empty(shape, dtype=dtype)
+        self.mag = np.empty(shape, dtype=dtype)
+        self.ang = np.empty(shape, dtype=dtype)
+        self.bins = np.empty(shape, dtype=np.uint8)
+        self.masks = [np.empty(shape, dtype=bool) for _ in range(4)]
+        self._labels = None
+
+    @property
+    def labels(self):
+        """int32 label image for hysteresis, allocated on first use."""
+        if self._labels is None:
+            self._labels = np.empty(self.shape, dtype=np.int32)
+        return self._labels
+
+    @staticmethod
+    def estimate(shape, dtype):
+        """Bytes of a set for shape and dtype, including the labels of hysteresis."""
+        return int(np.prod(shape)) * (4 * np.dtype(dtype).itemsize + 10)
+
+    @property
+    def nbytes(self):
+        arrays = [self.gray, self.gx, self.gy, self.mag, self.ang, self.bins, *self.masks]
+        if self._labels is not None:
+            arrays.append(self._labels)
+        return sum(a.nbytes for a in arrays)
+
+
+_scratch = threading.local()
+
+
+def get_scratch(shape, precision=DEFAULT_PRECISION):
+    """The calling thread's CannyScratch for shape and precision, allocated on first use.
+
+    The most recently used set is always kept, so repeated runs on frames (or
+    tiles) of the same size allocate no intermediates, however large the frame.
+    Older sets are kept up to SCRATCH_BYTES in total next to it.
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision: {precision}")
+    sets = getattr(_scratch, 'sets', None)
+    if sets is None:
+        sets = _scratch.sets = OrderedDict()
+    key = (tuple(shape), precision)
+    scratch = sets.get(key)
+    if scratch is not None:
+        sets.move_to_end(key)
+        return scratch
+
+    dtype = PRECISIONS[precision]
+    size = CannyScratch.estimate(key[0], dtype)
+    kept = sum(CannyScratch.estimate(s.shape, s.mag.dtype) for s in sets.values())
+    while sets and kept + size > SCRATCH_BYTES:
+        _, dropped = sets.popitem(last=False)
+        kept -= CannyScratch.estimate(dropped.shape, dropped.mag.dtype)
+    scratch = sets[key] = CannyScratch(key[0], dtype)
+    return scratch
+
+
+def quantize_angle(ang, out=None, scratch=None):
+    """Map gradient angles in degrees (0..360) to the four NMS direction bins.
+
+    With out (uint8) and scratch (a float array and two bool masks of ang's shape),
+    no temporaries are allocated.
+    """
+    if scratch is None:
+        scratch = (np.empty(ang.shape, dtype=ang.dtype), np.empty(ang.shape, dtype=bool),
+                   np.empty(ang.shape, dtype=bool))
+    folded, m1, m2 = scratch
+    np.abs(ang, out=folded)
+    np.greater(folded, 180, out=m1)
+    np.subtract(folded, 180, out=folded, where=m1)
+    np.abs(folded, out=folded)
+    bins = np.zeros(ang.shape, dtype=np.uint8) if out is None else out
+    bins.fill(0)
+    for b, (low, high) in enumerate(((22.5, 67.5), (67.5, 112.5), (112.5, 157.5)), start=1):
+        np.greater(folded, low, out=m1)
+        np.less_equal(folded, high, out=m2)
+        m1 &= m2
+        np.putmask(bins, m1, b)
+    return bins
+
+
+def _smaller_than_neighbour(mag, dy, dx, out):
+    """out[y, x] = mag[y, x] < mag[y + dy, x + dx]; False where the neighbour is outside the frame."""
+    h, w = mag.shape
+    ys, ye = max(0, -dy), min(h, h - dy)
+    xs, xe = max(0, -dx), min(w, w - dx)
+    out.fill(False)
+    np.less(mag[ys:ye, xs:xe], mag[ys + dy:ye + dy, xs + dx:xe + dx], out=out[ys:ye, xs:xe])
+    return out
+
+
+def non_max_suppression(mag, ang, scratch=None):
+    """Zero every pixel that is smaller than one of its two neighbours along the gradient.
+
+    Whole-array version of the loop in Canny_detector_loop. The loop suppresses
+    in place, so later pixels compare against already-zeroed neighbours; here every
+    pixel is compared against the original magnitudes, which is standard NMS and
+    keeps a (slightly thinner) subset of the loop's edge pixels.
+
+    With a CannyScratch of mag's shape, mag is suppressed in place and the
+    buffers of scratch hold every intermediate (this overwrites scratch.gx).
+    """
+    if scratch is None:
+        scratch = CannyScratch(mag.shape, mag.dtype)
+        mag = mag.copy()
+    sel, suppressed, other, drop = scratch.masks
+    bins = quantize_angle(ang, out=scratch.bins, scratch=(scratch.gx, suppressed, other))
+    drop.fill(False)
+    # mag >= 0, so neighbours outside the frame never suppress anything
+    for b, (dy, dx) in enumerate(_NMS_OFFSETS):
+        np.equal(bins, b, out=sel)
+        _smaller_than_neighbour(mag, dy, dx, suppressed)
+        suppressed |= _smaller_than_neighbour(mag, -dy, -dx, other)
+        suppressed &= sel
+        drop |= suppressed
+    np.putmask(mag, drop, 0)
+    return mag
+
+
+def hysteresis(mag, weak_th, strong_th, scratch=None):
+    """Keep weak edge pixels only when they are 8-connected to a strong one.
+
+    With a CannyScratch of mag's shape, mag is changed in place using its buffers.
+    """
+    if scratch is None:
+        candidates = (mag >= weak_th).astype(np.uint8)
+        n_labels, labels = cv2.connectedComponents(candidates, connectivity=8)
+        strong_labels = np.zeros(n_labels, dtype=bool)
+        strong_labels[np.unique(labels[mag >= strong_th])] = True
+        strong_labels[0] = False
+        return np.where(strong_labels[labels], mag, 0)
+
+    candidates, strong = scratch.masks[:2]
+    np.greater_equal(mag, weak_th, out=candidates)
+    n_labels, labels = cv2.connectedComponents(candidates.view(np.uint8), labels=scratch.labels, connectivity=8,
+                                               ltype=cv2.CV_32S)
+    np.greater_equal(mag, strong_th, out=strong)
+    strong_labels = np.zeros(n_labels, dtype=bool)
+    strong_labels[labels[strong]] = True
+    strong_labels[0] = False
+    # take() converts the indices to intp: go in row blocks to keep that copy small
+    rows = max(1, HYSTERESIS_BLOCK // mag.shape[1])
+    for y in range(0, mag.shape[0], rows):
+        np.take(strong_labels, labels[y:y + rows], out=candidates[y:y + rows], mode='clip')
+    np.logical_not(candidates, out=candidates)
+    np.putmask(mag, candidates, 0)
+    return mag
+
+
+def Canny_detector(img, weak_th=None, strong_th=None, use_hysteresis=False, on_progress=None,
+                   precision=DEFAULT_PRECISION):
+    """Vectorized Canny edge detector, returns the thresholded gradient magnitude.
+
+    Thresholds default to 10% / 50% of the maximum gradient magnitude. Pixels below
+    the weak threshold are zeroed; with use_hysteresis=True, weak pixels that are not
+    connected to a strong pixel are dropped as well. on_progress(fraction) is
+    called after each step.
+
+    The gradient is computed in precision ('float32' or 'float64', see PRECISIONS)
+    in scratch buffers (get_scratch); for frames whose buffers are kept between runs
+    only the returned array is new.
+    """
+    on_progress = on_progress or _no_progress
+    scratch = get_scratch(img.shape[:2], precision)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY, dst=scratch.gray)
+    mag, ang = _gradient(gray, scratch)
+    on_progress(0.25)
+
+    mag_max = np.max(mag)
+    if weak_th is None:
+        weak_th = mag_max * 0.1
+    if strong_th is None:
+        strong_th = mag_max * 0.5
+
+    mag = non_max_suppression(mag, ang, scratch)
+    on_progress(0.85)
+    if use_hysteresis:
+        hysteresis(mag, weak_th, strong_th, scratch)
+    else:
+        weak = np.less(mag, weak_th, out=scratch.masks[0])
+        np.putmask(mag, weak, 0)
+    on_progress(1.0)
+    return mag.copy()
+
+
+def _no_progress(fraction):
+    pass
+
+
+def _gradient(gray, scratch):
+    """Sobel gradient magnitude and angle (degrees) of a grayscale image, in scratch.mag and scratch.ang."""
+    ddepth = cv2.CV_32F if scratch.mag.dtype == np.float32 else cv2.CV_64F
+    cv2.Sobel(gray, ddepth, 1, 0, dst=scratch.gx, ksize=3)
+    cv2.Sobel(gray, ddepth, 0, 1, dst=scratch.gy, ksize=3)
+    cv2.cartToPolar(scratch.gx, scratch.gy, magnitude=scratch.mag, angle=scratch.ang, angleInDegrees=True)
+    return scratch.mag, scratch.ang
+
+
+# Tiled mode. Each tile is processed with a halo of extra pixels around its core:
+# one for the 3x3 Sobel and one for the NMS neighbour comparison, which makes the
+# stitched result identical to running Canny_detector on the whole frame.
+TILE_SIZE = 1024
+TILE_HALO = 2
+
+_tile_pool = None
+_tile_pool_workers = None
+_tile_pool_lock = threading.Lock()
+
+
+def _tile_grid(height, width, tile_size):
+    """Yield (core, padded) slice pairs covering the frame in tile_size blocks."""
+    for y0 in range(0, height, tile_size):
+        for x0 in range(0, width, tile_size):
+            y1, x1 = min(y0 + tile_size, height), min(x0 + tile_size, width)
+            py0, px0 = max(0, y0 - TILE_HALO), max(0, x0 - TILE_HALO)
+            py1, px1 = min(height, y1 + TILE_HALO), min(width, x1 + TILE_HALO)
+            core = (slice(y0, y1), slice(x0, x1))
+            padded = (slice(py0, py1), slice(px0, px1))
+            # position of the core inside the padded tile
+            inner = (slice(y0 - py0, y1 - py0), slice(x0 - px0, x1 - px0))
+            yield core, padded, inner
+
+
+def _tile_max(tile, inner, precision=DEFAULT_PRECISION):
+    """Maximum gradient magnitude over the core of one tile."""
+    mag, _ = _gradient(tile, get_scratch(tile.shape, precision))
+    return float(np.max(mag[inner]))
+
+
+def _tile_classes(tile, inner, weak_th, strong_th, precision=DEFAULT_PRECISION):
+    """NMS + double threshold for one tile: 0 = none, 1 = weak, 2 = strong."""
+    scratch = get_scratch(tile.shape, precision)
+    mag, ang = _gradient(tile, scratch)
+    mag = non_max_suppression(mag, ang, scratch)[inner]
+    classes = (mag >= weak_th).astype(np.uint8)
+    classes[mag >= strong_th] = 2
+    return classes
+
+
+def _get_tile_pool(workers):
+    """Lazily create (or resize) the thread pool shared by tiled runs.
+
+    Threads, not processes: OpenCV and NumPy release the GIL for the per-tile work,
+    and tiled runs already happen inside the job queue's worker processes.
+    """
+    global _tile_pool, _tile_pool_workers
+    with _tile_pool_lock:
+        if _tile_pool is None or _tile_pool_workers != workers:
+            if _tile_pool is not None:
+                _tile_pool.shutdown(wait=False)
+            _tile_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='canny-tile')
+            _tile_pool_workers = workers
+        return _tile_pool
+
+
+@atexit.register
+def _shutdown_tile_pool():
+    if _tile_pool is not None:
+        _tile_pool.shutdown(wait=True, cancel_futures=True)
+
+
+def Canny_detector_tiled(img, tile_size=TILE_SIZE, workers=None, use_hysteresis=False, on_progress=None,
+                         precision=DEFAULT_PRECISION):
+    """Tiled, multi-threaded version of Canny_detector returning a uint8 mask (255 = edge).
+
+    The frame is split into tile_size blocks that are processed on a thread pool,
+    so the float intermediates (in precision, reused between tiles of one size)
+    never exceed one padded tile per thread. Runs in two passes: the first finds
+    the global maximum magnitude for the automatic thresholds, the second does NMS
+    and thresholding. Hysteresis, when enabled, runs
+    on the stitched weak/strong map so edges connect across tile borders.
+    on_progress(fraction) is called as tiles complete.
+    """
+    on_progress = on_progress or _no_progress
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    height, width = gray.shape
+    grid = list(_tile_grid(height, width, tile_size))
+    workers = workers or os.cpu_count() or 1
+
+    if len(grid) == 1 or workers == 1:
+        run = map
+    else:
+        run = _get_tile_pool(min(workers, len(grid))).map
+
+    tiles = [gray[padded] for _, padded, _ in grid]
+    inners = [inner for _, _, inner in grid]
+
+    n = len(grid)
+    # the first pass is about a third of the work of the second one
+    mag_max = 0.0
+    for i, tile_max in enumerate(run(_tile_max, tiles, inners, [precision] * n)):
+        mag_max = max(mag_max, tile_max)
+        on_progress(0.25 * (i + 1) / n)
+    weak_th, strong_th = mag_max * 0.1, mag_max * 0.5
+
+    classes = np.zeros((height, width), dtype=np.uint8)
+    results = run(_tile_classes, tiles, inners, [weak_th] * n, [strong_th] * n, [precision] * n)
+    for i, ((core, _, _), tile_classes) in enumerate(zip(grid, results)):
+        classes[core] = tile_classes
+        on_progress(0.25 + 0.7 * (i + 1) / n)
+
+    if use_hysteresis:
+        classes = hysteresis(classes, 1, 2)
+    classes[classes > 0] = 255
+    on_progress(1.0)
+    return classes
+
+
+def Canny_detector_loop(img):
+    """Original per-pixel implementation, kept as the reference for parity tests."""
     img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
 
     gx = cv2.Sobel(np.float32(img), cv2.CV_64F, 1, 0, 3)
@@ -52,33 +393,8 @@ def Canny_detector(img):
                 if mag[i_y, i_x] < mag[neighb_2_y, neighb_2_x]:
                     mag[i_y, i_x] = 0
 
-    ids = np.zeros_like(img)
     for i_x in range(width):
         for i_y in range(height):
-            grad_mag = mag[i_y, i_x]
-            if grad_mag < weak_th:
+            if mag[i_y, i_x] < weak_th:
                 mag[i_y, i_x] = 0
-            elif strong_th > grad_mag >= weak_th:
-                ids[i_y, i_x] = 1
-            else:
-                ids[i_y, i_x] = 2
     return mag
-"""
-frame = cv2.imread('C:\\Users\\emory\\Pictures\\Smarte systemer\\cat.jpg')
-if frame is None:
-    print("Could not read the image.")
-
-canny_img = Canny_detector(frame)
-
-plt.subplot(1, 2, 1)
-plt.title('Original Image')
-plt.imshow(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-plt.axis('off')
-plt.subplot(1, 2, 2)
-plt.title('Canny Edges')
-plt.imshow(canny_img, cmap='gray')
-plt.axis('off')
-plt.tight_layout()
-plt.show(block=True)
-plt.show()
-"""
\ No newline at end of file
@@ -1,11 +1,10 @@
 import cv2
 import numpy as np
-from CannyEdge import Canny_detector
+from edge_backends import DEFAULT_BACKEND, detect_edges
 
-def get_contours(img):
+def get_contours(img, backend=DEFAULT_BACKEND):
 
-    edges = Canny_detector(img)
-    edges = edges.astype(np.uint8)
+    edges = detect_edges(img, backend)
 
     contours, _ = cv2.findContours(
         edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE
@@ -1,4 +1,5 @@
 import serial
+from collections import deque
 from time import sleep
 import glob
 import argparse
@@ -7,17 +8,18 @@ import time
 from serial.serialutil import SerialException
 from serial.tools import list_ports as serial_list_ports
 
+from gcode_wire import DEFAULT_PRECISION, MAX_FRAME, WIRE_MODES, checksum, encode_units
+
 BAUD_RATE = 115200
 
+# Receive buffer budget of the device for streaming (AVR serial buffer size)
+RX_BUFFER_SIZE = 64
+# Seconds to wait for the ack of the oldest line in flight while streaming
+ACK_TIMEOUT = 10
+
 ORANGE = '\033[38;5;208m'
 RESET = '\033[0m'
 
-def checksum(string: str | bytes):
-    csum = 0
-    for c in string:
-        csum ^= c
-    return csum
-
 def find_gcode_file():
     gcode_files = glob.glob("*.gcode")
 
@@ -33,17 +35,23 @@ def detect_serial_port():
     return ports[0] if ports else None
 
 class ArduinoInterface:
-    def __init__(self, port: str = '/dev/ttyACM0', baudrate: int = BAUD_RATE, timeout: float = 2):
+    def __init__(self, port: str = '/dev/ttyACM0', baudrate: int = BAUD_RATE, timeout: float = 2,
+                 reset_delay: float = 2):
         self.timeout = timeout
+        # wire mode of the link, see negotiate_wire
+        self.wire = 'ascii'
+        self._seq = 0
+        self._ready_pending = False
         self.ser = serial.Serial(port, baudrate, dsrdtr=False, rtscts=False, timeout=timeout)
 
-        sleep(2)
+        # the board resets when the port is opened
+        sleep(reset_delay)
 
         # Read until we get any non-empty response or timeout
-        deadline = time.time() + timeout
+        deadline = time.monotonic() + timeout
         received = None
-        while time.time() < deadline:
-            line = self.ser.readline()
+        while time.monotonic() < deadline:
+            line = self._readline(deadline)
             if not line:
                 continue
             try:
@@ -63,10 +71,24 @@ class ArduinoInterface:
         if not is_connected:
             raise SerialException("Arduino not connected")
 
+    def _readline(self, deadline: float) -> bytes:
+        """readline() that gives up at deadline (time.monotonic()) instead of after a full timeout."""
+        remaining = deadline - time.monotonic()
+        if remaining >= self.timeout:
+            return self.ser.readline()
+        self.ser.timeout = max(remaining, 0)
+        try:
+            return self.ser.readline()
+        finally:
+            self.ser.timeout = self.timeout
+
     def wait_for_ready(self, timeout: float = 1) -> bool:
-        deadline = time.time() + timeout
-        while time.time() < deadline:
-            line = self.ser.readline()
+        if self._ready_pending:
+            self._ready_pending = False
+            return True
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            line = self._readline(deadline)
             if not line:
                 continue
             try:
@@ -81,6 +103,8 @@ class ArduinoInterface:
         return False
 
     def send_gcode(self, gcode: str) -> bool:
+        if self.wire == 'binary':
+            raise ValueError("send_gcode sends text lines; use stream_gcode on a binary link")
         # Ensure device signals ready/ok before sending each line
         if not self.wait_for_ready(timeout=120):
             print("Arduino not ready to receive G-code.")
@@ -103,9 +127,9 @@ class ArduinoInterface:
 
         # Wait for responses until we get an OK with checksum OR timeout.
         rec_checksum = -1
-        deadline = time.time() + 10  # adjust timeout as needed
-        while time.time() < deadline:
-            line = self.ser.readline()
+        deadline = time.monotonic() + 10  # adjust timeout as needed
+        while time.monotonic() < deadline:
+            line = self._readline(deadline)
             if not line:
                 # no data yet, keep waiting until deadline
                 continue
@@ -141,13 +165,197 @@ class ArduinoInterface:
         else:
             print("Checksum OK")
         return rec_checksum == local_checksum
-            
+
+    def negotiate_wire(self, preferred=('binary', 'compact')) -> str:
+        """Switch the link to the first wire mode in preferred that the device confirms.
+
+        The device answers 'WIRE <mode>' (after the ack) when it supports the mode;
+        firmware that does not know the command only acks it. Returns the mode
+        now in use, 'ascii' when none was confirmed.
+        """
+        for mode in preferred:
+            if mode == 'ascii':
+                break
+            if not self.send_gcode(f"WIRE {mode}"):
+                continue
+            deadline = time.monotonic() + self.timeout
+            while time.monotonic() < deadline:
+                line = self._readline(deadline)
+                s = line.decode('utf-8', errors='ignore').strip().lower()
+                if s == f"wire {mode}":
+                    self.wire = mode
+                    self._seq = 0
+                    return mode
+                if 'ready' in s:
+                    # the device is waiting for the next line already
+                    self._ready_pending = True
+                    break
+        self.wire = 'ascii'
+        return self.wire
+
+    def stream_gcode(self, lines, rx_buffer: int = RX_BUFFER_SIZE, max_retries: int = 3,
+                     ack_timeout: float = ACK_TIMEOUT, on_progress=None,
+                     precision: int = DEFAULT_PRECISION, running=None, abort=None) -> dict:
+        """Stream G-code lines with several lines in flight (character-counting flow control).
+
+        Lines are encoded for the negotiated wire mode (see gcode_wire) and written
+        as long as the bytes of all unacknowledged units fit in the device's
+        rx_buffer; every 'OK <checksum>' ack frees the oldest unit in flight. On
+        compact and binary links, whose units carry sequence numbers, the device
+        drops the units after a damaged one; a unit whose ack carries a wrong
+        checksum is resent (up to max_retries times) together with every unit in
+        flight behind it. An ascii device has already run the lines after a
+        damaged one, so resending would draw them twice: the stream stops
+        instead, once the lines in flight are acknowledged, with a 'Checksum
+        mismatch' error. on_progress(acked_lines, total_lines) is called after every ack;
+        total_lines is None when lines has no len().
+
+        lines may be a generator: it is encoded and read as the device buffer
+        frees up, never ahead. running and abort are optional threading.Events.
+        No new units are written while running is cleared (pause); once abort is
+        set, the units in flight are acknowledged and streaming stops.
+
+        Returns throughput stats, including the write-to-ack latency of every ack in
+        'latencies'; 'ok' is False when a unit kept failing, an ack did not
+        arrive within ack_timeout or the stream was aborted.
+        """
+        total = len(lines) if hasattr(lines, '__len__') else None
+        # binary frames take at most half the buffer so two can be in flight
+        source = encode_units(lines, self.wire, precision,
+                              max_frame=min(MAX_FRAME, rx_buffer // 2), seq=self._seq)
+        first_seq = self._seq
+        drawn = 0
+        # (index, bytes, checksum, line count, attempt) of units to send next, in order
+        pending = deque()
+        # acks still due for units the device dropped after a damaged one
+        stale = 0
+
+        in_flight = deque()
+        sent_at = deque()
+        latencies = []
+        buffered = 0
+        acked = 0
+        units = 0
+        sent_bytes = 0
+        resends = 0
+        failed = None
+        # why streaming stops once the units in flight are acknowledged (abort, damaged ascii line)
+        stopping = None
+        start = time.monotonic()
+        last_ack = start
+
+        while failed is None:
+            if stopping is None and abort is not None and abort.is_set():
+                stopping = "Aborted"
+            if stopping is not None:
+                if not in_flight:
+                    failed = stopping
+                    break
+            elif running is None or running.is_set():
+                # fill the device buffer
+                written = b''
+                while True:
+                    if not pending and source is not None:
+                        data, csum, count = next(source, (None, None, 0))
+                        if data is None:
+                            source = None
+                            break
+                        if len(data) > rx_buffer:
+                            raise ValueError(f"G-code line longer than the receive buffer ({rx_buffer} bytes): {data!r}")
+                        pending.append((drawn, data, csum, count, 0))
+                        drawn += 1
+                    if not pending or buffered + len(pending[0][1]) > rx_buffer:
+                        break
+                    entry = pending.popleft()
+                    written += entry[1]
+                    buffered += len(entry[1])
+                    in_flight.append(entry)
+                if written:
+                    self.ser.write(written)
+                    sent_bytes += len(written)
+                    now = time.monotonic()
+                    if len(sent_at) == 0:
+                        # the ack timeout runs from here after a pause or an idle source
+                        last_ack = now
+                    sent_at.extend([now] * (len(in_flight) - len(sent_at)))
+            if not in_flight:
+                if not pending and source is None:
+                    break
+                # paused: nothing to read until writing goes on
+                running.wait(0.1)
+                continue
+
+            line = self.ser.readline()
+            decoded = line.decode('utf-8', errors='ignore').strip()
+            parts = decoded.split()
+            if len(parts) < 2 or not parts[0].upper().startswith("OK"):
+                # readiness pings and timeouts
+                if time.monotonic() - last_ack > ack_timeout:
+                    failed = f"No ack within {ack_timeout}s"
+                continue
+            try:
+                rec_checksum = int(parts[-1])
+            except ValueError:
+                rec_checksum = -1
+
+            index, data, local_checksum, count, attempt = in_flight.popleft()
+            buffered -= len(data)
+            last_ack = time.monotonic()
+            latencies.append(last_ack - sent_at.popleft())
+            if stale:
+                stale -= 1
+            elif rec_checksum == local_checksum:
+                acked += count
+                units += 1
+                if on_progress:
+                    on_progress(acked, total)
+            elif self.wire == 'ascii':
+                # the device ran the lines behind it already, a resend would run them again
+                if stopping is None:
+                    stopping = f"Checksum mismatch on unit {index + 1}, not resent on an ascii link"
+            elif attempt < max_retries:
+                resends += 1
+                # go back to the damaged unit and resend everything after it as well; the
+                # acks of the units in flight carry nothing (dropped, or run out of order)
+                pending.extendleft(reversed(in_flight))
+                stale = len(in_flight)
+                # resend ahead of everything not yet written
+                pending.appendleft((index, data, local_checksum, count, attempt + 1))
+            else:
+                failed = f"Checksum mismatch on unit {index + 1} after {attempt + 1} attempts"
+
+        # the device expects the sequence number of the first unit it has not taken yet
+        self._seq = (first_seq + (pending[0][0] if pending else drawn)) % 256
+        self.ser.flush()
+        elapsed = time.monotonic() - start
+        return {
+            'ok': failed is None,
+            'error': failed,
+            'wire': self.wire,
+            'lines': acked,
+            'units': units,
+            'total': total if total is not None else acked,
+            'bytes': sent_bytes,
+            'resends': resends,
+            'elapsed': elapsed,
+            'lines_per_sec': acked / elapsed if elapsed > 0 else 0.0,
+            'bytes_per_sec': sent_bytes / elapsed if elapsed > 0 else 0.0,
+            'latencies': latencies,
+        }
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Send G-code files to Arduino over serial")
     parser.add_argument("--port", type=str, default=None,
                         help="Serial port to connect to (e.g., /dev/ttyACM0 or COM3)")
     parser.add_argument("--gcode_file", type=str, default=find_gcode_file()[0],
                         help="Path to the G-code file to send")
+    parser.add_argument("--rx-buffer", type=int, default=RX_BUFFER_SIZE,
+                        help="Receive buffer size of the device in bytes, for streaming")
+    parser.add_argument("--no-stream", action="store_true",
+                        help="Send one line at a time, waiting for 'ready' before each line")
+    parser.add_argument("--wire", choices=['auto', *WIRE_MODES], default='ascii',
+                        help="Wire encoding for streaming; 'auto' picks the best one the device supports")
     args = parser.parse_args()
 
     # Auto-detect port if not provided
@@ -171,13 +379,23 @@ if __name__ == "__main__":
                 lines.append(s)
 
         all_ok = True
-        for line in lines:
-            ok = arduino.send_gcode(line)
-            if not ok:
-                print("Failed to send G-code line:", line)
+        if args.no_stream:
+            for line in lines:
+                ok = arduino.send_gcode(line)
+                if not ok:
+                    print("Failed to send G-code line:", line)
+                    all_ok = False
+                    break
+        else:
+            if args.wire != 'ascii':
+                preferred = ('binary', 'compact') if args.wire == 'auto' else (args.wire,)
+                print(f"Wire mode: {arduino.negotiate_wire(preferred)}")
+            stats = arduino.stream_gcode(lines, rx_buffer=args.rx_buffer)
+            print(f"Sent {stats['lines']}/{stats['total']} lines in {stats['elapsed']:.1f}s "
+                  f"({stats['lines_per_sec']:.1f} lines/s, {stats['resends']} resent)")
+            if not stats['ok']:
+                print("Streaming failed:", stats['error'])
                 all_ok = False
-                break
-            sleep(0.1)  # Small delay between commands to avoid overwhelming the Arduino
 
         if all_ok:
             print("G-code file sent successfully.")
@@ -0,0 +1,154 @@
+import asyncio
+import threading
+from typing import NamedTuple
+
+import serial
+from serial.serialutil import SerialException
+
+from arduino_interface import BAUD_RATE, checksum
+
+# Seconds send() waits for the device to announce 'ready', and then for the ack
+READY_TIMEOUT = 120
+ACK_TIMEOUT = 10
+
+
+class DeviceMessage(NamedTuple):
+    """One line from the device: kind is 'ready', 'ok' (checksum set when the ack carries one) or 'other'."""
+    kind: str
+    text: str
+    checksum: int | None = None
+
+
+def parse_message(text: str) -> DeviceMessage:
+    parts = text.split()
+    if parts and parts[0].upper().startswith("OK"):
+        try:
+            return DeviceMessage('ok', text, int(parts[-1]))
+        except ValueError:
+            return DeviceMessage('ok', text)
+    if 'ready' in text.lower():
+        return DeviceMessage('ready', text)
+    return DeviceMessage('other', text)
+
+
+class AsyncArduinoInterface:
+    """asyncio counterpart of ArduinoInterface with the same ready / OK <checksum> protocol.
+
+    A reader task turns incoming bytes into DeviceMessages on `messages`; send()
+    and wait_ready() await them with monotonic deadlines instead of polling
+    readline(). The port is watched with loop.add_reader where the event loop
+    supports it, otherwise a background thread feeds the reader.
+
+    Create with `await AsyncArduinoInterface.open(port)`.
+    """
+
+    def __init__(self, ser: serial.Serial):
+        self.ser = ser
+        self.messages = asyncio.Queue()
+        self._loop = asyncio.get_running_loop()
+        self._chunks = asyncio.Queue()
+        self._lock = asyncio.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        try:
+            self._loop.add_reader(ser.fileno(), self._on_readable)
+            self._uses_add_reader = True
+        except (NotImplementedError, AttributeError, OSError):
+            self._uses_add_reader = False
+            self._thread = threading.Thread(target=self._read_thread, daemon=True)
+            self._thread.start()
+        self._reader = asyncio.create_task(self._read_messages())
+
+    @classmethod
+    async def open(cls, port: str = '/dev/ttyACM0', baudrate: int = BAUD_RATE, timeout: float = 2,
+                   reset_delay: float = 2):
+        """Open the port and wait up to timeout for the device's first message."""
+        ser = serial.Serial(port, baudrate, dsrdtr=False, rtscts=False, timeout=0)
+        # the board resets when the port is opened
+        await asyncio.sleep(reset_delay)
+        self = cls(ser)
+        try:
+            await asyncio.wait_for(self.messages.get(), timeout)
+        except asyncio.TimeoutError:
+            await self.close()
+            raise SerialException("Arduino not connected")
+        return self
+
+    def _on_readable(self):
+        try:
+            data = self.ser.read(self.ser.in_waiting or 1)
+        except (SerialException, OSError):
+            data = b''
+        if data:
+            self._chunks.put_nowait(data)
+
+    def _read_thread(self):
+        self.ser.timeout = 0.1
+        while not self._stop.is_set():
+            try:
+                data = self.ser.read(self.ser.in_waiting or 1)
+            except (SerialException, OSError):
+                return
+            if data:
+                self._loop.call_soon_threadsafe(self._chunks.put_nowait, data)
+
+    async def _read_messages(self):
+        buffer = b''
+        while True:
+            buffer += await self._chunks.get()
+            *lines, buffer = buffer.split(b'\n')
+            for line in lines:
+                text = line.decode('utf-8', errors='ignore').strip()
+                if text:
+                    self.messages.put_nowait(parse_message(text))
+
+    async def _next_message(self, deadline: float) -> DeviceMessage | None:
+        remaining = deadline - self._loop.time()
+        if remaining <= 0:
+            return None
+        try:
+            return await asyncio.wait_for(self.messages.get(), remaining)
+        except asyncio.TimeoutError:
+            return None
+
+    async def wait_ready(self, timeout: float = 1) -> bool:
+        """Wait for a 'ready' (or bare 'ok') from the device."""
+        deadline = self._loop.time() + timeout
+        while (message := await self._next_message(deadline)) is not None:
+            if message.kind == 'ready' or (message.kind == 'ok' and message.checksum is None):
+                return True
+        return False
+
+    async def send(self, gcode: str, ready_timeout: float = READY_TIMEOUT,
+                   ack_timeout: float = ACK_TIMEOUT) -> bool:
+        """Send one G-code line once the device is ready; True when its ack checksum matches."""
+        async with self._lock:
+            if not await self.wait_ready(ready_timeout):
+                return False
+            data = gcode.strip().encode('utf-8')
+            self.ser.write(data + b'\n')
+
+            deadline = self._loop.time() + ack_timeout
+            while (message := await self._next_message(deadline)) is not None:
+                if message.kind == 'ok' and message.checksum is not None:
+                    return message.checksum == checksum(data)
+            return False
+
+    async def close(self):
+        if self._uses_add_reader:
+            self._loop.remove_reader(self.ser.fileno())
+        self._stop.set()
+        self._reader.cancel()
+        try:
+            await self._reader
+        except asyncio.CancelledError:
+            pass
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join)
+        self.ser.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
@@ -0,0 +1,53 @@
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path to import the gCode module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from gCode import read_coord_groups, read_coords
+
+
+def write_synthetic_csv(path, rows, polygons, seed=0):
+    """Write an ID,X,Y CSV like polygon_coordinates.csv with rows points spread over polygons"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "ID": np.sort(rng.integers(0, polygons, rows)),
+        "X": rng.integers(0, 4000, rows),
+        "Y": rng.integers(0, 3000, rows),
+    })
+    df.to_csv(path, index=False)
+
+
+def timed(label, fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {elapsed:8.3f} s")
+    return result, elapsed
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Benchmark CSV coordinate ingestion (gCode.read_coords)")
+    p.add_argument("--rows", type=int, default=10_000_000)
+    p.add_argument("--polygons", type=int, default=50_000)
+    p.add_argument("--csv", default=None, help="Use an existing CSV instead of generating one")
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(args.csv) if args.csv else Path(tmp) / "synthetic.csv"
+        if not args.csv:
+            print(f"Generating {args.rows:,} rows in {args.polygons:,} polygons...")
+            timed("write csv", write_synthetic_csv, csv_path, args.rows, args.polygons)
+
+        df, _ = timed("pd.read_csv", pd.read_csv, csv_path)
+        _, group_time = timed("read_coord_groups", read_coord_groups, df, None, None, "ID")
+        (paths, _), _ = timed("read_coords", read_coords, df, None, None, "ID")
+
+    print(f"{len(df):,} rows -> {len(paths):,} polygons")
+    print(f"grouping throughput: {len(df) / group_time / 1e6:.1f} M rows/s")
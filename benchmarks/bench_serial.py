@@ -0,0 +1,86 @@
+import argparse
+import contextlib
+import io
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path to import the arduino-interface module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from arduino_interface import BAUD_RATE, RX_BUFFER_SIZE, ArduinoInterface
+from fake_arduino import FakeArduino
+from gcode_wire import WIRE_MODES
+
+
+def read_gcode_lines(path):
+    with open(path) as f:
+        return [s for s in (raw.strip() for raw in f) if s and not s.startswith(';')]
+
+
+def run_stream(con, lines, rx_buffer):
+    stats = con.stream_gcode(lines, rx_buffer=rx_buffer)
+    return stats['lines'], stats['bytes'], stats['elapsed'], stats['latencies']
+
+
+def run_legacy(con, lines, rx_buffer):
+    """One send_gcode call per line; its latency includes waiting for 'ready'."""
+    latencies = []
+    sent_bytes = 0
+    start = time.monotonic()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for line in lines:
+            t = time.monotonic()
+            if not con.send_gcode(line):
+                break
+            latencies.append(time.monotonic() - t)
+            sent_bytes += len(line) + 1
+    return len(latencies), sent_bytes, time.monotonic() - start, latencies
+
+
+MODES = {'stream': run_stream, 'legacy': run_legacy}
+
+
+def report(label, lines, sent_bytes, elapsed, latencies):
+    ms = np.percentile(np.asarray(latencies) * 1000, [50, 90, 99, 100]) if latencies else [np.nan] * 4
+    print(f"{label:<14} {lines:7d} lines {elapsed:7.2f} s {lines / elapsed:9.1f} lines/s "
+          f"{sent_bytes / elapsed:10.0f} B/s  latency ms p50 {ms[0]:.2f} p90 {ms[1]:.2f} "
+          f"p99 {ms[2]:.2f} max {ms[3]:.2f}")
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Benchmark G-code transfer to the plotter (serial throughput)")
+    p.add_argument("gcode_file", nargs="?", default="output.gcode")
+    p.add_argument("--mode", choices=[*MODES, 'both'], default='both')
+    p.add_argument("--wire", choices=WIRE_MODES, default='ascii', help="Wire encoding for stream mode")
+    p.add_argument("--lines", type=int, default=None, help="Only send the first N lines")
+    p.add_argument("--port", default=None, help="Benchmark a real device instead of the simulator")
+    p.add_argument("--rx-buffer", type=int, default=RX_BUFFER_SIZE)
+    p.add_argument("--baudrate", type=int, default=BAUD_RATE, help="Simulated link speed (0: unthrottled)")
+    p.add_argument("--line-delay", type=float, default=0.0, help="Simulated firmware time per line (s)")
+    p.add_argument("--latency", type=float, default=0.001, help="Simulated answer latency (s)")
+    p.add_argument("--error-rate", type=float, default=0.0, help="Simulated rate of damaged units")
+    args = p.parse_args()
+
+    lines = read_gcode_lines(args.gcode_file)[:args.lines]
+    print(f"{args.gcode_file}: {len(lines):,} lines, {sum(len(s) + 1 for s in lines):,} bytes")
+
+    for mode in MODES if args.mode == 'both' else [args.mode]:
+        with contextlib.ExitStack() as stack:
+            port = args.port
+            if port is None:
+                device = stack.enter_context(FakeArduino(
+                    rx_buffer=args.rx_buffer, line_delay=args.line_delay, baudrate=args.baudrate or None,
+                    latency=args.latency, error_rate=args.error_rate, seed=0))
+                port = device.port
+            with contextlib.redirect_stdout(io.StringIO()):
+                con = ArduinoInterface(port=port, reset_delay=0 if args.port is None else 2)
+                if mode == 'stream' and args.wire != 'ascii' and con.negotiate_wire((args.wire,)) != args.wire:
+                    raise SystemExit(f"Device does not support the {args.wire} wire mode")
+            try:
+                label = f"{mode}/{args.wire}" if mode == 'stream' else mode
+                report(label, *MODES[mode](con, lines, args.rx_buffer))
+            finally:
+                con.ser.close()
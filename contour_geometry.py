@@ -0,0 +1,179 @@
+from io import BytesIO
+
+import cv2
+import numpy as np
+
+from simplify import densify, simplify_contours
+
+# approxPolyDP epsilon as a fraction of the contour perimeter
+EPSILON_RATIO = 0.0005
+
+# Sort modes of ContourGeometry.sorted, mapped to the column they sort by
+SORT_KEYS = {
+    'area': 'area',
+    'perimeter': 'perimeter',
+    'points': 'point_count',
+}
+
+
+def _pack_polygons(polygons):
+    lengths = np.array([len(p) for p in polygons], dtype=np.int64)
+    if len(polygons):
+        points = np.concatenate([p.reshape(-1, 2) for p in polygons]).astype(np.int32)
+    else:
+        points = np.zeros((0, 2), dtype=np.int32)
+    return lengths, points
+
+
+def _unpack_polygons(lengths, points):
+    if not len(lengths):
+        return []
+    return [p.reshape(-1, 1, 2) for p in np.split(points, np.cumsum(lengths)[:-1])]
+
+
+def _no_arcs(count):
+    return [np.zeros((0, 4)) for _ in range(count)]
+
+
+class ContourGeometry:
+    """Array-backed geometry table of a job's contours.
+
+    Area, perimeter, bounding box (x, y, w, h), point count and the simplified
+    polygon (with its arcs, see simplify.fit_arcs) are computed once per contour;
+    sorting, filtering and rendering then work on these columns instead of calling
+    OpenCV again. Tables are not changed after they are built, so pack() serializes
+    a table once; pickling (from a worker process to the server) sends that blob.
+    """
+
+    def __init__(self, contours, area, perimeter, bbox, point_count, simplified, arcs=None):
+        self.contours = contours
+        self.area = area
+        self.perimeter = perimeter
+        self.bbox = bbox
+        self.point_count = point_count
+        self.simplified = simplified
+        self.arcs = arcs if arcs is not None else _no_arcs(len(simplified))
+        self._blob = None
+
+    def __reduce__(self):
+        return ContourGeometry.unpack, (self.pack(),)
+
+    @classmethod
+    def from_contours(cls, contours, min_area=None, epsilon_ratio=EPSILON_RATIO, simplify=None, on_progress=None):
+        """Build the table, dropping contours with an area <= min_area first when given.
+
+        Polygons are simplified with approxPolyDP and an epsilon of epsilon_ratio
+        times the perimeter, or, when simplify is given, by
+        simplify.simplify_contours with those keyword options (tolerance in mm).
+        on_progress(fraction) is called while the polygons are simplified.
+        """
+        on_progress = on_progress or (lambda fraction: None)
+        contours = list(contours)
+        area = np.fromiter((cv2.contourArea(c) for c in contours), dtype=np.float64, count=len(contours))
+        if min_area is not None:
+            keep = np.flatnonzero(area > min_area)
+            contours = [contours[i] for i in keep]
+            area = area[keep]
+        count = len(contours)
+        perimeter = np.fromiter((cv2.arcLength(c, True) for c in contours), dtype=np.float64, count=count)
+        bbox = np.array([cv2.boundingRect(c) for c in contours], dtype=np.int32).reshape(-1, 4)
+        point_count = np.fromiter((len(c) for c in contours), dtype=np.int64, count=count)
+        # measuring is cheap next to simplifying
+        on_progress(0.1)
+        if simplify is None:
+            simplified = []
+            for i, (c, p) in enumerate(zip(contours, perimeter)):
+                simplified.append(cv2.approxPolyDP(c, epsilon_ratio * p, True))
+                on_progress(0.1 + 0.9 * (i + 1) / count)
+            arcs = None
+        else:
+            simplified, arcs = simplify_contours(
+                contours, **simplify, on_progress=lambda fraction: on_progress(0.1 + 0.9 * fraction))
+        on_progress(1.0)
+        return cls(contours, area, perimeter, bbox, point_count, simplified, arcs)
+
+    def __len__(self):
+        return len(self.contours)
+
+    def select(self, index):
+        """New table with the rows picked by a boolean mask or an index array."""
+        index = np.asarray(index)
+        if index.dtype == bool:
+            index = np.flatnonzero(index)
+        return ContourGeometry(
+            [self.contours[i] for i in index],
+            self.area[index],
+            self.perimeter[index],
+            self.bbox[index],
+            self.point_count[index],
+            [self.simplified[i] for i in index],
+            [self.arcs[i] for i in index],
+        )
+
+    def sorted(self, sort_by='area'):
+        """New table sorted ascending by one of SORT_KEYS (stable)."""
+        if sort_by not in SORT_KEYS:
+            raise ValueError(f"Unknown sort mode: {sort_by}")
+        return self.select(np.argsort(getattr(self, SORT_KEYS[sort_by]), kind='stable'))
+
+    def outlines(self):
+        """Simplified polygons for drawing, with arcs approximated by short chords."""
+        if not any(len(a) for a in self.arcs):
+            return self.simplified
+        return [densify(p, a).round().astype(np.int32).reshape(-1, 1, 2) if len(a) else p
+                for p, a in zip(self.simplified, self.arcs)]
+
+    def toolpaths(self):
+        """(paths, arcs) for gCode.iter_gcode: every simplified polygon as an (k + 1, 2)
+        float path closed by repeating its first vertex, and its arc table (the closing
+        segment k - 1 keeps its row)."""
+        paths = [np.vstack([p.reshape(-1, 2), p.reshape(-1, 2)[:1]]).astype(np.float64) if len(p)
+                 else np.zeros((0, 2)) for p in self.simplified]
+        return paths, self.arcs
+
+    def simplification(self):
+        """Vertex reduction of the simplified polygons against the contours."""
+        before = int(self.point_count.sum())
+        after = sum(len(p) for p in self.simplified)
+        return {
+            'vertices_before': before,
+            'vertices_after': after,
+            'arcs': sum(len(a) for a in self.arcs),
+            'reduction': 1 - after / before if before else 0.0,
+        }
+
+    def pack(self):
+        """Serialize the table into one npz blob (computed on the first call)."""
+        if self._blob is not None:
+            return self._blob
+        contour_lengths, contour_points = _pack_polygons(self.contours)
+        simplified_lengths, simplified_points = _pack_polygons(self.simplified)
+        buf = BytesIO()
+        np.savez(
+            buf,
+            area=self.area, perimeter=self.perimeter, bbox=self.bbox, point_count=self.point_count,
+            contour_lengths=contour_lengths, contour_points=contour_points,
+            simplified_lengths=simplified_lengths, simplified_points=simplified_points,
+            arc_lengths=np.array([len(a) for a in self.arcs], dtype=np.int64),
+            arc_rows=np.concatenate(self.arcs) if len(self.arcs) else np.zeros((0, 4)),
+        )
+        self._blob = buf.getvalue()
+        return self._blob
+
+    @classmethod
+    def unpack(cls, blob):
+        data = np.load(BytesIO(blob), allow_pickle=False)
+        arcs = None
+        if 'arc_lengths' in data:
+            arcs = np.split(data['arc_rows'], np.cumsum(data['arc_lengths'])[:-1]) if len(data['arc_lengths']) else []
+        geometry = cls(
+            _unpack_polygons(data['contour_lengths'], data['contour_points']),
+            data['area'],
+            data['perimeter'],
+            data['bbox'],
+            data['point_count'],
+            _unpack_polygons(data['simplified_lengths'], data['simplified_points']),
+            arcs,
+        )
+        geometry._blob = blob
+        return geometry
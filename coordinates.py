@@ -1,19 +1,33 @@
-import numpy as np
+import sys
 import cv2
 import pandas as pd
-from polygonOutline import contours
+from ContourDetection import get_contours
+from contour_geometry import ContourGeometry
 
 font = cv2.FONT_HERSHEY_SIMPLEX
 
+if len(sys.argv) < 2:
+    print("Usage: python coordinates.py <image> [output.csv]")
+    sys.exit(1)
+
+img = cv2.imread(sys.argv[1])
+if img is None:
+    print(f"Could not read the image: {sys.argv[1]}")
+    sys.exit(1)
+output_csv = sys.argv[2] if len(sys.argv) > 2 else 'polygon_coordinates.csv'
+
+# area, perimeter and simplified polygons are computed once for every contour;
+# simplified with the default tolerance of simplify.py (a CSV has no room for arcs)
+geometry = ContourGeometry.from_contours(get_contours(img), simplify={})
+
 all_coords = []
-polygon_id = 0
 
-print("Number of contours:", len(contours))
+print("Number of contours:", len(geometry))
+report = geometry.simplification()
+print(f"Vertices: {report['vertices_before']} -> {report['vertices_after']} ({report['reduction']:.0%} fewer)")
 
-for c in (contours): 
-    print("Contour area:", cv2.contourArea(c))
-      
-    approx = cv2.approxPolyDP(c, 0.0005 * cv2.arcLength(c, True), True)
+for polygon_id, (area, approx) in enumerate(zip(geometry.area, geometry.simplified)):
+    print("Contour area:", area)
 
     coords = []
 
@@ -26,9 +40,6 @@ for c in (contours):
     for(x, y) in coords:
         all_coords.append((polygon_id, x, y))
     
-    polygon_id += 1
-    
 coordinat_df = pd.DataFrame(all_coords, columns=['ID', 'X', 'Y'])
-coordinat_df.to_csv('polygon_coordinates.csv', index=False)
-print("Coordinates saved to polygon_coordinates.csv")
-
+coordinat_df.to_csv(output_csv, index=False)
+print(f"Coordinates saved to {output_csv}")
@@ -0,0 +1,83 @@
+import cv2
+import numpy as np
+from CannyEdge import Canny_detector, Canny_detector_tiled, DEFAULT_PRECISION, TILE_SIZE
+
+# Registry of edge detection backends. Every backend takes a BGR image and
+# returns a uint8 edge mask of the same height/width (255 = edge, 0 = background).
+# Backends accept an on_progress(fraction) callback; single-call backends only
+# report completion.
+EDGE_BACKENDS = {}
+DEFAULT_BACKEND = 'custom'
+
+# Longest image side used by the fast preview backend
+PREVIEW_MAX_SIDE = 800
+
+
+def register_backend(name):
+    """Decorator adding an edge detection function to EDGE_BACKENDS under name."""
+    def decorator(fn):
+        EDGE_BACKENDS[name] = fn
+        return fn
+    return decorator
+
+
+def detect_edges(img, backend=DEFAULT_BACKEND, on_progress=None, **options):
+    """Run the named backend on img and return its uint8 edge mask."""
+    if backend not in EDGE_BACKENDS:
+        raise ValueError(f"Unknown edge detection backend: {backend}")
+    return EDGE_BACKENDS[backend](img, on_progress=on_progress, **options)
+
+
+def to_edge_mask(mag):
+    """Turn a thresholded magnitude image into a uint8 mask (nonzero -> 255)."""
+    mask = np.greater(mag, 0).view(np.uint8)
+    mask *= 255
+    return mask
+
+
+def auto_thresholds(gray):
+    """Weak/strong thresholds at 10% / 50% of the max Sobel magnitude, as in Canny_detector."""
+    gx = cv2.Sobel(gray, cv2.CV_32F, 1, 0, ksize=3)
+    gy = cv2.Sobel(gray, cv2.CV_32F, 0, 1, ksize=3)
+    mag_max = float(np.max(cv2.magnitude(gx, gy)))
+    return mag_max * 0.1, mag_max * 0.5
+
+
+@register_backend('custom')
+def custom_backend(img, use_hysteresis=True, on_progress=None, precision=DEFAULT_PRECISION):
+    """The project's own detector; exact parity with Canny_detector, with hysteresis unless disabled."""
+    return to_edge_mask(Canny_detector(img, use_hysteresis=use_hysteresis, on_progress=on_progress,
+                                       precision=precision))
+
+
+@register_backend('tiled')
+def tiled_backend(img, tile_size=TILE_SIZE, workers=None, use_hysteresis=True, on_progress=None,
+                  precision=DEFAULT_PRECISION):
+    """Same result as 'custom', computed tile by tile on a thread pool for large images."""
+    return Canny_detector_tiled(img, tile_size=tile_size, workers=workers, use_hysteresis=use_hysteresis,
+                                on_progress=on_progress, precision=precision)
+
+
+@register_backend('opencv')
+def opencv_backend(img, on_progress=None):
+    """OpenCV's native cv2.Canny with the same automatic thresholds (includes hysteresis)."""
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    weak_th, strong_th = auto_thresholds(gray)
+    edges = cv2.Canny(gray, weak_th, strong_th, apertureSize=3, L2gradient=True)
+    if on_progress:
+        on_progress(1.0)
+    return edges
+
+
+@register_backend('preview')
+def preview_backend(img, max_side=PREVIEW_MAX_SIDE, on_progress=None):
+    """Fast preview: detect on a downscaled copy and scale the mask back up."""
+    h, w = img.shape[:2]
+    scale = max_side / max(h, w)
+    if scale >= 1:
+        return opencv_backend(img, on_progress)
+    small = cv2.resize(img, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+    edges = cv2.resize(opencv_backend(small), (w, h), interpolation=cv2.INTER_NEAREST)
+    if on_progress:
+        on_progress(1.0)
+    return edges
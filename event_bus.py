@@ -0,0 +1,39 @@
+import threading
+
+
+class EventBus:
+    """Latest event per topic (a job id), with a version counter to wait on.
+
+    publish() replaces the topic's event and increments its version; wait() blocks
+    until the version moves past the one a client has seen. Only the latest event
+    is kept, so a slow client skips straight to the current state instead of
+    replaying every step.
+    """
+
+    def __init__(self):
+        self._events = {}
+        self._cond = threading.Condition()
+
+    def publish(self, topic, event):
+        with self._cond:
+            version = self._events.get(topic, (0, None))[0] + 1
+            self._events[topic] = (version, event)
+            self._cond.notify_all()
+        return version
+
+    def latest(self, topic):
+        """(version, event) of a topic; (0, None) before anything was published."""
+        with self._cond:
+            return self._events.get(topic, (0, None))
+
+    def wait(self, topic, since, timeout):
+        """(version, event) once the topic's version differs from since, or the current one after timeout."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._events.get(topic, (0, None))[0] != since, timeout)
+            return self._events.get(topic, (0, None))
+
+    def forget(self, topic):
+        with self._cond:
+            self._events.pop(topic, None)
+            # wake waiters so they see the topic is gone
+            self._cond.notify_all()
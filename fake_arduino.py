@@ -0,0 +1,183 @@
+import argparse
+import heapq
+import os
+import random
+import select
+import threading
+import time
+import tty
+
+from gcode_wire import WIRE_MODES, WireDecoder
+
+# Serial receive buffer of an AVR Arduino
+DEFAULT_RX_BUFFER = 64
+
+
+class FakeArduino:
+    """Simulated plotter firmware behind a pseudo-terminal.
+
+    Open `port` with ArduinoInterface like a real device. Until the first line
+    arrives the device keeps announcing 'ready'; afterwards every received line is
+    answered with 'OK <checksum>' followed by 'ready'.
+
+    The device only holds rx_buffer bytes that it has not processed yet; bytes
+    beyond that are dropped and counted in `overflows`, like a real serial buffer
+    that is written faster than the firmware reads it.
+
+    The device understands the wire modes of gcode_wire: 'WIRE <mode>' switches
+    the link after the ack and is confirmed with 'WIRE <mode>'. Interpreted
+    commands (Moves and texts) are collected in `commands`, raw units in `received`.
+
+    Link and firmware behaviour:
+    - baudrate: bytes move at baudrate / 10 bytes/s in both directions (None: unthrottled)
+    - line_delay: seconds the firmware spends on every line (blocks the device)
+    - latency: seconds before an answer reaches the host (does not block the device)
+    - error_rate: probability that a unit arrives damaged (rejected with a wrong checksum)
+    - corrupt_lines: (0-based) receive indexes that always arrive damaged
+    """
+
+    def __init__(self, rx_buffer=DEFAULT_RX_BUFFER, line_delay=0.0, corrupt_lines=(),
+                 baudrate=None, latency=0.0, error_rate=0.0, seed=None, wire_modes=WIRE_MODES):
+        self.rx_buffer = rx_buffer
+        self.line_delay = line_delay
+        self.corrupt_lines = set(corrupt_lines)
+        self.baudrate = baudrate
+        self.latency = latency
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self.wire_modes = wire_modes
+        self.decoder = WireDecoder()
+        self.received = []
+        self.commands = []
+        self.overflows = 0
+        self.errors = 0
+        self.max_buffered = 0
+
+        self._master, self._slave = os.openpty()
+        # no echo and no newline translation on the device side
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self._replies = []  # heap of (due, sequence, text)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=2)
+        os.close(self._master)
+        os.close(self._slave)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _byte_time(self):
+        return 10 / self.baudrate if self.baudrate else 0.0
+
+    def _reply(self, text):
+        heapq.heappush(self._replies, (time.monotonic() + self.latency, len(self.received), text))
+
+    def _flush_replies(self):
+        now = time.monotonic()
+        while self._replies and self._replies[0][0] <= now:
+            text = heapq.heappop(self._replies)[2].encode('utf-8')
+            if self.baudrate:
+                time.sleep(len(text) * self._byte_time())
+            os.write(self._master, text)
+
+    def _process(self, unit):
+        index = len(self.received)
+        binary = self.decoder.mode == 'binary'
+        self.received.append(unit if binary else unit.strip().decode('utf-8', errors='replace'))
+        if self.line_delay:
+            time.sleep(self.line_delay)
+        damaged = index in self.corrupt_lines or (self.error_rate and self._random.random() < self.error_rate)
+        if damaged:
+            self.errors += 1
+        csum, commands = self.decoder.decode(unit, damaged)
+        self.commands.extend(commands)
+        reply = f'OK {csum}\n'
+        for command in commands:
+            if isinstance(command, str) and command.upper().startswith('WIRE '):
+                mode = command.split()[1].lower()
+                if mode in self.wire_modes:
+                    self.decoder = WireDecoder(mode)
+                    reply += f'WIRE {mode}\n'
+        self._reply(reply + 'ready\n')
+
+    def _serve(self):
+        buffer = b''
+        last_banner = 0.0
+        # bytes the link could have delivered since the device last read
+        credit, last_read = 0.0, time.monotonic()
+        while not self._stop.is_set():
+            if not self.received and time.monotonic() - last_banner > 0.1:
+                self._reply('ready\n')
+                last_banner = time.monotonic()
+            self._flush_replies()
+
+            wait = 0.02
+            if self._replies:
+                wait = min(wait, max(self._replies[0][0] - time.monotonic(), 0.0))
+            readable, _, _ = select.select([self._master], [], [], wait)
+            now = time.monotonic()
+            if not readable:
+                credit, last_read = 0.0, now
+            else:
+                limit = 4096
+                if self.baudrate:
+                    credit = min(credit + (now - last_read) / self._byte_time(), self.rx_buffer)
+                    last_read = now
+                    limit = int(credit)
+                if limit < 1:
+                    time.sleep(self._byte_time())
+                    continue
+                try:
+                    data = os.read(self._master, limit)
+                except OSError:
+                    return
+                credit -= len(data)
+                room = self.rx_buffer - len(buffer)
+                if len(data) > room:
+                    self.overflows += len(data) - room
+                    data = data[:max(room, 0)]
+                buffer += data
+                self.max_buffered = max(self.max_buffered, len(buffer))
+
+            while True:
+                unit, buffer = self.decoder.split(buffer)
+                if unit is None:
+                    break
+                if unit.strip():
+                    self._process(unit)
+                    self._flush_replies()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a simulated plotter on a pseudo-terminal")
+    parser.add_argument("--rx-buffer", type=int, default=DEFAULT_RX_BUFFER)
+    parser.add_argument("--baudrate", type=int, default=None, help="Throttle the link to this baud rate")
+    parser.add_argument("--line-delay", type=float, default=0.0, help="Seconds of firmware work per line")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before answers reach the host")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of a wrong ack checksum")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    device = FakeArduino(rx_buffer=args.rx_buffer, line_delay=args.line_delay, baudrate=args.baudrate,
+                         latency=args.latency, error_rate=args.error_rate, seed=args.seed).start()
+    print(f"Fake Arduino listening on {device.port} (Ctrl-C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"{len(device.received)} lines received, {device.errors} errors injected, "
+              f"{device.overflows} bytes overflowed")
+        device.close()
@@ -0,0 +1,96 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class SpilledFrame:
+    """A frame in a .npy spill file; load() memory-maps it read-only.
+
+    Small enough to pickle, so it is what worker processes get instead of the pixels.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        return np.load(self.path, mmap_mode='r')
+
+
+def load_frame(frame):
+    """The image of a frame handle from FrameStore.handle(), or None if it is gone."""
+    if isinstance(frame, SpilledFrame):
+        try:
+            return frame.load()
+        except FileNotFoundError:
+            return None
+    return frame
+
+
+class FrameStore:
+    """Decoded upload frames kept by the server, for uploads that are not saved to disk.
+
+    Frames are held in memory up to max_bytes in total. Frames of at least
+    spill_bytes, and the least recently used ones once the budget is exceeded, are
+    moved to a .npy spill file in spill_dir and memory-mapped from there when read;
+    spill files stay around until discard(), also across restarts of the server.
+    """
+
+    def __init__(self, spill_dir, max_bytes=512 * 1024 * 1024, spill_bytes=64 * 1024 * 1024):
+        self.spill_dir = spill_dir
+        self.max_bytes = max_bytes
+        self.spill_bytes = spill_bytes
+        self.size = 0
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _spill_path(self, job_id):
+        return os.path.join(self.spill_dir, f"{job_id}_frame.npy")
+
+    def _spill(self, job_id, image):
+        os.makedirs(self.spill_dir, exist_ok=True)
+        spilled = np.lib.format.open_memmap(self._spill_path(job_id), mode='w+', dtype=image.dtype, shape=image.shape)
+        spilled[...] = image
+        spilled.flush()
+        del spilled
+
+    def put(self, job_id, image):
+        if self.spill_bytes and image.nbytes >= self.spill_bytes:
+            self._spill(job_id, image)
+            return
+        with self._lock:
+            self._frames[job_id] = image
+            self.size += image.nbytes
+            # spilled under the lock, so a frame is always either in memory or in its file
+            while self.size > self.max_bytes and len(self._frames) > 1:
+                old_id, old = next(iter(self._frames.items()))
+                self._spill(old_id, old)
+                del self._frames[old_id]
+                self.size -= old.nbytes
+
+    def handle(self, job_id):
+        """The frame itself when in memory, else a SpilledFrame (None when there is no frame)."""
+        with self._lock:
+            image = self._frames.get(job_id)
+        if image is not None:
+            return image
+        path = self._spill_path(job_id)
+        return SpilledFrame(path) if os.path.exists(path) else None
+
+    def get(self, job_id):
+        with self._lock:
+            image = self._frames.get(job_id)
+            if image is not None:
+                self._frames.move_to_end(job_id)
+                return image
+        return load_frame(self.handle(job_id))
+
+    def discard(self, job_id):
+        with self._lock:
+            image = self._frames.pop(job_id, None)
+            if image is not None:
+                self.size -= image.nbytes
+        path = self._spill_path(job_id)
+        if os.path.exists(path):
+            os.remove(path)
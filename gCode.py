@@ -1,69 +1,174 @@
+import numpy as np
 import pandas as pd
 from pathlib import Path
 import argparse
 import sys
+from travel_optimizer import optimize_travel
 
-def read_coords(df, xcol, ycol, idcol):
+def _numeric(series):
+    """Column as float64, with values that do not parse as numbers set to NaN."""
+    return pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def read_coord_groups(df, xcol, ycol, idcol):
+    """Columnar version of read_coords: returns (xy, offsets, ids).
 
+    xy is one contiguous (N, 2) float64 array with the points of all polygons,
+    polygon k being xy[offsets[k]:offsets[k + 1]]. With an ID column, rows are
+    grouped by ID in a single stable sort (polygons in order of first appearance);
+    otherwise polygons are separated by rows with a missing x or y. Rows whose
+    coordinates are not numeric are skipped.
+    """
     if xcol is None or ycol is None:
         numeric_cols = [c for c in df.columns if c.lower() not in ("id", "group", "group_id")]
         xcol = xcol or numeric_cols[0]
         ycol = ycol or numeric_cols[1]
 
-    paths = []
-    ids = []
+    xy = np.column_stack([_numeric(df[xcol]), _numeric(df[ycol])])
+    parsed = ~np.isnan(xy).any(axis=1)
 
     if idcol and idcol in df.columns:
         codes, uniques = pd.factorize(df[idcol])
-        for code in range(len(uniques)):
-            rows = df.iloc[codes == code][[xcol, ycol]].dropna(how="any")
-            if rows.empty:
-                continue
-            path = []
-            for xv, yv in zip(rows[xcol], rows[ycol]):
-                try:
-                    path.append((float(xv), float(yv)))
-                except Exception:
-                    continue
-            if path:
-                paths.append(path)
-                ids.append(uniques[code])
+        keep = parsed & (codes >= 0)
+        codes = codes[keep]
+        order = np.argsort(codes, kind="stable")
+        codes = codes[order]
+        xy = xy[keep][order]
+        starts = np.flatnonzero(np.diff(codes)) + 1
+        ids = list(uniques[codes[np.r_[0, starts]]]) if len(codes) else []
     else:
+        # a missing value ends the current polygon, a non-numeric one is just skipped
+        missing = (df[xcol].isna() | df[ycol].isna()).to_numpy()
+        segment = np.cumsum(missing)[parsed]
+        xy = xy[parsed]
+        starts = np.flatnonzero(np.diff(segment)) + 1
+        ids = [None] * (len(starts) + 1 if len(xy) else 0)
+
+    offsets = np.r_[0, starts, len(xy)] if len(xy) else np.zeros(1, dtype=np.int64)
+    return xy, offsets.astype(np.int64), ids
+
+
+def read_coords(df, xcol, ycol, idcol):
+    """Read polygons from a coordinate DataFrame, returns (paths, ids).
+
+    Each path is an (N, 2) float64 NumPy view into one shared array (see
+    read_coord_groups); ids holds the polygon's ID value, or None without an ID column.
+    """
+    xy, offsets, ids = read_coord_groups(df, xcol, ycol, idcol)
+    return np.split(xy, offsets[1:-1]) if len(xy) else [], ids
+
+# Rows formatted per block, and characters buffered per chunk written to the output
+MOVE_BLOCK_ROWS = 65536
+CHUNK_SIZE = 1 << 16
+
+_PAD = 0  # placeholder byte removed after vectorized formatting
+
+
+def _fixed4_columns(values):
+    """Character matrix (uint8) of values formatted like '%.4f', left-padded with _PAD."""
+    values = np.asarray(values, dtype=np.float64)
+    scaled = np.rint(np.abs(values) * 10000).astype(np.int64)
+    int_part, frac_part = np.divmod(scaled, 10000)
+    n_int = len(str(int(int_part.max()))) if len(values) else 1
+
+    cols = np.empty((len(values), n_int + 6), dtype=np.uint8)
+    cols[:, 0] = np.where(np.signbit(values), ord('-'), _PAD)
+    for k in range(n_int):
+        place = 10 ** (n_int - 1 - k)
+        digit = (int_part // place) % 10 + ord('0')
+        if place > 1:
+            # no leading zeros
+            digit = np.where(int_part >= place, digit, _PAD)
+        cols[:, 1 + k] = digit
+    cols[:, n_int + 1] = ord('.')
+    for k in range(4):
+        cols[:, n_int + 2 + k] = (frac_part // 10 ** (3 - k)) % 10 + ord('0')
+    return cols
+
+
+def _literal_columns(text, rows):
+    return np.broadcast_to(np.frombuffer(text.encode('ascii'), dtype=np.uint8), (rows, len(text)))
+
+
+def format_moves(xy, prefix, suffix=""):
+    """Format an (N, 2) coordinate array as lines f"{prefix} X{x:.4f} Y{y:.4f}{suffix}\n".
+
+    NumPy-vectorized: the whole block is built as one character matrix instead of one
+    f-string per point. Output is identical to the f-string version for finite values
+    (rounding uses the scaled value, so a decimal tie may differ in the last digit).
+    """
+    xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+    rows = len(xy)
+    if not rows:
+        return ""
+    if not np.isfinite(xy).all():
+        return "".join(f"{prefix} X{x:.4f} Y{y:.4f}{suffix}\n" for x, y in xy.tolist())
+    matrix = np.concatenate([
+        _literal_columns(f"{prefix} X", rows),
+        _fixed4_columns(xy[:, 0]),
+        _literal_columns(" Y", rows),
+        _fixed4_columns(xy[:, 1]),
+        _literal_columns(f"{suffix}\n", rows),
+    ], axis=1).ravel()
+    return matrix[matrix != _PAD].tobytes().decode('ascii')
+
 
-        current = []
-        for xv, yv in zip(df[xcol], df[ycol]):
-            if pd.isna(xv) or pd.isna(yv):
-                if current:
-                    paths.append(current)
-                    ids.append(None)
-                    current = []
-                continue
-            try:
-                current.append((float(xv), float(yv)))
-            except Exception:
-                continue
-        if current:
-            paths.append(current)
-            ids.append(None)
-
-    return paths, ids
-
-def path_to_gcode(fname, paths, ids=None, z_safe=100.0, z_cut=0.0, feed_xy=1500, feed_z=3000, travel_feed=5000):
-
-    lines = [
+def _cut_moves(path, feed_xy, vectorized):
+    """Yield the G1 lines for path[1:] in blocks of MOVE_BLOCK_ROWS points."""
+    for start in range(1, len(path), MOVE_BLOCK_ROWS):
+        block = path[start:start + MOVE_BLOCK_ROWS]
+        if vectorized:
+            yield format_moves(block, "G1", f" F{feed_xy}")
+        else:
+            if isinstance(block, np.ndarray):
+                block = block.tolist()
+            yield "".join(f"G1 X{x:.4f} Y{y:.4f} F{feed_xy}\n" for x, y in block)
+
+
+def _arc_moves(path, arcs, feed_xy):
+    """The G1/G2/G3 lines for path[1:], where rows (segment, cx, cy, direction) of arcs
+    turn the move from path[segment] to path[segment + 1] into an arc around (cx, cy)."""
+    by_segment = {int(row[0]): row[1:] for row in np.asarray(arcs).tolist()}
+    path = np.asarray(path, dtype=np.float64).tolist()
+    lines = []
+    for s in range(len(path) - 1):
+        x, y = path[s + 1]
+        arc = by_segment.get(s)
+        if arc is None:
+            lines.append(f"G1 X{x:.4f} Y{y:.4f} F{feed_xy}\n")
+        else:
+            cx, cy, direction = arc
+            x0, y0 = path[s]
+            code = "G3" if direction > 0 else "G2"
+            lines.append(f"{code} X{x:.4f} Y{y:.4f} I{cx - x0:.4f} J{cy - y0:.4f} F{feed_xy}\n")
+    return "".join(lines)
+
+
+def iter_gcode(paths, ids=None, z_safe=100.0, z_cut=0.0, feed_xy=1500, feed_z=3000, travel_feed=5000, vectorized=False,
+               arcs=None):
+    """Generate the G-code for paths as text pieces, each ending with a newline.
+
+    Memory use is bounded by one block of MOVE_BLOCK_ROWS points regardless of how
+    many points the paths have. vectorized=True formats coordinate blocks with
+    format_moves. arcs optionally holds one arc table per path (see
+    simplify.fit_arcs); those segments are written as G2/G3 moves.
+    """
+    yield "\n".join([
         "(generated by gCode.py)",
         "G21",   # mm
         "G90",   # absolute
         f"(z_safe={z_safe}, z_cut={z_cut})",
         f"G0 Z{z_safe:.3f} F{travel_feed}"
-    ]
+    ]) + "\n"
 
     for i, path in enumerate(paths):
-        if not path:
+        if len(path) == 0:
             continue
         # ensure lifted before traveling to new polygon start
-        lines.append(f"(--- polygon {i} start ---)")
-        lines.append(f"G0 Z{z_safe:.3f} F{travel_feed} ; lift before travel")
+        lines = [
+            f"(--- polygon {i} start ---)",
+            f"G0 Z{z_safe:.3f} F{travel_feed} ; lift before travel",
+        ]
         x0, y0 = path[0]
         lines.append(f"G0 X{x0:.4f} Y{y0:.4f} F{travel_feed} ; travel to polygon start")
         if ids and i < len(ids) and ids[i] is not None:
@@ -71,14 +176,57 @@ def path_to_gcode(fname, paths, ids=None, z_safe=100.0, z_cut=0.0, feed_xy=1500,
         lines.append(f"G1 Z{z_cut:.3f} F{feed_z} ; plunge to cut depth")
         # ADD: explicitly touch down at the start point as a cutting move so visualizer has the start vertex
         lines.append(f"G1 X{x0:.4f} Y{y0:.4f} F{feed_xy} ; start cut at first vertex")
+        yield "\n".join(lines) + "\n"
         # cutting moves (skip duplicating first point now, so start from index 1)
-        for x, y in path[1:]:
-            lines.append(f"G1 X{x:.4f} Y{y:.4f} F{feed_xy}")
-        lines.append(f"G0 Z{z_safe:.3f} F{travel_feed} ; retract after polygon")
-        lines.append(f"(--- polygon {i} end ---)")
+        if arcs is not None and i < len(arcs) and len(arcs[i]):
+            yield _arc_moves(path, arcs[i], feed_xy)
+        else:
+            yield from _cut_moves(path, feed_xy, vectorized)
+        yield f"G0 Z{z_safe:.3f} F{travel_feed} ; retract after polygon\n(--- polygon {i} end ---)\n"
+
+    yield f"G0 Z{z_safe:.3f} ; final retract\n"
+
+
+def gcode_line_count(paths, ids=None):
+    """Number of lines iter_gcode writes for paths (arcs do not change it), without generating them."""
+    count = 5 + 1
+    for i, path in enumerate(paths):
+        if len(path) == 0:
+            continue
+        has_id = bool(ids) and i < len(ids) and ids[i] is not None
+        count += 5 + has_id + len(path) - 1 + 2
+    return count
+
+
+def iter_gcode_chunks(paths, ids=None, chunk_size=CHUNK_SIZE, **params):
+    """Like iter_gcode, but joins the pieces into chunks of about chunk_size characters."""
+    buffer, size = [], 0
+    for piece in iter_gcode(paths, ids, **params):
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def iter_gcode_lines(paths, ids=None, **params):
+    """Like iter_gcode, but one line (without its newline) at a time, e.g. for streaming to the plotter."""
+    for piece in iter_gcode(paths, ids, **params):
+        yield from piece.splitlines()
 
-    lines.append(f"G0 Z{z_safe:.3f} ; final retract")
-    Path(fname).write_text("\n".join(lines) + "\n")
+
+def write_gcode(out, paths, ids=None, chunk_size=CHUNK_SIZE, **params):
+    """Stream G-code for paths into a file-like object (anything with write(str))."""
+    for chunk in iter_gcode_chunks(paths, ids, chunk_size=chunk_size, **params):
+        out.write(chunk)
+
+
+def path_to_gcode(fname, paths, ids=None, z_safe=100.0, z_cut=0.0, feed_xy=1500, feed_z=3000, travel_feed=5000, vectorized=False):
+    with open(fname, "w") as f:
+        write_gcode(f, paths, ids, z_safe=z_safe, z_cut=z_cut, feed_xy=feed_xy, feed_z=feed_z,
+                    travel_feed=travel_feed, vectorized=vectorized)
     return fname
 
 if __name__ == "__main__":
@@ -92,6 +240,9 @@ if __name__ == "__main__":
     p.add_argument("--z-cut", type=float, default=0.0)
     p.add_argument("--feed-xy", type=float, default=1500)
     p.add_argument("--feed-z", type=float, default=3000)
+    p.add_argument("--vectorized", action="store_true", help="Format coordinates with the NumPy-vectorized formatter")
+    p.add_argument("--optimize", action="store_true", help="Reorder/reverse polygons to minimize pen-up travel")
+    p.add_argument("--closed", action="store_true", help="With --optimize: treat every polygon as a closed loop")
     args = p.parse_args()
 
     csv_path = Path(args.csv) if args.csv else Path(__file__).with_name("polygon_coordinates.csv")
@@ -107,7 +258,11 @@ if __name__ == "__main__":
         print("No valid coordinates parsed from CSV.", file=sys.stderr)
         sys.exit(1)
 
-    out = path_to_gcode(args.out, paths=paths, ids=ids, z_safe=args.z_safe, z_cut=args.z_cut, feed_xy=args.feed_xy, feed_z=args.feed_z)
+    if args.optimize:
+        paths, ids, report = optimize_travel(paths, ids, closed=True if args.closed else None)
+        print(f"Pen-up travel: {report['travel_before']:.1f} -> {report['travel_after']:.1f}")
+
+    out = path_to_gcode(args.out, paths=paths, ids=ids, z_safe=args.z_safe, z_cut=args.z_cut, feed_xy=args.feed_xy, feed_z=args.feed_z, vectorized=args.vectorized)
     total_points = sum(len(p) for p in paths)
     print(f"Wrote G-code to {out} ({len(paths)} polygons, {total_points} points)")
 
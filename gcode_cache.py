@@ -0,0 +1,120 @@
+import threading
+from collections import OrderedDict
+
+
+class GcodeCache:
+    """Cache for /jobs/<id>/gcode.
+
+    Generated programs are kept as their list of encoded chunks, keyed by
+    (job, n, params), in an LRU bounded by the total number of bytes. A program is
+    only stored once it was generated completely, so an aborted download never
+    leaves a truncated entry behind; programs larger than the whole budget are not
+    stored at all. The travel-optimized order of a job's polygons is kept next to
+    them for the max_orders most recently used (job, n), see order().
+
+    A program or order is built once at a time: concurrent requests for a key that
+    is being built wait for it and are then served from the cache (or build it
+    themselves if it was not stored, e.g. after an aborted download).
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_orders=16):
+        self.max_bytes = max_bytes
+        self.max_orders = max_orders
+        self.size = 0
+        self._programs = OrderedDict()
+        self._orders = OrderedDict()
+        # keys being built, set when the build is over
+        self._building = {}
+        self._computing = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def stream(self, key, generate):
+        """Iterator over the chunks (bytes) of the program for key.
+
+        generate() -> iterable of str chunks is only called on a miss; its chunks
+        are passed through as they are produced and cached when it is exhausted.
+        The cache is looked up when iteration starts.
+        """
+        while True:
+            with self._lock:
+                chunks = self._programs.get(key)
+                if chunks is not None:
+                    self.hits += 1
+                    self._programs.move_to_end(key)
+                    break
+                done = self._building.get(key)
+                if done is None:
+                    self.misses += 1
+                    done = self._building[key] = threading.Event()
+                    break
+            done.wait()
+        if chunks is not None:
+            yield from chunks
+        else:
+            yield from self._generate(key, generate, done)
+
+    def _generate(self, key, generate, done):
+        chunks, size = [], 0
+        try:
+            for text in generate():
+                chunk = text.encode('ascii')
+                size += len(chunk)
+                if size <= self.max_bytes:
+                    chunks.append(chunk)
+                yield chunk
+            if size <= self.max_bytes:
+                self._put(key, chunks, size)
+        finally:
+            with self._lock:
+                del self._building[key]
+            done.set()
+
+    def _put(self, key, chunks, size):
+        with self._lock:
+            old = self._programs.pop(key, None)
+            if old is not None:
+                self.size -= sum(len(c) for c in old)
+            self._programs[key] = chunks
+            self.size += size
+            while self.size > self.max_bytes:
+                _, dropped = self._programs.popitem(last=False)
+                self.size -= sum(len(c) for c in dropped)
+
+    def order(self, key, compute):
+        """Travel-optimized (paths, ids) for key (job, n), from compute() on a miss.
+
+        Shared by every program and print of those polygons, whatever their G-code
+        parameters, so the optimization runs once per job and slider value.
+        """
+        while True:
+            with self._lock:
+                order = self._orders.get(key)
+                if order is not None:
+                    self._orders.move_to_end(key)
+                    return order
+                done = self._computing.get(key)
+                if done is None:
+                    done = self._computing[key] = threading.Event()
+                    break
+            done.wait()
+        try:
+            order = compute()
+            with self._lock:
+                self._orders[key] = order
+                while len(self._orders) > self.max_orders:
+                    self._orders.popitem(last=False)
+        finally:
+            with self._lock:
+                del self._computing[key]
+            done.set()
+        return order
+
+    def discard(self, job_id):
+        """Forget every program and order cached for a job."""
+        with self._lock:
+            for key in [key for key in self._programs if key[0] == job_id]:
+                self.size -= sum(len(c) for c in self._programs.pop(key))
+            for key in [key for key in self._orders if key[0] == job_id]:
+                del self._orders[key]
@@ -0,0 +1,335 @@
+import re
+import struct
+from typing import NamedTuple
+
+# Wire encodings of the plotter link, negotiated with 'WIRE <mode>'
+WIRE_MODES = ('ascii', 'compact', 'binary')
+
+# Decimal places kept by the compact encodings (0.01 mm; well below the plotter's step size)
+DEFAULT_PRECISION = 2
+
+# Binary frames: SYNC, sequence number, payload length, payload (move/text records),
+# XOR checksum of sequence number, length and payload
+FRAME_SYNC = 0xA5
+FRAME_OVERHEAD = 4
+MAX_FRAME = 255 + FRAME_OVERHEAD
+TEXT_RECORD = 0xFF
+# Move record flags
+F_G1, F_X, F_Y, F_Z, F_F, F_ABSOLUTE = 0x01, 0x02, 0x04, 0x08, 0x10, 0x20
+AXIS_FLAGS = (F_X, F_Y, F_Z)
+
+WORD_RE = re.compile(r'([A-Za-z])\s*([-+]?(?:\d+\.?\d*|\.\d+))')
+COMMENT_RE = re.compile(r'\([^)]*\)|;.*$')
+COMPACT_RE = re.compile(rb'N(\d+)(.*)\*(\d+)')
+
+
+class Move(NamedTuple):
+    """A G0/G1 move in fixed-point units (10 ** -precision mm); None for an unknown axis.
+
+    In relative mode (G91) the axes hold the given offsets instead of positions.
+    """
+    g: int
+    x: int | None
+    y: int | None
+    z: int | None
+    f: int | None
+
+
+def checksum(string: str | bytes):
+    csum = 0
+    for c in string:
+        csum ^= c
+    return csum
+
+
+def strip_comments(text):
+    return COMMENT_RE.sub('', text).strip()
+
+
+def format_units(units, precision=DEFAULT_PRECISION):
+    """Shortest decimal text of a fixed-point value: 1700 -> '17', -1725 -> '-17.25'."""
+    if not precision:
+        return str(units)
+    whole, frac = divmod(abs(units), 10 ** precision)
+    frac = str(frac).rjust(precision, '0').rstrip('0')
+    sign = '-' if units < 0 else ''
+    return f"{sign}{whole}.{frac}" if frac else f"{sign}{whole}"
+
+
+class ModalState:
+    """Modal state of the interpreter (motion G code, position, feed, G90/G91).
+
+    command() interprets one line the way the device does; the compact encoders
+    compare against the state before a line to decide which words can be left out.
+    """
+
+    def __init__(self, precision=DEFAULT_PRECISION):
+        self.precision = precision
+        self.g = None
+        self.x = self.y = self.z = None
+        self.f = None
+        self.absolute = True
+
+    def units(self, value):
+        return int(round(float(value) * 10 ** self.precision))
+
+    def snapshot(self):
+        return self.g, self.x, self.y, self.z, self.f, self.absolute
+
+    def move(self, g, x, y, z, f):
+        self.g, self.f = g, f
+        if self.absolute:
+            self.x, self.y, self.z = x, y, z
+        return Move(g, x, y, z, f)
+
+    def command(self, text):
+        """Interpret a line: a Move for G0/G1 motion, the stripped text otherwise, None if blank."""
+        text = strip_comments(text)
+        if not text:
+            return None
+        words = [(letter.upper(), value) for letter, value in WORD_RE.findall(text)]
+        letters = {letter for letter, _ in words}
+        codes = [float(value) for letter, value in words if letter == 'G']
+        is_motion = (
+            not WORD_RE.sub('', text).strip()
+            and letters <= {'G', 'X', 'Y', 'Z', 'F'}
+            and len(codes) <= 1 and all(code in (0, 1) for code in codes)
+            and (codes or (self.g in (0, 1) and letters))
+        )
+        if not is_motion:
+            self._update(words)
+            return text
+
+        g = int(codes[0]) if codes else self.g
+        values = {letter: self.units(value) for letter, value in words if letter != 'G'}
+        if self.absolute:
+            x, y, z = (values.get(axis, old) for axis, old in zip('XYZ', (self.x, self.y, self.z)))
+        else:
+            x, y, z = (values.get(axis) for axis in 'XYZ')
+        return self.move(g, x, y, z, values.get('F', self.f))
+
+    def _update(self, words):
+        """Track what other commands do to the state the encoders rely on."""
+        for letter, value in words:
+            if letter == 'G':
+                code = float(value)
+                if code in (0, 1, 2, 3):
+                    self.g = int(code)
+                elif code in (90, 91):
+                    self.absolute = code == 90
+                    self.x = self.y = self.z = None
+                elif code == 28:
+                    self.x = self.y = self.z = None
+            elif letter == 'F':
+                self.f = self.units(value)
+        for axis in 'XYZ':
+            given = [value for letter, value in words if letter == axis]
+            if given:
+                setattr(self, axis.lower(), self.units(given[-1]) if self.absolute else None)
+
+
+def encode_compact(state, text):
+    """Compact line for text, or None when there is nothing to send.
+
+    Drops the motion G code, coordinates and feed when they repeat the modal state,
+    rounds to the state's precision and leaves out spaces and comments. A move that
+    changes nothing becomes its bare G code, so lines stay one-to-one.
+    """
+    g0, x0, y0, z0, f0, absolute = state.snapshot()
+    command = state.command(text)
+    if not isinstance(command, Move):
+        return command
+    parts = [f"G{command.g}"] if command.g != g0 else []
+    for axis, value, old in zip('XYZ', command[1:4], (x0, y0, z0)):
+        if value is not None and (not absolute or value != old):
+            parts.append(axis + format_units(value, state.precision))
+    if command.f is not None and command.f != f0:
+        parts.append('F' + format_units(command.f, state.precision))
+    return ''.join(parts) or f"G{command.g}"
+
+
+def encode_record(state, text):
+    """Binary record for text, or None when there is nothing to send.
+
+    Absolute-mode moves become a flags byte plus int16 deltas from the previous
+    position (int32 absolute positions when a delta does not fit or the position
+    is unknown) and an int32 feed when it changed. Everything else is sent as a
+    text record.
+    """
+    g0, x0, y0, z0, f0, absolute = state.snapshot()
+    command = state.command(text)
+    if command is None:
+        return None
+    if not isinstance(command, Move) or not absolute:
+        data = strip_comments(text).encode('utf-8')
+        if len(data) > 253:
+            raise ValueError(f"G-code line too long for a binary frame: {text}")
+        return bytes([TEXT_RECORD, len(data)]) + data
+
+    flags = F_G1 if command.g == 1 else 0
+    axes = [(flag, value, old) for flag, value, old in zip(AXIS_FLAGS, command[1:4], (x0, y0, z0))
+            if value is not None and value != old]
+    if any(old is None or not -0x8000 <= value - old <= 0x7FFF for _, value, old in axes):
+        flags |= F_ABSOLUTE
+        fields = struct.pack(f'<{len(axes)}i', *(value for _, value, _ in axes))
+    else:
+        fields = struct.pack(f'<{len(axes)}h', *(value - old for _, value, old in axes))
+    for flag, _, _ in axes:
+        flags |= flag
+    if command.f is not None and command.f != f0:
+        flags |= F_F
+        fields += struct.pack('<i', command.f)
+    return bytes([flags]) + fields
+
+
+def decode_records(state, payload):
+    """Commands (Moves and texts) of a binary frame payload."""
+    commands = []
+    pos = 0
+    while pos < len(payload):
+        flags = payload[pos]
+        pos += 1
+        if flags == TEXT_RECORD:
+            length = payload[pos]
+            text = payload[pos + 1:pos + 1 + length].decode('utf-8', errors='replace')
+            pos += 1 + length
+            commands.append(state.command(text))
+            continue
+        fmt = 'i' if flags & F_ABSOLUTE else 'h'
+        position = [state.x, state.y, state.z]
+        for i, flag in enumerate(AXIS_FLAGS):
+            if flags & flag:
+                (value,) = struct.unpack_from('<' + fmt, payload, pos)
+                pos += struct.calcsize(fmt)
+                position[i] = value if flags & F_ABSOLUTE else position[i] + value
+        f = state.f
+        if flags & F_F:
+            (f,) = struct.unpack_from('<i', payload, pos)
+            pos += 4
+        commands.append(state.move(1 if flags & F_G1 else 0, *position, f))
+    return commands
+
+
+def frame(seq, payload):
+    body = bytes([seq, len(payload)]) + payload
+    return bytes([FRAME_SYNC]) + body + bytes([checksum(body)])
+
+
+def encode_units(lines, mode='ascii', precision=DEFAULT_PRECISION, max_frame=MAX_FRAME, seq=0):
+    """Encode G-code lines into flow-control units for the link.
+
+    Yields (data, ack_checksum, line_count): the bytes to write, the checksum the
+    device answers with when it received them intact, and how many input lines
+    they account for (including blank and comment lines skipped before them).
+    ascii and compact units are newline-terminated lines; binary units are
+    frames of at most max_frame bytes. lines may be any iterable; it is read
+    lazily, one unit ahead at most.
+
+    compact and binary units depend on the ones before them, so they carry a
+    sequence number (counting from seq, modulo 256) and their own checksum: a
+    compact line is 'N<seq><words>*<checksum>'. The device drops a damaged unit
+    and everything after it until that unit is sent again.
+    """
+    if mode not in WIRE_MODES:
+        raise ValueError(f"Unknown wire mode: {mode}")
+    state = ModalState(precision)
+    skipped = 0
+    if mode != 'binary':
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith(';'):
+                skipped += 1
+                continue
+            if mode == 'compact':
+                line = encode_compact(state, line)
+                if line is None:
+                    skipped += 1
+                    continue
+                line = f"N{seq}{line}"
+                line = f"{line}*{checksum(line.encode('utf-8'))}"
+                seq = (seq + 1) % 256
+            data = line.encode('utf-8')
+            yield data + b'\n', checksum(data), 1 + skipped
+            skipped = 0
+        return
+
+    max_payload = min(max_frame - FRAME_OVERHEAD, 255)
+    payload, count = b'', 0
+    for line in lines:
+        record = encode_record(state, line)
+        if record is None:
+            skipped += 1
+            continue
+        if len(record) > max_payload:
+            raise ValueError(f"G-code line too long for a {max_frame}-byte frame: {line}")
+        if len(payload) + len(record) > max_payload:
+            data = frame(seq, payload)
+            yield data, data[-1], count
+            payload, count, seq = b'', 0, (seq + 1) % 256
+        payload += record
+        count += 1 + skipped
+        skipped = 0
+    if payload:
+        data = frame(seq, payload)
+        yield data, data[-1], count
+
+
+class WireDecoder:
+    """Device side of the link: splits received bytes into units and interprets them."""
+
+    def __init__(self, mode='ascii', precision=DEFAULT_PRECISION):
+        self.mode = mode
+        self.state = ModalState(precision)
+        # sequence number of the next compact/binary unit
+        self.expected = 0
+
+    def split(self, buffer):
+        """(unit, rest) for the first complete unit in buffer, or (None, buffer)."""
+        if self.mode != 'binary':
+            if b'\n' not in buffer:
+                return None, buffer
+            unit, rest = buffer.split(b'\n', 1)
+            return unit, rest
+        start = buffer.find(bytes([FRAME_SYNC]))
+        if start < 0:
+            return None, b''
+        buffer = buffer[start:]
+        if len(buffer) < 3 or len(buffer) < buffer[2] + FRAME_OVERHEAD:
+            return None, buffer
+        end = buffer[2] + FRAME_OVERHEAD
+        return buffer[:end], buffer[end:]
+
+    def _check(self, unit):
+        """(ack, seq, body) of a compact/binary unit; body is None when it is damaged."""
+        if self.mode == 'binary':
+            ack = checksum(unit[1:-1])
+            return ack, unit[1], unit[3:-1] if ack == unit[-1] else None
+        line = unit.strip()
+        match = COMPACT_RE.fullmatch(line)
+        if not match or int(match[3]) != checksum(b'N' + match[1] + match[2]):
+            return checksum(line), None, None
+        return checksum(line), int(match[1]), match[2]
+
+    def decode(self, unit, damaged=False):
+        """(ack_checksum, commands) of a unit.
+
+        damaged simulates a unit that arrived corrupted: it is rejected with a
+        wrong ack. Damaged and out-of-sequence compact/binary units yield no commands.
+        """
+        if self.mode == 'ascii':
+            line = unit.strip()
+            if damaged:
+                return checksum(line) ^ 0x01, []
+            command = self.state.command(line.decode('utf-8', errors='replace'))
+            return checksum(line), [command] if command is not None else []
+
+        ack, seq, body = self._check(unit)
+        if damaged or body is None:
+            return ack ^ 0x01 if damaged else ack, []
+        if seq != self.expected:
+            return ack, []
+        self.expected = (self.expected + 1) % 256
+        if self.mode == 'binary':
+            return ack, decode_records(self.state, body)
+        command = self.state.command(body.decode('utf-8', errors='replace'))
+        return ack, [command] if command is not None else []
@@ -1,11 +1,83 @@
 import {SERVER_URL} from "./constants.ts";
 import axios from "axios";
+import type {FileStatus, PlotterStatus} from "./models/server-objects.ts";
+import {decodePolygons, type PolygonSet} from "./polygons.ts";
 
 export type HConfig = {
     allowed_extensions: string[],
+    edge_backends: string[],
+    default_edge_backend: string,
 }
 
 export const getConfig = async (): Promise<HConfig> => {
     const response = await axios.get(SERVER_URL + `/config`)
     return response.data as HConfig;
-}
\ No newline at end of file
+}
+
+// All polygons of a completed job, fetched once so any slider value can be drawn locally
+export const fetchPolygons = async (polygonsUrl: string): Promise<PolygonSet> => {
+    const response = await axios.get(SERVER_URL + polygonsUrl, {responseType: 'arraybuffer'})
+    return decodePolygons(response.data as ArrayBuffer);
+}
+
+// Stops a queued or running job, e.g. when its preview already looks wrong
+export const cancelJob = async (jobId: string) => {
+    const response = await axios.delete(SERVER_URL + `/jobs/${jobId}`)
+    return response.data as {job_id: string, status: string};
+}
+
+export const printJob = async (jobId: string, slider: number) => {
+    const formData = new FormData();
+    formData.append('slider', slider.toString());
+    const response = await axios.post(SERVER_URL + `/jobs/${jobId}/print`, formData)
+    return response.data as {print_id: string, status: string, queue_position: number | null, total: number};
+}
+
+export const controlPlotter = async (action: 'pause' | 'resume' | 'abort'): Promise<PlotterStatus> => {
+    const response = await axios.post(SERVER_URL + `/plotter/${action}`)
+    return response.data as PlotterStatus;
+}
+
+// Calls onStatus with every plotter status the server sends; returns the EventSource to close it
+export const watchPlotter = (onStatus: (status: PlotterStatus) => void): EventSource => {
+    const source = new EventSource(SERVER_URL + `/plotter/events`);
+    source.onmessage = (event) => onStatus(JSON.parse(event.data) as PlotterStatus);
+    return source;
+}
+
+const FINISHED_STATUSES = ['completed', 'failed', 'cancelled'];
+
+// Calls onStatus whenever the job's status changes, until it is finished: server-sent events,
+// or long-polls of the status endpoint where EventSource is not available. Returns a function to stop.
+export const watchJob = (jobId: string, onStatus: (status: FileStatus) => void): (() => void) => {
+    if (typeof EventSource !== 'undefined') {
+        const source = new EventSource(SERVER_URL + `/jobs/${jobId}/events`);
+        source.onmessage = (event) => {
+            const status = JSON.parse(event.data) as FileStatus;
+            onStatus(status);
+            // the server ends the stream now; closing keeps the browser from reconnecting
+            if (FINISHED_STATUSES.includes(status.status)) source.close();
+        };
+        return () => source.close();
+    }
+
+    let stopped = false;
+    const poll = async (since?: number) => {
+        while (!stopped) {
+            try {
+                const response = await axios.get(SERVER_URL + `/jobs/${jobId}/status`, {
+                    params: {wait: 30, since},
+                });
+                const status = response.data as FileStatus;
+                onStatus(status);
+                if (FINISHED_STATUSES.includes(status.status)) return;
+                since = status.version;
+            } catch (error) {
+                console.error('Status request failed:', error);
+                await new Promise(resolve => setTimeout(resolve, 1000));
+            }
+        }
+    };
+    poll();
+    return () => { stopped = true; };
+}
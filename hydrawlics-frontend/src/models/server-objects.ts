@@ -6,7 +6,62 @@ export type FileStatus = {
   created_at: string,
   // e.g. "/jobs/accfdfd6-1404-43fb-b518-e2de412c9cad/download"
   download_url?: string,
+  // e.g. "/jobs/accfdfd6-1404-43fb-b518-e2de412c9cad/gcode?slider=50"
+  gcode_url?: string,
+  // e.g. "/jobs/accfdfd6-1404-43fb-b518-e2de412c9cad/polygons", all polygons in the binary format of polygons.ts
+  polygons_url?: string,
   job_id: string,
+  // job whose result was reused because the same image was uploaded with the same parameters
+  cached_from?: string | null,
   progress: number,
-  status: 'queued' | 'processing' | 'completed' | 'failed'
-}
\ No newline at end of file
+  // 1-based position in the job queue while status is 'queued'
+  queue_position?: number,
+  // while processing: the current stage ('read', 'preview', 'edges', 'contours', 'geometry', 'sort', 'render')
+  // and the estimated seconds left, null until there is progress to estimate from
+  stage?: string,
+  eta?: number | null,
+  // seconds spent in each finished stage
+  timings?: Record<string, number>,
+  // the low resolution pass, done before the full resolution pass the other fields describe
+  preview?: PreviewStatus,
+  status: 'queued' | 'processing' | 'completed' | 'failed' | 'cancelled',
+  // increases with every change, see the long-poll parameter 'since' of /jobs/<id>/status
+  version: number,
+}
+
+export type PreviewStatus = {
+  status: 'ready' | 'failed',
+  // e.g. "/jobs/accfdfd6-1404-43fb-b518-e2de412c9cad/preview", when ready
+  url?: string,
+  contour_count?: number,
+  // size of the preview image
+  width?: number,
+  height?: number,
+  seconds: number,
+  error?: string,
+}
+
+export type PrintStatus = {
+  print_id: string,
+  job_id: string,
+  name: string,
+  status: 'queued' | 'printing' | 'completed' | 'failed' | 'aborted',
+  // last G-code line acknowledged by the plotter, of total
+  line: number,
+  total: number,
+  progress: number,
+  lines_per_sec: number,
+  // seconds left, null while unknown (e.g. paused)
+  eta: number | null,
+  error: string | null,
+}
+
+export type PlotterStatus = {
+  version: number,
+  connected: boolean,
+  paused: boolean,
+  error: string | null,
+  current: PrintStatus | null,
+  queue: PrintStatus[],
+  history: PrintStatus[],
+}
@@ -0,0 +1,69 @@
+// Decoding and drawing of the binary polygon format of /jobs/<id>/polygons (see polygon_codec.py)
+
+export type PolygonSet = {
+    width: number,
+    height: number,
+    // index of the first vertex of every polygon, then the vertex count
+    offsets: Uint32Array,
+    // x, y of every vertex
+    points: Int32Array,
+}
+
+const MAGIC = 'HPLY';
+const VERSION = 1;
+// size of polygon_codec._HEADER, '<4sHBBIIII'
+const HEADER_SIZE = 24;
+
+export const decodePolygons = (buffer: ArrayBuffer): PolygonSet => {
+    const view = new DataView(buffer);
+    const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+    if (magic !== MAGIC || view.getUint16(4, true) !== VERSION) {
+        throw new Error('Not a polygon blob of a supported version');
+    }
+    const size = view.getUint8(6);
+    const width = view.getUint32(8, true);
+    const height = view.getUint32(12, true);
+    const count = view.getUint32(16, true);
+    const vertices = view.getUint32(20, true);
+
+    // both arrays are aligned for typed array views (little-endian hosts)
+    const offsets = new Uint32Array(buffer, HEADER_SIZE, count + 1);
+    const start = HEADER_SIZE + offsets.byteLength;
+    const deltas = size === 2 ? new Int16Array(buffer, start, vertices * 2) : new Int32Array(buffer, start, vertices * 2);
+    const points = new Int32Array(vertices * 2);
+    let x = 0, y = 0;
+    for (let i = 0; i < points.length; i += 2) {
+        x += deltas[i];
+        y += deltas[i + 1];
+        points[i] = x;
+        points[i + 1] = y;
+    }
+    return {width, height, offsets, points};
+}
+
+// Number of polygons shown for a slider value, the same rounding as slider_count on the server
+export const sliderCount = (total: number, slider: number): number => {
+    if (slider >= 100) return total;
+    return Math.max(1, Math.floor(total * (slider / 100) + 0.5));
+}
+
+// Strokes the last (largest) count polygons as closed outlines
+export const drawPolygons = (ctx: CanvasRenderingContext2D, polygons: PolygonSet, count: number,
+                             color = '#ff00ff', thickness = 2) => {
+    const {offsets, points} = polygons;
+    const total = offsets.length - 1;
+    ctx.beginPath();
+    for (let p = Math.max(0, total - count); p < total; p++) {
+        const first = offsets[p], end = offsets[p + 1];
+        if (first === end) continue;
+        ctx.moveTo(points[2 * first], points[2 * first + 1]);
+        for (let v = first + 1; v < end; v++) {
+            ctx.lineTo(points[2 * v], points[2 * v + 1]);
+        }
+        ctx.closePath();
+    }
+    ctx.strokeStyle = color;
+    ctx.lineWidth = thickness;
+    ctx.lineJoin = 'round';
+    ctx.stroke();
+}
@@ -0,0 +1,158 @@
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Worker processes are started fresh rather than forked from the server, whose threads
+# (reaper, previews, plotter) may hold locks at the time of the fork
+START_METHOD = 'spawn'
+
+
+class QueueFull(Exception):
+    """Raised by JobQueue.submit when the queue has no room for another job."""
+
+
+class JobCancelled(Exception):
+    """Raised inside a worker by report() once its job has been cancelled."""
+
+
+# Set in worker processes by _init_worker
+_updates = None
+_cancelled = None
+
+
+def _init_worker(updates, cancelled):
+    global _updates, _cancelled
+    _updates = updates
+    _cancelled = cancelled
+
+
+def report(job_id, **fields):
+    """Send job field updates (progress, status, ...) from a worker back to the server.
+
+    Also the cancellation point of a running job: raises JobCancelled once the job
+    has been cancelled. Does nothing when called outside a worker process.
+    """
+    if _updates is None:
+        return
+    if _cancelled.get(job_id):
+        raise JobCancelled(job_id)
+    _updates.put((job_id, fields))
+
+
+def _run_job(job_id, fn, args):
+    """Worker entry point: run fn and send its returned fields as the final update."""
+    fields = fn(*args)
+    if fields and not _cancelled.get(job_id):
+        _updates.put((job_id, fields))
+
+
+class JobQueue:
+    """Bounded FIFO of jobs executed on a fixed number of worker processes.
+
+    Jobs wait in a parent-side queue (so they can report their position and be
+    cancelled) and are handed to a worker only when one is free. Field updates
+    sent by workers through report() are passed to on_update(job_id, fields) in
+    the order they were sent. The workers are started on the first submit.
+
+    Every worker is a single-process pool of its own: when its process dies (out
+    of memory, a crash in native code) only the job it was running fails, and the
+    worker is replaced for the next job.
+    """
+
+    def __init__(self, on_update, workers, max_queued):
+        self.on_update = on_update
+        self.workers = workers
+        self.max_queued = max_queued
+        self._pending = deque()
+        self._running = set()
+        self._cond = threading.Condition()
+        self._started = False
+
+    def _start(self):
+        self._context = multiprocessing.get_context(START_METHOD)
+        self._manager = self._context.Manager()
+        self._cancelled = self._manager.dict()
+        self._updates = self._context.Queue()
+        self._started = True
+        threading.Thread(target=self._forward_updates, daemon=True).start()
+        for _ in range(self.workers):
+            threading.Thread(target=self._dispatch, daemon=True).start()
+
+    def is_full(self):
+        with self._cond:
+            return len(self._pending) >= self.max_queued
+
+    def submit(self, job_id, fn, *args):
+        """Queue fn(*args) to run in a worker process, raises QueueFull when at capacity."""
+        with self._cond:
+            if len(self._pending) >= self.max_queued:
+                raise QueueFull(job_id)
+            if not self._started:
+                self._start()
+            self._pending.append((job_id, fn, args))
+            self._cond.notify()
+
+    def position(self, job_id):
+        """1-based position of a waiting job, or None if it is not waiting."""
+        with self._cond:
+            for i, (pending_id, _, _) in enumerate(self._pending):
+                if pending_id == job_id:
+                    return i + 1
+        return None
+
+    def waiting(self):
+        """Ids of the waiting jobs, in queue order."""
+        with self._cond:
+            return [job_id for job_id, _, _ in self._pending]
+
+    def cancel(self, job_id):
+        """Drop a waiting job or flag a running one. Returns False if the job is unknown."""
+        with self._cond:
+            for entry in self._pending:
+                if entry[0] == job_id:
+                    self._pending.remove(entry)
+                    return True
+            if job_id in self._running:
+                self._cancelled[job_id] = True
+                return True
+        return False
+
+    def stats(self):
+        with self._cond:
+            return {'queued': len(self._pending), 'running': len(self._running), 'workers': self.workers}
+
+    def _new_worker(self):
+        return ProcessPoolExecutor(
+            max_workers=1, mp_context=self._context,
+            initializer=_init_worker, initargs=(self._updates, self._cancelled),
+        )
+
+    def _dispatch(self):
+        worker = self._new_worker()
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                job_id, fn, args = self._pending.popleft()
+                self._running.add(job_id)
+            try:
+                worker.submit(_run_job, job_id, fn, args).result()
+            except JobCancelled:
+                pass
+            except BrokenProcessPool:
+                self.on_update(job_id, {'status': 'failed', 'error': 'The worker process stopped unexpectedly'})
+                worker.shutdown(wait=False)
+                worker = self._new_worker()
+            except Exception as e:
+                self.on_update(job_id, {'status': 'failed', 'error': str(e)})
+            finally:
+                with self._cond:
+                    self._running.discard(job_id)
+                    self._cancelled.pop(job_id, None)
+
+    def _forward_updates(self):
+        while True:
+            job_id, fields = self._updates.get()
+            self.on_update(job_id, fields)
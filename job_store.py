@@ -0,0 +1,305 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from contour_geometry import ContourGeometry
+
+try:
+    import fcntl
+except ImportError:
+    # not available on Windows, where every SQLiteJobStore owns its database
+    fcntl = None
+
+# Jobs in these states are never evicted
+ACTIVE_STATUSES = {'queued', 'processing'}
+
+# Job field kept outside the JSON record (a ContourGeometry)
+GEOMETRY_FIELD = 'geometry'
+
+
+class JobStore:
+    """Interface of the job stores used by the server.
+
+    Records are plain JSON-serializable dicts keyed by job id. The contour geometry
+    is kept next to the record and only loaded through geometry(). Records returned by the
+    store are snapshots: change them through update(), not by mutating the dict.
+    """
+
+    def __contains__(self, job_id):
+        raise NotImplementedError
+
+    def __getitem__(self, job_id):
+        record = self.get(job_id)
+        if record is None:
+            raise KeyError(job_id)
+        return record
+
+    def __setitem__(self, job_id, record):
+        self.put(job_id, record)
+
+    def __delitem__(self, job_id):
+        self.delete(job_id)
+
+    def get(self, job_id, default=None):
+        raise NotImplementedError
+
+    def put(self, job_id, record):
+        raise NotImplementedError
+
+    def update(self, job_id, fields, unless=()):
+        """Merge fields into an existing record; a 'geometry' field goes to the geometry storage.
+
+        Records whose status is in unless are left alone, checked atomically with the
+        write. Returns whether the record was updated.
+        """
+        raise NotImplementedError
+
+    def delete(self, job_id):
+        raise NotImplementedError
+
+    def geometry(self, job_id):
+        raise NotImplementedError
+
+    def items(self):
+        raise NotImplementedError
+
+    def evict_expired(self):
+        """Drop expired or over-capacity jobs and return their records for artifact cleanup."""
+        raise NotImplementedError
+
+
+class MemoryJobStore(JobStore):
+    """In-process store with LRU capacity and a TTL counted from the last update."""
+
+    def __init__(self, ttl, max_jobs):
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self._records = OrderedDict()
+        self._geometry = {}
+        self._touched = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, job_id):
+        with self._lock:
+            return job_id in self._records
+
+    def get(self, job_id, default=None):
+        with self._lock:
+            record = self._records.get(job_id)
+            if record is None:
+                return default
+            self._records.move_to_end(job_id)
+            return dict(record)
+
+    def put(self, job_id, record):
+        record = dict(record)
+        geometry = record.pop(GEOMETRY_FIELD, None)
+        with self._lock:
+            self._records[job_id] = record
+            self._records.move_to_end(job_id)
+            self._touched[job_id] = time.monotonic()
+            if geometry is not None:
+                self._geometry[job_id] = geometry
+
+    def update(self, job_id, fields, unless=()):
+        fields = dict(fields)
+        geometry = fields.pop(GEOMETRY_FIELD, None)
+        with self._lock:
+            record = self._records.get(job_id)
+            if record is None or record.get('status') in unless:
+                return False
+            record.update(fields)
+            self._touched[job_id] = time.monotonic()
+            if geometry is not None:
+                self._geometry[job_id] = geometry
+            return True
+
+    def delete(self, job_id):
+        with self._lock:
+            self._records.pop(job_id, None)
+            self._geometry.pop(job_id, None)
+            self._touched.pop(job_id, None)
+
+    def geometry(self, job_id):
+        with self._lock:
+            return self._geometry.get(job_id)
+
+    def items(self):
+        with self._lock:
+            return [(job_id, dict(record)) for job_id, record in self._records.items()]
+
+    def evict_expired(self):
+        now = time.monotonic()
+        evicted = []
+        with self._lock:
+            finished = [job_id for job_id, record in self._records.items()
+                        if record.get('status') not in ACTIVE_STATUSES]
+            # least recently used first
+            overflow = len(self._records) - self.max_jobs
+            for job_id in finished:
+                if overflow > 0 or now - self._touched[job_id] > self.ttl:
+                    evicted.append(self._records.pop(job_id))
+                    self._geometry.pop(job_id, None)
+                    del self._touched[job_id]
+                    overflow -= 1
+        return evicted
+
+
+class SQLiteJobStore(JobStore):
+    """Job store persisted in a SQLite file, so jobs survive a server restart.
+
+    Jobs that were queued or processing when the server stopped are marked failed on
+    startup, since their worker is gone. Only the store that owns the database does
+    this: the first one opened, which holds a lock on <path>.lock until it is closed
+    or its process exits. A store opened next to a live owner (a second server
+    process on the same file) leaves those jobs to it. Reads do not write: the last access of a job
+    (for the LRU order of eviction) is kept in memory and saved by update() and
+    evict_expired().
+    """
+
+    def __init__(self, path, ttl, max_jobs):
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self._lock = threading.Lock()
+        self._accessed = {}
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._owner_file = None
+        self.owner = self._acquire_owner(path)
+        if self._db.execute("PRAGMA auto_vacuum").fetchone()[0] != 1:
+            # only takes effect on an existing database once it is rebuilt
+            self._db.execute("PRAGMA auto_vacuum = FULL")
+            self._db.execute("VACUUM")
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode = WAL")
+            columns = [row[1] for row in self._db.execute("PRAGMA table_info(jobs)")]
+            if columns and 'geometry' not in columns:
+                # store written before contours were kept as a geometry table
+                self._db.execute("DROP TABLE jobs")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, record TEXT NOT NULL, geometry BLOB,"
+                " touched REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+        if self.owner:
+            self._fail_interrupted()
+
+    def _acquire_owner(self, path):
+        """Take the owner lock of the database, False while another store holds it."""
+        if fcntl is None:
+            return True
+        self._owner_file = open(f"{path}.lock", 'w')
+        try:
+            fcntl.flock(self._owner_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._owner_file.close()
+            self._owner_file = None
+            return False
+        return True
+
+    def close(self):
+        """Close the database and give up the owner lock."""
+        with self._lock:
+            with self._db:
+                self._save_accessed()
+            self._db.close()
+        if self._owner_file is not None:
+            self._owner_file.close()
+            self._owner_file = None
+
+    def _fail_interrupted(self):
+        for job_id, record in self.items():
+            if record.get('status') in ACTIVE_STATUSES:
+                self.update(job_id, {
+                    'status': 'failed',
+                    'error': 'Server restarted before the job finished',
+                    'completed_at': datetime.now().isoformat(),
+                })
+
+    def __contains__(self, job_id):
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM jobs WHERE id = ?", (job_id,)).fetchone() is not None
+
+    def get(self, job_id, default=None):
+        with self._lock:
+            row = self._db.execute("SELECT record FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return default
+            self._accessed[job_id] = time.time()
+        return json.loads(row[0])
+
+    def put(self, job_id, record):
+        record = dict(record)
+        geometry = record.pop(GEOMETRY_FIELD, None)
+        blob = geometry.pack() if geometry is not None else None
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO jobs (id, record, geometry, touched, accessed) VALUES (?, ?, ?, ?, ?)",
+                (job_id, json.dumps(record), blob, now, now),
+            )
+            self._accessed.pop(job_id, None)
+
+    def update(self, job_id, fields, unless=()):
+        fields = dict(fields)
+        geometry = fields.pop(GEOMETRY_FIELD, None)
+        blob = geometry.pack() if geometry is not None else None
+        # the status check is part of the statements, so it holds for the write as well
+        skip = f"json_extract(record, '$.status') IN ({', '.join('?' * len(unless))})" if unless else '0'
+        with self._lock, self._db:
+            row = self._db.execute(f"SELECT record FROM jobs WHERE id = ? AND NOT {skip}",
+                                   (job_id, *unless)).fetchone()
+            if row is None:
+                return False
+            record = json.loads(row[0])
+            record.update(fields)
+            now = time.time()
+            updated = self._db.execute(
+                f"UPDATE jobs SET record = ?, geometry = coalesce(?, geometry), touched = ?, accessed = ?"
+                f" WHERE id = ? AND NOT {skip}",
+                (json.dumps(record), blob, now, now, job_id, *unless),
+            ).rowcount
+            self._accessed.pop(job_id, None)
+        return bool(updated)
+
+    def delete(self, job_id):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            self._accessed.pop(job_id, None)
+
+    def _save_accessed(self):
+        """Write the access times collected by get() (with the lock held, inside a transaction)."""
+        self._db.executemany("UPDATE jobs SET accessed = ? WHERE id = ?",
+                             [(accessed, job_id) for job_id, accessed in self._accessed.items()])
+        self._accessed.clear()
+
+    def geometry(self, job_id):
+        with self._lock:
+            row = self._db.execute("SELECT geometry FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return ContourGeometry.unpack(row[0])
+
+    def items(self):
+        with self._lock:
+            rows = self._db.execute("SELECT id, record FROM jobs ORDER BY touched").fetchall()
+        return [(job_id, json.loads(record)) for job_id, record in rows]
+
+    def evict_expired(self):
+        now = time.time()
+        evicted = []
+        with self._lock, self._db:
+            self._save_accessed()
+            rows = self._db.execute("SELECT id, record, touched FROM jobs ORDER BY accessed").fetchall()
+            overflow = len(rows) - self.max_jobs
+            for job_id, record, touched in rows:
+                record = json.loads(record)
+                if record.get('status') in ACTIVE_STATUSES:
+                    continue
+                if overflow > 0 or now - touched > self.ttl:
+                    self._db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+                    evicted.append(record)
+                    overflow -= 1
+        return evicted
@@ -1,26 +1,119 @@
 import os
+import json
+import logging
 import uuid
 import threading
+import multiprocessing
 import csv
+import gzip
+import shutil
 import cv2
 import numpy as np
 import pandas as pd
-from CannyEdge import Canny_detector
-from polygonOutline import draw_polygon_outlines
+from edge_backends import EDGE_BACKENDS, DEFAULT_BACKEND, PREVIEW_MAX_SIDE, detect_edges
+from job_queue import JobQueue, JobCancelled, QueueFull, report
+from job_store import MemoryJobStore, SQLiteJobStore
+from render_cache import RenderCache
+from gcode_cache import GcodeCache
+from result_cache import ResultCache, content_key
+from frame_store import FrameStore, load_frame
+from polygon_codec import encode_polygons, polygons_svg
+from gCode import gcode_line_count, iter_gcode_chunks, iter_gcode_lines
+from travel_optimizer import optimize_travel
+from arduino_interface import BAUD_RATE, RX_BUFFER_SIZE, ArduinoInterface, detect_serial_port
+from plotter import PlotterManager
+from event_bus import EventBus
+from progress import ProgressTracker
+from metrics import MetricsRegistry, peak_rss_bytes, process_resident_bytes, reset_peak_rss
+from polygonOutline import draw_polygons
+from contour_geometry import ContourGeometry, SORT_KEYS
+from simplify import SIMPLIFY_MODES, DEFAULT_MODE, DEFAULT_TOLERANCE_MM, DEFAULT_MM_PER_PX
 from datetime import datetime
-from time import sleep
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep, time
 from io import BytesIO
 
-from flask import Flask, jsonify, request, send_file
+from flask import Flask, Response, jsonify, request, send_file
 from flask_cors import CORS
+from serial.serialutil import SerialException
 from werkzeug.utils import secure_filename
 
+def env_number(name, default, minimum, cast=int):
+    """Numeric setting from the environment variable name, checked to be at least minimum"""
+    raw = os.environ.get(name)
+    if raw is None:
+        return default
+    try:
+        value = cast(raw)
+    except ValueError:
+        raise ValueError(f"{name} must be {'an integer' if cast is int else 'a number'}, got {raw!r}") from None
+    if not value >= minimum:
+        raise ValueError(f"{name} must be at least {minimum}, got {raw!r}")
+    return value
+
 # instantiate the app
 app = Flask(__name__)
 app.config.from_object(__name__)
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['PROCESSED_FOLDER'] = 'processed'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+# Upload ingest: 'disk' saves uploads and reads them back, 'memory' decodes them straight from the
+# request and keeps the frames in memory up to FRAME_MEMORY_BYTES; frames of FRAME_SPILL_BYTES or
+# more, and the least recently used ones beyond the budget, are memory-mapped from FRAME_FOLDER.
+# KEEP_UPLOADS saves the uploaded file in 'memory' mode too.
+app.config['INGEST_MODE'] = os.environ.get('HYDRAWLICS_INGEST_MODE', 'disk')
+app.config['KEEP_UPLOADS'] = os.environ.get('HYDRAWLICS_KEEP_UPLOADS', '0') == '1'
+app.config['FRAME_FOLDER'] = 'frames'
+app.config['FRAME_MEMORY_BYTES'] = env_number('HYDRAWLICS_FRAME_MEMORY_BYTES', 512 * 1024 * 1024, 0)
+app.config['FRAME_SPILL_BYTES'] = env_number('HYDRAWLICS_FRAME_SPILL_BYTES', 64 * 1024 * 1024, 1)
+# Number of worker processes running edge detection, and how many jobs may wait for one
+app.config['WORKER_COUNT'] = env_number('HYDRAWLICS_WORKERS', os.cpu_count() or 1, 1)
+app.config['MAX_QUEUED_JOBS'] = env_number('HYDRAWLICS_MAX_QUEUED_JOBS', 32, 1)
+# Threads rendering the low resolution previews of new uploads, in the server process so a
+# preview does not wait for a free worker
+app.config['PREVIEW_WORKERS'] = env_number('HYDRAWLICS_PREVIEW_WORKERS', 2, 1)
+# Job store: 'sqlite' (survives restarts) or 'memory'. Finished jobs and their files are
+# removed JOB_TTL seconds after their last update, or earlier once there are more than MAX_JOBS.
+app.config['JOB_STORE'] = os.environ.get('HYDRAWLICS_JOB_STORE', 'sqlite')
+app.config['JOB_DB_PATH'] = os.environ.get('HYDRAWLICS_JOB_DB', 'jobs.sqlite3')
+app.config['JOB_TTL'] = env_number('HYDRAWLICS_JOB_TTL', 24 * 60 * 60, 1)
+app.config['MAX_JOBS'] = env_number('HYDRAWLICS_MAX_JOBS', 500, 1)
+app.config['REAPER_INTERVAL'] = env_number('HYDRAWLICS_REAPER_INTERVAL', 60, 1)
+# Slider render cache: jobs with decoded images kept, drawn canvases and encoded PNGs
+app.config['RENDER_CACHE_JOBS'] = env_number('HYDRAWLICS_RENDER_CACHE_JOBS', 4, 1)
+app.config['RENDER_CACHE_CANVASES'] = env_number('HYDRAWLICS_RENDER_CACHE_CANVASES', 8, 1)
+app.config['RENDER_CACHE_PNGS'] = env_number('HYDRAWLICS_RENDER_CACHE_PNGS', 64, 1)
+# G-code cache: total size of the generated programs kept per (job, slider, parameters)
+app.config['GCODE_CACHE_BYTES'] = env_number('HYDRAWLICS_GCODE_CACHE_BYTES', 64 * 1024 * 1024, 0)
+# Seconds the 2-opt pass of travel optimization may take. It runs in the /gcode or /print request
+# that first asks for a (job, slider) pair; the order is cached for the requests after it.
+app.config['OPTIMIZE_TIME_LIMIT'] = env_number('HYDRAWLICS_OPTIMIZE_TIME_LIMIT', 1.0, 0, cast=float)
+# Result cache: total size of the contour geometry kept per (image content, processing parameters),
+# so an identical upload is completed from an earlier job instead of being processed again
+app.config['RESULT_CACHE_BYTES'] = env_number('HYDRAWLICS_RESULT_CACHE_BYTES', 256 * 1024 * 1024, 0)
+# Polygon simplification: default mode and tolerance (mm on the plotter), size of a pixel in mm,
+# and whether circular runs become G2/G3 arcs. Uploads may override mode, tolerance and arcs.
+app.config['SIMPLIFY_MODE'] = os.environ.get('HYDRAWLICS_SIMPLIFY_MODE', DEFAULT_MODE)
+app.config['SIMPLIFY_TOLERANCE'] = float(os.environ.get('HYDRAWLICS_SIMPLIFY_TOLERANCE', DEFAULT_TOLERANCE_MM))
+app.config['MM_PER_PX'] = float(os.environ.get('HYDRAWLICS_MM_PER_PX', DEFAULT_MM_PER_PX))
+app.config['SIMPLIFY_ARCS'] = os.environ.get('HYDRAWLICS_SIMPLIFY_ARCS', '0') == '1'
+# Plotter: serial port (first detected port when unset), link speed, receive buffer of the
+# firmware, wire encoding ('ascii', 'compact', 'binary' or 'auto' to negotiate the best one)
+# and how many prints may wait for it
+app.config['PLOTTER_PORT'] = os.environ.get('HYDRAWLICS_PLOTTER_PORT')
+app.config['PLOTTER_BAUDRATE'] = env_number('HYDRAWLICS_PLOTTER_BAUDRATE', BAUD_RATE, 1)
+app.config['PLOTTER_RX_BUFFER'] = env_number('HYDRAWLICS_PLOTTER_RX_BUFFER', RX_BUFFER_SIZE, 1)
+app.config['PLOTTER_WIRE'] = os.environ.get('HYDRAWLICS_PLOTTER_WIRE', 'ascii')
+app.config['MAX_QUEUED_PRINTS'] = env_number('HYDRAWLICS_MAX_QUEUED_PRINTS', 16, 1)
+# Seconds between server-sent events while nothing changes, and the longest wait of a long-poll
+app.config['EVENT_KEEPALIVE'] = 15
+app.config['MAX_LONG_POLL'] = 60
+# Log level (DEBUG also logs the first contours of every job)
+app.config['LOG_LEVEL'] = os.environ.get('HYDRAWLICS_LOG_LEVEL', 'INFO').upper()
+
+logging.basicConfig(level=app.config['LOG_LEVEL'], format='%(asctime)s %(levelname)s %(name)s %(message)s')
+log = logging.getLogger('hydrawlics')
 
 # enable CORS
 CORS(app, resources={r'/*': {'origins': '*'}})
@@ -28,71 +121,342 @@ CORS(app, resources={r'/*': {'origins': '*'}})
 # Create directories if they don't exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['PROCESSED_FOLDER'], exist_ok=True)
+os.makedirs(app.config['FRAME_FOLDER'], exist_ok=True)
+
+# Worker processes import this module too, and so does the file watcher of the debug reloader
+# (app.run(debug=True) below, or flask run --debug), which serves from a child process started
+# with WERKZEUG_RUN_MAIN=true. Only the process serving requests opens the job store, starts the
+# reaper and builds the job queue, the plotter and the preview pool.
+uses_reloader = __name__ == '__main__' or app.debug
+is_server_process = multiprocessing.parent_process() is None and (
+    not uses_reloader or os.environ.get('WERKZEUG_RUN_MAIN') == 'true')
+
+def create_job_store():
+    if app.config['JOB_STORE'] == 'memory':
+        return MemoryJobStore(ttl=app.config['JOB_TTL'], max_jobs=app.config['MAX_JOBS'])
+    return SQLiteJobStore(app.config['JOB_DB_PATH'], ttl=app.config['JOB_TTL'], max_jobs=app.config['MAX_JOBS'])
+
+jobs = create_job_store() if is_server_process else None
+
+# Status changes of every job, for /jobs/<id>/events and long-polls of /jobs/<id>/status
+events = EventBus()
+
+# Server metrics for /metrics; gauges of the queues and caches are registered below them
+metrics = MetricsRegistry(prefix='hydrawlics_')
+stage_seconds = metrics.histogram('stage_seconds', 'Duration of the processing and render stages', labels=('stage',))
+job_peak_rss = metrics.histogram('job_peak_rss_bytes', 'Peak resident memory of the worker process during a job',
+                                 buckets=tuple(2 ** i * 1024 * 1024 for i in range(5, 14)))
+jobs_finished = metrics.counter('jobs_finished_total', 'Jobs that completed, failed or were cancelled',
+                                labels=('status',))
+
+render_cache = RenderCache(
+    max_jobs=app.config['RENDER_CACHE_JOBS'],
+    max_canvases=app.config['RENDER_CACHE_CANVASES'],
+    max_renders=app.config['RENDER_CACHE_PNGS'],
+    on_timing=lambda step, seconds: stage_seconds.observe(seconds, stage=step),
+)
 
-# In-memory job storage (use Redis in production)
-jobs = {}
+gcode_cache = GcodeCache(max_bytes=app.config['GCODE_CACHE_BYTES'])
+
+result_cache = ResultCache(max_bytes=app.config['RESULT_CACHE_BYTES'])
+
+frames = FrameStore(
+    app.config['FRAME_FOLDER'],
+    max_bytes=app.config['FRAME_MEMORY_BYTES'],
+    spill_bytes=app.config['FRAME_SPILL_BYTES'],
+)
+
+preview_pool = ThreadPoolExecutor(max_workers=app.config['PREVIEW_WORKERS'],
+                                  thread_name_prefix='preview') if is_server_process else None
+
+def connect_plotter():
+    """Open the plotter connection and negotiate the configured wire encoding"""
+    port = app.config['PLOTTER_PORT'] or detect_serial_port()
+    if port is None:
+        raise SerialException("No serial port found for the plotter")
+    con = ArduinoInterface(port=port, baudrate=app.config['PLOTTER_BAUDRATE'])
+    wire = app.config['PLOTTER_WIRE']
+    if wire != 'ascii':
+        preferred = ('binary', 'compact') if wire == 'auto' else (wire,)
+        log.info("plotter wire=%s", con.negotiate_wire(preferred))
+    return con
+
+serial_lines = metrics.counter('serial_lines_total', 'G-code lines acknowledged by the plotter')
+serial_bytes = metrics.counter('serial_bytes_total', 'Bytes written to the plotter')
+serial_resends = metrics.counter('serial_resends_total', 'Units resent to the plotter after a checksum mismatch')
+serial_seconds = metrics.counter('serial_seconds_total', 'Time spent streaming to the plotter')
+serial_ack_latency = metrics.histogram('serial_ack_latency_seconds', 'Time from writing a unit to its ack',
+                                       buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+
+def record_stream(stats):
+    """Add the stats of a finished ArduinoInterface.stream_gcode run to the serial metrics"""
+    serial_lines.inc(stats['lines'])
+    serial_bytes.inc(stats['bytes'])
+    serial_resends.inc(stats['resends'])
+    serial_seconds.inc(stats['elapsed'])
+    for latency in stats['latencies']:
+        serial_ack_latency.observe(latency)
+
+plotter = PlotterManager(
+    connect_plotter,
+    rx_buffer=app.config['PLOTTER_RX_BUFFER'],
+    max_queued=app.config['MAX_QUEUED_PRINTS'],
+    on_stream=record_stream,
+) if is_server_process else None
 
 # Allowed file extensions
 ALLOWED_EXTENSIONS = {'png', 'jpg'}
 
-# Sort polygons by area (smallest to largest)
+# G-code parameters of /jobs/<id>/gcode and their defaults (see gCode.iter_gcode)
+GCODE_PARAMS = {
+    'z_safe': 100.0,
+    'z_cut': 0.0,
+    'feed_xy': 1500,
+    'feed_z': 3000,
+    'travel_feed': 5000,
+}
+
+# Stages of apply_edge_detection and their rough share of its run time, for progress reporting
+PROCESSING_STAGES = {
+    'read': 5,
+    'edges': 50,
+    'contours': 10,
+    'geometry': 24,
+    'sort': 1,
+    'render': 10,
+}
+
+# Keep all contours by default. Adjust MIN_CONTOUR_AREA if you want to drop tiny fragments.
+MIN_CONTOUR_AREA = 0.0
+
+# Job states that will not change anymore
+FINISHED_STATUSES = {'completed', 'failed', 'cancelled'}
+
+# Sort polygons by area (smallest to largest), or by any other mode in SORT_KEYS
 def sort_polygons_by_area(contours, sort_by='area'):
-    if sort_by == 'area':
-        return sorted(contours, key=cv2.contourArea)
-    elif sort_by == 'perimeter':
-        return sorted(contours, key=cv2.arcLength)
+    return ContourGeometry.from_contours(contours).sorted(sort_by).contours
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def apply_edge_detection(input_path, output_path, job_id):
-    """TODO: Apply edge detection to image in background thread"""
+def render_preview(img, path, sort_by='area', slider=100, max_side=PREVIEW_MAX_SIDE):
+    """Coarse result of a job: outlines found on a copy of img downscaled to max_side,
+    drawn like the final render and written to path. Returns the preview's status fields."""
+    h, w = img.shape[:2]
+    scale = min(1.0, max_side / max(h, w))
+    if scale < 1:
+        img = cv2.resize(img, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+    contours, _ = cv2.findContours(detect_edges(img, 'opencv'), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    # areas shrink with the square of the scale
+    geometry = ContourGeometry.from_contours(contours, min_area=MIN_CONTOUR_AREA * scale * scale).sorted(sort_by)
+    polygons = geometry.outlines()
+    n = slider_count(len(polygons), slider) if polygons else 0
+    cv2.imwrite(path, draw_polygons(img.copy(), polygons[len(polygons) - n:]))
+    return {'status': 'ready', 'contour_count': len(geometry), 'width': img.shape[1], 'height': img.shape[0]}
+
+def build_preview(job_id, source, path, sort_by='area', slider=100):
+    """Render the preview of a new job on the preview pool, while the job waits for a worker.
+
+    source is the decoded upload, or its encoded bytes. The result is stored as the
+    job's 'preview' field unless the job already finished.
+    """
+    started = time()
+    try:
+        image = source if isinstance(source, np.ndarray) else cv2.imdecode(
+            np.frombuffer(source, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise Exception("Could not decode the image")
+        preview = render_preview(image, path, sort_by, slider)
+    except Exception as e:
+        # the full pass does not depend on it
+        log.warning("job=%s preview failed: %s", job_id, e)
+        preview = {'status': 'failed', 'error': str(e)}
+    preview['seconds'] = round(time() - started, 4)
+    stage_seconds.observe(preview['seconds'], stage='preview')
+    update_job(job_id, {'preview': preview})
+
+def apply_edge_detection(source, output_path, job_id, detector=DEFAULT_BACKEND, sort_by='area', simplify=None):
+    """Apply edge detection to an image, runs in a worker process of the job queue.
+
+    source is the path of the uploaded file, or the decoded frame (see FrameStore.handle).
+    Progress is sent back with report(); the returned fields are the job's final state.
+    """
     try:
-        # do some arbitrary waiting to simulate processing
-        jobs[job_id]['status'] = 'processing'
-        jobs[job_id]['progress'] = 10
-
-        img = cv2.imread(input_path)
-        if img is None:
-            raise Exception("Could not read the image file.")
-        
-        jobs[job_id]['progress'] = 30
-
-        edges = Canny_detector(img)
-        contours, _ = cv2.findContours(edges.astype('uint8'), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-        jobs[job_id]['progress'] = 50
-
-        # Keep all contours by default. Adjust MIN_CONTOUR_AREA if you want to drop tiny fragments.
-        MIN_CONTOUR_AREA = 0.0
-        contours = [c for c in contours if cv2.contourArea(c) > MIN_CONTOUR_AREA]
-
-        sorted_contours = sort_polygons_by_area(contours, sort_by='area')
-        jobs[job_id]['sorted_contours'] = sorted_contours
-        jobs[job_id]['contour_count'] = len(sorted_contours)
-        
-        result = draw_polygon_outlines(img, sorted_contours)
-        cv2.imwrite(output_path, result)
-
-        areas = [cv2.contourArea(c) for c in sorted_contours]
-        print(f"[{job_id}] Smallest 10 areas: {areas[:10]}")
-        print(f"[{job_id}] Largest 10 areas: {areas[-10:]}")
-
-        for c in sorted_contours[:10]:
-            print(len(c), c.reshape(-1, 2)[:5])
-
-        jobs[job_id]['progress'] = 80
-        sleep(1)
-        jobs[job_id]['progress'] = 100
-        
-        jobs[job_id]['status'] = 'completed'
-        jobs[job_id]['result_path'] = output_path
-        jobs[job_id]['completed_at'] = datetime.now().isoformat()
-        
+        # the worker's peak memory is measured per job where the platform allows it
+        reset_peak_rss()
+        report(job_id, status='processing', progress=0)
+        tracker = ProgressTracker(PROCESSING_STAGES, partial(report, job_id))
+
+        with tracker.stage('read'):
+            img = cv2.imread(source) if isinstance(source, str) else load_frame(source)
+            if img is None:
+                raise Exception("Could not read the image file.")
+
+        with tracker.stage('edges') as progress:
+            edges = detect_edges(img, detector, on_progress=progress)
+
+        with tracker.stage('contours'):
+            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        with tracker.stage('geometry') as progress:
+            # area, perimeter, bounding box and simplified polygon are computed once here
+            geometry = ContourGeometry.from_contours(contours, min_area=MIN_CONTOUR_AREA, simplify=simplify,
+                                                     on_progress=progress)
+
+        with tracker.stage('sort'):
+            geometry = geometry.sorted(sort_by)
+
+        with tracker.stage('render'):
+            result = draw_polygons(img.copy(), geometry.outlines())
+            cv2.imwrite(output_path, result)
+
+        if log.isEnabledFor(logging.DEBUG):
+            areas = geometry.area.tolist()
+            log.debug("job=%s smallest_areas=%s largest_areas=%s", job_id, areas[:10], areas[-10:])
+            for c in geometry.contours[:10]:
+                log.debug("job=%s contour points=%d first=%s", job_id, len(c), c.reshape(-1, 2)[:5].tolist())
+
+        return {
+            'status': 'completed',
+            'progress': 100,
+            'geometry': geometry,
+            'contour_count': len(geometry),
+            'simplification': geometry.simplification(),
+            'width': img.shape[1],
+            'height': img.shape[0],
+            'timings': tracker.timings,
+            'peak_rss': peak_rss_bytes(),
+            'result_path': output_path,
+            'completed_at': datetime.now().isoformat(),
+        }
+
+    except JobCancelled:
+        raise
     except Exception as e:
-        jobs[job_id]['status'] = 'failed'
-        jobs[job_id]['error'] = str(e)
-        jobs[job_id]['completed_at'] = datetime.now().isoformat()
+        return {
+            'status': 'failed',
+            'error': str(e),
+            'completed_at': datetime.now().isoformat(),
+        }
+
+def update_job(job_id, fields):
+    """Merge field updates from the job queue into the job record."""
+    job = jobs.get(job_id)
+    if job is None or job['status'] in FINISHED_STATUSES:
+        # cancelled (or otherwise finished) jobs ignore late updates from their worker
+        return
+    if fields.get('status') == 'failed':
+        fields.setdefault('completed_at', datetime.now().isoformat())
+    if not jobs.update(job_id, fields, unless=FINISHED_STATUSES):
+        # cancelled since it was read above
+        return
+    if fields.get('status') == 'completed' and job.get('content_key'):
+        result_cache.put(job['content_key'], job_id, {
+            'contour_count': fields['contour_count'],
+            'simplification': fields['simplification'],
+            'width': fields['width'],
+            'height': fields['height'],
+        }, fields['geometry'], fields['result_path'])
+    if fields.get('status') in FINISHED_STATUSES:
+        jobs_finished.inc(status=fields['status'])
+        for stage, seconds in fields.get('timings', {}).items():
+            stage_seconds.observe(seconds, stage=stage)
+        if fields.get('peak_rss'):
+            job_peak_rss.observe(fields['peak_rss'])
+    publish_job(job_id)
+    if job['status'] == 'queued' and fields.get('status', 'queued') != 'queued':
+        # every job behind it moved up
+        publish_waiting_jobs()
+
+def publish_job(job_id):
+    """Publish the current status of a job to its event stream"""
+    job = jobs.get(job_id)
+    if job is not None:
+        events.publish(job_id, job_status(job_id, job))
+
+def publish_waiting_jobs():
+    for job_id in job_queue.waiting():
+        publish_job(job_id)
+
+def job_image(job_id, job):
+    """The uploaded image of a job, from the frame store or its file; None when it is gone"""
+    image = frames.get(job_id)
+    if image is None and job.get('input_path'):
+        image = cv2.imread(job['input_path'])
+    return image
+
+def remove_artifacts(job):
+    """Delete the uploaded frame and files and the rendered file of a job"""
+    frames.discard(job['id'])
+    for key in ('input_path', 'output_path', 'preview_path'):
+        path = job.get(key)
+        if path and os.path.exists(path):
+            os.remove(path)
+
+def reap_expired_jobs():
+    """Evict expired jobs from the store and delete files no job refers to anymore"""
+    for job in jobs.evict_expired():
+        events.forget(job['id'])
+        render_cache.discard(job['id'])
+        gcode_cache.discard(job['id'])
+        remove_artifacts(job)
+
+    # leftovers of jobs evicted while the server was down, or from aborted uploads
+    cutoff = time() - app.config['JOB_TTL']
+    for folder in (app.config['UPLOAD_FOLDER'], app.config['PROCESSED_FOLDER'], app.config['FRAME_FOLDER']):
+        for entry in os.scandir(folder):
+            job_id = entry.name.split('_', 1)[0]
+            if entry.is_file() and entry.stat().st_mtime < cutoff and job_id not in jobs:
+                os.remove(entry.path)
+
+def run_reaper():
+    while True:
+        sleep(app.config['REAPER_INTERVAL'])
+        try:
+            reap_expired_jobs()
+        except Exception as e:
+            log.exception("reaper failed: %s", e)
+
+if is_server_process:
+    threading.Thread(target=run_reaper, daemon=True).start()
+
+job_queue = JobQueue(
+    on_update=update_job,
+    workers=app.config['WORKER_COUNT'],
+    max_queued=app.config['MAX_QUEUED_JOBS'],
+) if is_server_process else None
+
+def job_counts():
+    counts = {}
+    for _, job in jobs.items():
+        counts[(job['status'],)] = counts.get((job['status'],), 0) + 1
+    return counts
+
+metrics.gauge('jobs', 'Jobs in the store by status', labels=('status',), collect=job_counts)
+metrics.gauge('job_queue_depth', 'Jobs waiting for a worker', collect=lambda: job_queue.stats()['queued'])
+metrics.gauge('workers_active', 'Workers running a job', collect=lambda: job_queue.stats()['running'])
+metrics.gauge('workers', 'Worker processes', collect=lambda: job_queue.stats()['workers'])
+metrics.gauge('render_cache_hits_total', 'Slider renders served from the cache', type='counter',
+              collect=lambda: render_cache.hits)
+metrics.gauge('render_cache_misses_total', 'Slider renders drawn and encoded', type='counter',
+              collect=lambda: render_cache.misses)
+metrics.gauge('render_cache_bytes', 'Memory held by cached job images, canvases and PNGs',
+              collect=render_cache.nbytes)
+metrics.gauge('gcode_cache_hits_total', 'G-code downloads served from the cache', type='counter',
+              collect=lambda: gcode_cache.hits)
+metrics.gauge('gcode_cache_misses_total', 'G-code downloads generated', type='counter',
+              collect=lambda: gcode_cache.misses)
+metrics.gauge('gcode_cache_bytes', 'Size of the cached G-code programs', collect=lambda: gcode_cache.size)
+metrics.gauge('result_cache_hits_total', 'Uploads completed from an earlier job with the same image and parameters',
+              type='counter', collect=lambda: result_cache.hits)
+metrics.gauge('result_cache_misses_total', 'Uploads processed', type='counter', collect=lambda: result_cache.misses)
+metrics.gauge('result_cache_bytes', 'Size of the cached contour geometry', collect=lambda: result_cache.size)
+metrics.gauge('frame_store_bytes', 'Decoded upload frames held in memory', collect=lambda: frames.size)
+metrics.gauge('process_resident_memory_bytes', 'Resident memory of the server process',
+              collect=process_resident_bytes)
+metrics.gauge('plotter_queue_depth', 'Prints waiting for the plotter', collect=lambda: len(plotter.status()['queue']))
+metrics.gauge('plotter_lines_per_second', 'Lines per second acknowledged by the plotter for the current print',
+              collect=lambda: (plotter.status()['current'] or {}).get('lines_per_sec', 0.0))
 
 # sanity check route
 @app.route('/ping', methods=['GET'])
@@ -104,6 +468,12 @@ def ping_pong():
 def provide_config():
     return jsonify({
         'allowed_extensions': list(ALLOWED_EXTENSIONS),
+        'edge_backends': list(EDGE_BACKENDS),
+        'sort_modes': list(SORT_KEYS),
+        'default_edge_backend': DEFAULT_BACKEND,
+        'simplify_modes': list(SIMPLIFY_MODES),
+        'default_simplify_mode': app.config['SIMPLIFY_MODE'],
+        'default_tolerance_mm': app.config['SIMPLIFY_TOLERANCE'],
     })
 
 @app.route('/upload', methods=['POST'])
@@ -118,15 +488,53 @@ def handle_upload():
     
     if not allowed_file(file.filename):
         return jsonify({'error': 'File type not allowed'}), 400
-    
+
+    detector = request.form.get('detector', DEFAULT_BACKEND)
+    if detector not in EDGE_BACKENDS:
+        return jsonify({'error': f'Unknown edge detection backend: {detector}'}), 400
+
+    sort_by = request.form.get('sort_by', 'area')
+    if sort_by not in SORT_KEYS:
+        return jsonify({'error': f'Unknown sort mode: {sort_by}'}), 400
+
+    simplify, error = simplify_options(request.form)
+    if error:
+        return jsonify({'error': error}), 400
+
+    # identical uploads with the same parameters are completed from the result cache
+    data = file.read()
+    key = content_key(data, {
+        'detector': detector,
+        'sort_by': sort_by,
+        'simplify': simplify,
+        'min_area': MIN_CONTOUR_AREA,
+    })
+    cached = result_cache.get(key)
+    if cached is None and job_queue.is_full():
+        return queue_full_response()
+
+    in_memory = app.config['INGEST_MODE'] == 'memory'
+    if in_memory:
+        # decoded straight from the request, the worker and the renders never read it from disk
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            return jsonify({'error': 'Could not decode the image'}), 400
+
     # Generate job ID with a radnom file name
     job_id = str(uuid.uuid4())
     filename = secure_filename(file.filename)
     input_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{job_id}_{filename}")
     output_path = os.path.join(app.config['PROCESSED_FOLDER'], f"{job_id}_edges_{filename}")
+    preview_path = os.path.join(app.config['PROCESSED_FOLDER'], f"{job_id}_preview.png")
     
-    # Save uploaded file
-    file.save(input_path)
+    if in_memory:
+        frames.put(job_id, image)
+    if not in_memory or app.config['KEEP_UPLOADS']:
+        # Save uploaded file
+        with open(input_path, 'wb') as f:
+            f.write(data)
+    else:
+        input_path = None
     
     # sanitize and parse slider value (default 100)
     slider_raw = request.form.get('slider')
@@ -145,16 +553,39 @@ def handle_upload():
         'original_filename': filename,
         'input_path': input_path,
         'output_path': output_path,
-        'slider': slider_val
+        'preview_path': preview_path,
+        'slider': slider_val,
+        'detector': detector,
+        'sort_by': sort_by,
+        'simplify': simplify,
+        'content_key': key,
     }
 
-    # log saved slider so you can verify server got it
-    print(f"[{job_id}] Uploaded with slider={slider_val}")
+    log.info("job=%s uploaded slider=%s detector=%s cached=%s", job_id, slider_val, detector, cached is not None)
+
+    if cached is not None:
+        attach_cached_result(job_id, cached)
+        publish_job(job_id)
+        return jsonify({
+            'job_id': job_id,
+            'status': 'completed',
+            'cached_from': cached.job_id,
+            'message': 'Image uploaded successfully, result taken from an identical earlier upload'
+        }), 201
     
-    # Start background processing, use a dummy image output for now
-    thread = threading.Thread(target=apply_edge_detection, args=(input_path, output_path, job_id))
-    thread.daemon = True
-    thread.start()
+    # Queue background processing on the worker pool
+    try:
+        source = frames.handle(job_id) if in_memory else input_path
+        job_queue.submit(job_id, apply_edge_detection, source, output_path, job_id, detector, sort_by, simplify)
+    except QueueFull:
+        del jobs[job_id]
+        frames.discard(job_id)
+        if input_path:
+            os.remove(input_path)
+        return queue_full_response()
+    publish_job(job_id)
+    # rendered here rather than by the worker, so jobs waiting in the queue get one as well
+    preview_pool.submit(build_preview, job_id, image if in_memory else data, preview_path, sort_by, slider_val)
     
     return jsonify({
         'job_id': job_id,
@@ -162,6 +593,101 @@ def handle_upload():
         'message': 'Image uploaded successfully, processing started'
     }), 202
 
+def attach_cached_result(job_id, cached):
+    """Complete a new job with the cached result of an identical upload"""
+    job = jobs[job_id]
+    geometry = cached.geometry()
+    output_path = job['output_path']
+    if not link_artifact(cached.result_path, output_path):
+        # the job that produced it is gone: draw the result again, still without edge detection
+        cv2.imwrite(output_path, draw_polygons(job_image(job_id, job).copy(), geometry.outlines()))
+    jobs.update(job_id, {
+        **cached.fields,
+        'status': 'completed',
+        'progress': 100,
+        'geometry': geometry,
+        'result_path': output_path,
+        'cached_from': cached.job_id,
+        'completed_at': datetime.now().isoformat(),
+    })
+
+def link_artifact(source, target):
+    """Hard-link (or copy) a file of another job, returns False when it is not available"""
+    if os.path.splitext(source)[1].lower() != os.path.splitext(target)[1].lower():
+        return False
+    try:
+        os.link(source, target)
+    except FileNotFoundError:
+        return False
+    except OSError:
+        # no hard links on this file system
+        try:
+            shutil.copyfile(source, target)
+        except OSError:
+            return False
+    return True
+
+def simplify_options(form):
+    """Simplification options of an upload from its form fields, returns (options, error)"""
+    mode = form.get('simplify', app.config['SIMPLIFY_MODE'])
+    if mode not in SIMPLIFY_MODES:
+        return None, f'Unknown simplification mode: {mode}'
+    try:
+        tolerance = float(form.get('tolerance', app.config['SIMPLIFY_TOLERANCE']))
+    except ValueError:
+        return None, 'Tolerance must be a number (mm)'
+    if not tolerance >= 0:
+        return None, 'Tolerance must not be negative'
+    arcs = form.get('arcs')
+    arcs = app.config['SIMPLIFY_ARCS'] if arcs is None else arcs.lower() in ('1', 'true', 'on')
+    return {'mode': mode, 'tolerance': tolerance, 'mm_per_px': app.config['MM_PER_PX'], 'arcs': arcs}, None
+
+def queue_full_response():
+    response = jsonify({'error': 'Too many jobs queued, try again later'})
+    response.headers['Retry-After'] = '5'
+    return response, 503
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running job"""
+    if job_id not in jobs:
+        return jsonify({'error': 'Job not found'}), 404
+
+    job = jobs[job_id]
+    if job['status'] in FINISHED_STATUSES:
+        return jsonify({'error': f"Job already {job['status']}"}), 409
+
+    job_queue.cancel(job_id)
+    if not jobs.update(job_id, {'status': 'cancelled', 'completed_at': datetime.now().isoformat()},
+                       unless=FINISHED_STATUSES):
+        # its worker finished it in the meantime
+        return jsonify({'error': f"Job already {jobs[job_id]['status']}"}), 409
+    jobs_finished.inc(status='cancelled')
+    publish_job(job_id)
+    if job['status'] == 'queued':
+        publish_waiting_jobs()
+
+    return jsonify({'job_id': job_id, 'status': 'cancelled'})
+
+def job_polygons(job_id):
+    """Simplified polygons of a job in its sort order"""
+    geometry = jobs.geometry(job_id)
+    return geometry.outlines() if geometry is not None else []
+
+def request_slider(job, args=None):
+    """Slider value of the request (query string by default), or the one stored with the job, clamped to 1..100"""
+    slider = (request.args if args is None else args).get('slider', type=int)
+    if slider is None:
+        slider = job.get('slider', 100)
+    return max(1, min(100, int(slider)))
+
+def slider_count(total, slider):
+    """Number of polygons shown for a slider value: a percentage of the total contours"""
+    if slider >= 100:
+        return total
+    # round half up (not Python's round half to even) to match sliderCount in the frontend
+    return max(1, int(total * (slider / 100.0) + 0.5))
+
 @app.route('/jobs/<job_id>/render', methods=['GET'])
 def render_with_slider(job_id):
     """Render cached contours with a slider-controlled amount (after processing)."""
@@ -172,73 +698,350 @@ def render_with_slider(job_id):
     if job.get('status') != 'completed':
         return jsonify({'error': 'Job not completed yet'}), 400
 
-    sorted_contours = job.get('sorted_contours')
-    if not sorted_contours:
+    # decoded image and approximated polygons are cached per job
+    state = render_cache.job(job_id, lambda: (job_image(job_id, job), job_polygons(job_id)))
+    if state is None:
+        # e.g. an in-memory frame (INGEST_MODE 'memory') lost with a restart, while the job
+        # store kept the job: the job can no longer be rendered, but it is not a server error
+        return jsonify({'error': 'The uploaded image of this job is gone, upload it again'}), 410
+    if not state.total:
         return jsonify({'error': 'No contours cached for this job'}), 400
 
-    slider = request.args.get('slider', type=int)
-    if slider is None:
-        slider = job.get('slider', 100)
-    # clamp slider
-    slider = max(1, min(100, int(slider)))
-
-    total = len(sorted_contours)
-
-    # Interpret slider 1..100 as percentage of total contours.
-    # slider=None or slider>=100 => show all
-    if slider is None or slider >= 100:
-        n = total
-    elif slider <= 0:
-        n = 1
-    else:
-        # use rounding to avoid losing contours due to truncation
-        n = max(1, int(round(total * (slider / 100.0))))
-
-    print(f"[{job_id}] Rendering with slider={slider}, n={n} of {total} contours.")
+    slider = request_slider(job)
+    total = state.total
+    n = slider_count(total, slider)
 
-    img = cv2.imread(job['input_path'])
-    if img is None:
-        return jsonify({'error': 'Original image missing'}), 500    
+    log.debug("job=%s render slider=%s n=%d total=%d", job_id, slider, n, total)
 
-    # sorted_contours is ascending by area. Show the largest N polygons first:
-    contours_to_draw = sorted_contours[-n:] if n > 0 else []
-    rendered = draw_polygon_outlines(img, contours_to_draw)
-    ok, png = cv2.imencode('.png', rendered)
-    if not ok:
+    # polygons are ascending by the job's sort mode (area by default). Show the largest N:
+    png = render_cache.render(job_id, state, n)
+    if png is None:
         return jsonify({'error': 'Failed to encode image'}), 500
 
     return send_file(
-        BytesIO(png.tobytes()),
+        BytesIO(png),
         mimetype='image/png',
         as_attachment=False,
         download_name=f"render_{job['original_filename']}.png"
     )
  
+@app.route('/jobs/<job_id>/preview', methods=['GET'])
+def download_preview(job_id):
+    """Low resolution preview of a job, available once its status has preview.url"""
+    if job_id not in jobs:
+        return jsonify({'error': 'Job not found'}), 404
+
+    job = jobs[job_id]
+    if (job.get('preview') or {}).get('status') != 'ready':
+        return jsonify({'error': 'No preview for this job yet'}), 400
+    if not os.path.exists(job['preview_path']):
+        return jsonify({'error': 'Preview file not found'}), 404
+
+    return send_file(job['preview_path'], mimetype='image/png', max_age=0)
+
+@app.route('/jobs/<job_id>/polygons', methods=['GET'])
+def download_polygons(job_id):
+    """Simplified polygons of a job in its sort order, for drawing any slider value in the browser.
+
+    Binary by default (see polygon_codec), or an SVG document with ?format=svg. All
+    polygons are sent unless ?slider= limits them to the largest ones like /render.
+    The response is gzipped for clients that accept it.
+    """
+    if job_id not in jobs:
+        return jsonify({'error': 'Job not found'}), 404
+
+    job = jobs[job_id]
+    if job.get('status') != 'completed':
+        return jsonify({'error': 'Job not completed yet'}), 400
+
+    fmt = request.args.get('format', 'binary')
+    if fmt not in ('binary', 'svg'):
+        return jsonify({'error': f'Unknown polygon format: {fmt}'}), 400
+
+    polygons = job_polygons(job_id)
+    if not polygons:
+        return jsonify({'error': 'No contours cached for this job'}), 400
+    total = len(polygons)
+    n = slider_count(total, request_slider(job)) if 'slider' in request.args else total
+    # ascending by the job's sort mode, so the largest N are at the end
+    polygons = polygons[total - n:]
+
+    width, height = job.get('width'), job.get('height')
+    if width is None:
+        # jobs processed before the image size was stored: the polygons' extent
+        extent = np.concatenate([p.reshape(-1, 2) for p in polygons]).max(axis=0) + 1
+        width, height = int(extent[0]), int(extent[1])
+
+    if fmt == 'svg':
+        body, mimetype = polygons_svg(polygons, width, height).encode('utf-8'), 'image/svg+xml'
+    else:
+        body, mimetype = encode_polygons(polygons, width, height), 'application/octet-stream'
+
+    response = Response(body, mimetype=mimetype)
+    if 'gzip' in request.accept_encodings:
+        response.set_data(gzip.compress(body, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Vary'] = 'Accept-Encoding'
+    # a finished job's polygons never change
+    response.set_etag(f'{job_id}-{fmt}-{n}-{response.headers.get("Content-Encoding", "identity")}')
+    return response.make_conditional(request)
+
+def gcode_options(args):
+    """G-code parameters and travel optimization flag of a request, returns (params, optimize, error)"""
+    params = {}
+    for name, default in GCODE_PARAMS.items():
+        value = args.get(name)
+        if value is None:
+            params[name] = default
+            continue
+        try:
+            params[name] = float(value)
+        except ValueError:
+            return None, False, f'{name} must be a number'
+        if not np.isfinite(params[name]) or (name.startswith(('feed', 'travel')) and params[name] <= 0):
+            return None, False, f'Invalid value for {name}: {value}'
+    optimize = args.get('optimize', '0').lower() in ('1', 'true', 'on')
+    return params, optimize, None
+
+def job_toolpaths(job_id, n):
+    """(paths, ids, arcs) of the n largest polygons of a job, straight from its geometry"""
+    geometry = jobs.geometry(job_id)
+    total = len(geometry)
+    paths, arcs = geometry.select(np.arange(total - n, total)).toolpaths()
+    # polygon IDs are the positions in the job's sort order
+    ids = list(range(total - n, total))
+    return paths, ids, arcs if any(len(a) for a in arcs) else None
+
+def optimize_order(job_id, paths, ids):
+    """Reorder closed toolpaths for less pen-up travel, returns (paths, ids); cached per polygon count"""
+    def compute():
+        ordered, ordered_ids, travel = optimize_travel(paths, ids, closed=True,
+                                                       time_limit=app.config['OPTIMIZE_TIME_LIMIT'])
+        log.info("job=%s travel_before=%.1f travel_after=%.1f", job_id, travel['travel_before'],
+                 travel['travel_after'])
+        return ordered, ordered_ids
+    return gcode_cache.order((job_id, len(ids)), compute)
+
+def generate_gcode(job_id, n, params, optimize):
+    """G-code chunks for the n largest polygons of a job"""
+    paths, ids, arcs = job_toolpaths(job_id, n)
+    if optimize:
+        (paths, ids), arcs = optimize_order(job_id, paths, ids), None
+    return iter_gcode_chunks(paths, ids, vectorized=True, arcs=arcs, **params)
+
+def gcode_request(job, args):
+    """Validate a G-code request of a job, returns (n, slider, params, optimize, error response)"""
+    total = job.get('contour_count', 0)
+    if not total:
+        return None, None, None, False, (jsonify({'error': 'No contours cached for this job'}), 400)
+
+    params, optimize, error = gcode_options(args)
+    if error:
+        return None, None, None, False, (jsonify({'error': error}), 400)
+    # reordering rotates and reverses the closed loops, which the arc rows do not follow
+    if optimize and (job.get('simplification') or {}).get('arcs'):
+        error = 'Travel optimization is not available for jobs with arcs'
+        return None, None, None, False, (jsonify({'error': error}), 400)
+
+    slider = request_slider(job, args)
+    return slider_count(total, slider), slider, params, optimize, None
+
+@app.route('/jobs/<job_id>/gcode', methods=['GET'])
+def download_gcode(job_id):
+    """Stream the G-code of a job's polygons, with a slider-controlled amount like /render"""
+    if job_id not in jobs:
+        return jsonify({'error': 'Job not found'}), 404
+
+    job = jobs[job_id]
+    if job.get('status') != 'completed':
+        return jsonify({'error': 'Job not completed yet'}), 400
+
+    n, slider, params, optimize, error = gcode_request(job, request.args)
+    if error:
+        return error
+    log.info("job=%s gcode slider=%s n=%d optimize=%s", job_id, slider, n, optimize)
+
+    key = (job_id, n, tuple(params.values()), optimize)
+    chunks = gcode_cache.stream(key, lambda: generate_gcode(job_id, n, params, optimize))
+    name = os.path.splitext(job['original_filename'])[0]
+    return Response(chunks, mimetype='text/plain', headers={
+        'Content-Disposition': f'attachment; filename="{name}_{slider}.gcode"',
+    })
+
+@app.route('/jobs/<job_id>/print', methods=['POST'])
+def print_job(job_id):
+    """Queue a job's G-code for the plotter, with the same parameters as /gcode"""
+    if job_id not in jobs:
+        return jsonify({'error': 'Job not found'}), 404
+
+    job = jobs[job_id]
+    if job.get('status') != 'completed':
+        return jsonify({'error': 'Job not completed yet'}), 400
+
+    n, slider, params, optimize, error = gcode_request(job, request.values)
+    if error:
+        return error
+
+    paths, ids, arcs = job_toolpaths(job_id, n)
+
+    def source():
+        # runs while the print before it is plotting; the lines are generated as they are sent
+        if optimize:
+            ordered_paths, ordered_ids = optimize_order(job_id, paths, ids)
+            return iter_gcode_lines(ordered_paths, ordered_ids, vectorized=True, **params)
+        return iter_gcode_lines(paths, ids, vectorized=True, arcs=arcs, **params)
+
+    try:
+        # lift the pen to this print's z_safe if it is aborted
+        safe_state = (f"G0 Z{params['z_safe']:.3f}",)
+        entry = plotter.submit(job_id, job['original_filename'], source, gcode_line_count(paths, ids), safe_state)
+    except QueueFull:
+        response = jsonify({'error': 'Too many prints queued, try again later'})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+    log.info("job=%s print=%s queued slider=%s n=%d lines=%d", job_id, entry.id, slider, n, entry.total)
+
+    return jsonify({
+        'print_id': entry.id,
+        'status': entry.status,
+        'queue_position': plotter.position(entry.id),
+        'total': entry.total,
+    }), 202
+
+@app.route('/plotter', methods=['GET'])
+def plotter_status():
+    """Current print with line number, throughput and ETA, the print queue and recent prints"""
+    return jsonify(plotter.status())
+
+@app.route('/plotter/events', methods=['GET'])
+def plotter_events():
+    """Server-sent events with the plotter status, sent whenever it changes"""
+    def stream():
+        while True:
+            status = plotter.status()
+            yield f"data: {json.dumps(status)}\n\n"
+            plotter.wait(status['version'], app.config['EVENT_KEEPALIVE'])
+
+    return Response(stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+@app.route('/plotter/pause', methods=['POST'])
+def pause_plotter():
+    plotter.pause()
+    return jsonify(plotter.status())
+
+@app.route('/plotter/resume', methods=['POST'])
+def resume_plotter():
+    plotter.resume()
+    return jsonify(plotter.status())
+
+@app.route('/plotter/abort', methods=['POST'])
+def abort_print():
+    """Abort the running print, or the print given by print_id (also when still queued)"""
+    print_id = request.values.get('print_id')
+    if not plotter.abort(print_id):
+        return jsonify({'error': 'Print not found'}), 404
+    return jsonify(plotter.status())
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Server metrics in the Prometheus text format"""
+    return Response(metrics.render(), content_type=metrics.content_type)
+
 @app.route('/jobs/<job_id>/status', methods=['GET'])
 def get_job_status(job_id):
-    """Get processing status of a job"""
+    """Get processing status of a job.
+
+    Long-poll with ?wait=<seconds>: the response is held until the job's status
+    version differs from ?since=<version> (by default the current one), at most
+    MAX_LONG_POLL seconds. Finished jobs answer right away.
+    """
     if job_id not in jobs:
         return jsonify({'error': 'Job not found'}), 404
 
-    job = jobs[job_id]
+    wait = request.args.get('wait', type=float)
+    version, _ = events.latest(job_id)
+    if wait and jobs[job_id]['status'] not in FINISHED_STATUSES:
+        since = request.args.get('since', version, type=int)
+        version, _ = events.wait(job_id, since, min(wait, app.config['MAX_LONG_POLL']))
+        if job_id not in jobs:
+            return jsonify({'error': 'Job not found'}), 404
+
+    return jsonify({**job_status(job_id, jobs[job_id]), 'version': version})
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """Server-sent events with the status of a job, sent whenever it changes; ends once the job is finished"""
+    if job_id not in jobs:
+        return jsonify({'error': 'Job not found'}), 404
+    version, status = events.latest(job_id)
+    if status is None:
+        status = job_status(job_id, jobs[job_id])
+
+    def stream():
+        nonlocal version, status
+        while True:
+            yield f"id: {version}\ndata: {json.dumps({**status, 'version': version})}\n\n"
+            if status['status'] in FINISHED_STATUSES:
+                return
+            seen = version
+            while True:
+                version, event = events.wait(job_id, seen, app.config['EVENT_KEEPALIVE'])
+                if version != seen:
+                    break
+                if job_id not in jobs:
+                    return
+                yield ": keepalive\n\n"
+            if event is None:
+                # the job was removed
+                return
+            status = event
+
+    return Response(stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+def job_status(job_id, job):
+    """Status response of a job record"""
     response = {
         'job_id': job_id,
         'status': job['status'],
         'progress': job['progress'],
         'created_at': job['created_at'],
-        'contour_count': job.get('contour_count', 0),  # <-- added
-        'slider': job.get('slider', 100)
+        'contour_count': job.get('contour_count', 0),
+        'slider': job.get('slider', 100),
+        'detector': job.get('detector', DEFAULT_BACKEND),
+        'sort_by': job.get('sort_by', 'area'),
+        'simplify': job.get('simplify')
     }
     
-    if job['status'] == 'completed':
+    if job.get('preview'):
+        # the coarse pass; the fields above and below describe the full resolution pass
+        response['preview'] = dict(job['preview'])
+        if job['preview']['status'] == 'ready':
+            response['preview']['url'] = f'/jobs/{job_id}/preview'
+
+    if job['status'] == 'queued':
+        response['queue_position'] = job_queue.position(job_id)
+    elif job['status'] == 'processing':
+        response['stage'] = job.get('stage')
+        response['eta'] = job.get('eta')
+        response['timings'] = job.get('timings', {})
+    elif job['status'] == 'completed':
         # point frontend to the render endpoint and include the stored slider
         response['download_url'] = f'/jobs/{job_id}/render?slider={job.get("slider", 100)}'
+        # the stored slider unless the client adds the one it shows
+        response['gcode_url'] = f'/jobs/{job_id}/gcode'
+        response['polygons_url'] = f'/jobs/{job_id}/polygons'
         response['completed_at'] = job['completed_at']
+        response['simplification'] = job.get('simplification')
+        response['timings'] = job.get('timings', {})
+        response['cached_from'] = job.get('cached_from')
+        response['peak_rss'] = job.get('peak_rss')
     elif job['status'] == 'failed':
         response['error'] = job['error']
         response['completed_at'] = job['completed_at']
+    elif job['status'] == 'cancelled':
+        response['completed_at'] = job['completed_at']
     
-    return jsonify(response)
+    return response
 
 @app.route('/jobs/<job_id>/download', methods=['GET'])
 def download_result(job_id):
@@ -0,0 +1,281 @@
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from serial.serialutil import SerialException
+
+from arduino_interface import RX_BUFFER_SIZE
+from job_queue import QueueFull
+
+log = logging.getLogger(__name__)
+
+# Finished prints kept for status()
+MAX_HISTORY = 20
+# Seconds between progress notifications while printing, and the window throughput is measured over
+PROGRESS_INTERVAL = 0.25
+THROUGHPUT_WINDOW = 5.0
+# Sent after an aborted print so the pen does not stay down: a lift to gCode.iter_gcode's default z_safe
+SAFE_STATE = ('G0 Z100.000',)
+
+
+class PrintJob:
+    """One print in the plotter queue.
+
+    source() returns the print's G-code lines as an iterable; it is called once,
+    ahead of time (see PlotterManager), and may do the expensive preparation
+    eagerly as long as the lines themselves are generated lazily.
+    """
+
+    def __init__(self, job_id, name, source, total, safe_state=SAFE_STATE):
+        self.id = str(uuid.uuid4())
+        self.job_id = job_id
+        self.name = name
+        self.total = total
+        self.safe_state = safe_state
+        self.status = 'queued'
+        self.line = 0
+        self.error = None
+        self.created_at = datetime.now().isoformat()
+        self.started_at = None
+        self.finished_at = None
+        self.abort = threading.Event()
+        self._source = source
+        self._lines = None
+        self._prepare_lock = threading.Lock()
+        self.prefetching = False
+        # (monotonic time, line) samples for throughput
+        self._samples = deque()
+
+    def prepare(self):
+        """Call source() once; concurrent callers wait for the first one."""
+        with self._prepare_lock:
+            if self._lines is None:
+                self._lines = self._source()
+            return self._lines
+
+    def progress(self, line, now):
+        self.line = line
+        self._samples.append((now, line))
+        while len(self._samples) > 2 and now - self._samples[0][0] > THROUGHPUT_WINDOW:
+            self._samples.popleft()
+
+    def lines_per_sec(self, now):
+        """Throughput over the last THROUGHPUT_WINDOW seconds; it decays while no lines are acked (paused)."""
+        if len(self._samples) < 2 or now - self._samples[-1][0] > THROUGHPUT_WINDOW:
+            return 0.0
+        (t0, l0), (_, l1) = self._samples[0], self._samples[-1]
+        return (l1 - l0) / (now - t0) if now > t0 else 0.0
+
+    def to_dict(self):
+        rate = self.lines_per_sec(time.monotonic()) if self.status == 'printing' else 0.0
+        remaining = max(self.total - self.line, 0)
+        return {
+            'print_id': self.id,
+            'job_id': self.job_id,
+            'name': self.name,
+            'status': self.status,
+            'line': self.line,
+            'total': self.total,
+            'progress': round(100 * self.line / self.total, 1) if self.total else 0.0,
+            'lines_per_sec': round(rate, 1),
+            'eta': round(remaining / rate, 1) if rate > 0 else None,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class PlotterManager:
+    """Owns the plotter connection and prints a FIFO of print jobs on it, one after another.
+
+    connect() -> ArduinoInterface opens the connection before the first print;
+    it is opened again for the next print after a serial error. Prints are
+    streamed with ArduinoInterface.stream_gcode from a daemon thread, started on
+    the first submit. While a print runs, the next one in line is prepared on a
+    single background thread, so the plotter goes straight on with it. An aborted
+    print is followed by its safe_state lines (SAFE_STATE unless given to submit()),
+    which lift the pen.
+
+    Every change (queue, state, progress at most every PROGRESS_INTERVAL seconds)
+    increments version; wait() blocks until it moves, for streaming the status to
+    clients. on_stream(stats), when given, receives the stats of every
+    ArduinoInterface.stream_gcode run.
+    """
+
+    def __init__(self, connect, rx_buffer=RX_BUFFER_SIZE, max_queued=16, on_stream=None):
+        self.connect = connect
+        self.on_stream = on_stream
+        self.rx_buffer = rx_buffer
+        self.max_queued = max_queued
+        self.version = 0
+        self.error = None
+        self.current = None
+        self._queue = deque()
+        self._history = deque(maxlen=MAX_HISTORY)
+        self._cond = threading.Condition()
+        self._running = threading.Event()
+        self._running.set()
+        self._con = None
+        self._thread = None
+        self._prefetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix='plotter-prefetch')
+
+    def _notify(self):
+        """Record a change; call with the lock held."""
+        self.version += 1
+        self._cond.notify_all()
+
+    def submit(self, job_id, name, source, total, safe_state=SAFE_STATE):
+        """Queue a print of total G-code lines from source(), raises QueueFull when at capacity."""
+        with self._cond:
+            if len(self._queue) >= self.max_queued:
+                raise QueueFull(job_id)
+            job = PrintJob(job_id, name, source, total, safe_state)
+            self._queue.append(job)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._prefetch()
+            self._notify()
+        return job
+
+    def _prefetch(self):
+        """Prepare the next print while the current one is running; call with the lock held."""
+        if self.current is not None and self._queue and not self._queue[0].prefetching:
+            self._queue[0].prefetching = True
+            self._prefetcher.submit(self._queue[0].prepare)
+
+    def position(self, print_id):
+        """1-based position of a waiting print, or None if it is not waiting."""
+        with self._cond:
+            for i, job in enumerate(self._queue):
+                if job.id == print_id:
+                    return i + 1
+        return None
+
+    def pause(self):
+        """Stop sending lines; the lines already sent are still executed."""
+        with self._cond:
+            self._running.clear()
+            self._notify()
+
+    def resume(self):
+        with self._cond:
+            self._running.set()
+            self._notify()
+
+    def abort(self, print_id=None):
+        """Abort the running print (or the given one, dropping it from the queue if waiting).
+
+        Returns False when there is no such print.
+        """
+        with self._cond:
+            if self.current is not None and print_id in (None, self.current.id):
+                self.current.abort.set()
+                self._notify()
+                return True
+            for job in self._queue:
+                if job.id == print_id:
+                    self._queue.remove(job)
+                    self._finish(job, 'aborted')
+                    return True
+        return False
+
+    def status(self):
+        with self._cond:
+            return {
+                'version': self.version,
+                'connected': self._con is not None,
+                'paused': not self._running.is_set(),
+                'error': self.error,
+                'current': self.current.to_dict() if self.current else None,
+                'queue': [job.to_dict() for job in self._queue],
+                'history': [job.to_dict() for job in reversed(self._history)],
+            }
+
+    def wait(self, version, timeout):
+        """Block until version differs from the given one or timeout passes; returns the current version."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def _finish(self, job, status, error=None):
+        """Move a print to the history; call with the lock held."""
+        job.status = status
+        job.error = error
+        job.finished_at = datetime.now().isoformat()
+        if status == 'completed':
+            job.line = job.total
+        self._history.append(job)
+        self._notify()
+
+    def _connection(self):
+        if self._con is None:
+            self._con = self.connect()
+            self.error = None
+        return self._con
+
+    def _disconnect(self, error):
+        if self._con is not None:
+            try:
+                self._con.ser.close()
+            except (SerialException, OSError):
+                pass
+        self._con = None
+        self.error = error
+
+    def _park(self, con, job):
+        """Send the safe state after an aborted print, also while paused."""
+        stats = con.stream_gcode(list(job.safe_state), rx_buffer=self.rx_buffer)
+        if not stats['ok']:
+            log.warning("job=%s print=%s safe state not acknowledged: %s", job.job_id, job.id, stats['error'])
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue)
+                job = self.current = self._queue.popleft()
+                job.status = 'printing'
+                job.started_at = datetime.now().isoformat()
+                job.progress(0, time.monotonic())
+                self._prefetch()
+                self._notify()
+
+            last = 0.0
+
+            def on_progress(line, _):
+                nonlocal last
+                now = time.monotonic()
+                with self._cond:
+                    job.progress(line, now)
+                    if now - last >= PROGRESS_INTERVAL:
+                        last = now
+                        self._notify()
+
+            try:
+                con = self._connection()
+                stats = con.stream_gcode(job.prepare(), rx_buffer=self.rx_buffer, on_progress=on_progress,
+                                         running=self._running, abort=job.abort)
+                if self.on_stream:
+                    self.on_stream(stats)
+                if job.abort.is_set() and job.safe_state:
+                    self._park(con, job)
+                status = 'completed' if stats['ok'] else 'aborted' if job.abort.is_set() else 'failed'
+                error = None if stats['ok'] or job.abort.is_set() else stats['error']
+            except (SerialException, OSError) as e:
+                status, error = 'failed', f"Plotter connection failed: {e}"
+                with self._cond:
+                    self._disconnect(error)
+            except Exception as e:
+                status, error = 'failed', str(e)
+
+            log.log(logging.WARNING if error else logging.INFO,
+                    "job=%s print=%s status=%s line=%d total=%d error=%s",
+                    job.job_id, job.id, status, job.line, job.total, error)
+            with self._cond:
+                self.current = None
+                self._finish(job, status, error)
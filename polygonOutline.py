@@ -1,5 +1,18 @@
 import numpy as np
 import cv2
+from contour_geometry import EPSILON_RATIO
+
+OUTLINE_COLOR = (255, 0, 255)
+OUTLINE_THICKNESS = 2
+
+def approximate_polygons(contours):
+    return [cv2.approxPolyDP(cnt, EPSILON_RATIO * cv2.arcLength(cnt, True), True) for cnt in contours]
+
+def draw_polygons(img, polygons):
+    """Draw already approximated polygons onto img in place"""
+    if len(polygons):
+        cv2.drawContours(img, polygons, -1, OUTLINE_COLOR, OUTLINE_THICKNESS)
+    return img
 
 def draw_polygon_outlines(img, contours):
 
@@ -8,11 +21,7 @@ def draw_polygon_outlines(img, contours):
 
     img_copy = img.copy()
 
-    for cnt in contours:
-        approx = cv2.approxPolyDP(cnt, 0.0005 * cv2.arcLength(cnt, True), True)
-        cv2.drawContours(img_copy, [approx], 0, (255, 0, 255), 2)
-
-    return img_copy
+    return draw_polygons(img_copy, approximate_polygons(contours))
 
 # result = draw_polygon_outlines(img, contours)
 # cv2.imshow('Polygon Outlines', img)
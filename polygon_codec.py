@@ -0,0 +1,66 @@
+import struct
+
+import numpy as np
+
+from polygonOutline import OUTLINE_COLOR, OUTLINE_THICKNESS
+
+# Binary polygon format of /jobs/<id>/polygons, all little-endian:
+#   header   magic b'HPLY', u16 version, u8 bytes per delta (2 or 4), u8 flags (0),
+#            u32 width, u32 height, u32 polygon count P, u32 vertex count V
+#   offsets  u32[P + 1], index of the first vertex of every polygon, then V
+#   deltas   int16 or int32 [V * 2], x/y of every vertex minus the one before it
+#            (across polygon boundaries, the first one relative to 0, 0)
+# A prefix sum over the deltas gives the vertices. The offsets start on a 4-byte and
+# the deltas on a 2- or 4-byte boundary, so both can be read as typed arrays in place.
+POLYGON_MAGIC = b'HPLY'
+POLYGON_VERSION = 1
+_HEADER = struct.Struct('<4sHBBIIII')
+# HEADER_SIZE in hydrawlics-frontend/src/polygons.ts
+POLYGON_HEADER_SIZE = _HEADER.size
+
+
+def encode_polygons(polygons, width=0, height=0):
+    """Pack polygons (arrays of x, y vertices, e.g. OpenCV contours) into the binary format."""
+    lengths = np.fromiter((len(p) for p in polygons), dtype=np.int64, count=len(polygons))
+    offsets = np.zeros(len(polygons) + 1, dtype='<u4')
+    offsets[1:] = np.cumsum(lengths)
+    if lengths.sum():
+        points = np.concatenate([np.asarray(p).reshape(-1, 2) for p in polygons if len(p)]).astype(np.int64)
+    else:
+        points = np.zeros((0, 2), dtype=np.int64)
+    deltas = np.diff(points, axis=0, prepend=np.zeros((1, 2), dtype=np.int64))
+    small = not len(deltas) or np.abs(deltas).max() <= np.iinfo(np.int16).max
+    deltas = deltas.astype('<i2' if small else '<i4')
+    header = _HEADER.pack(POLYGON_MAGIC, POLYGON_VERSION, deltas.itemsize, 0, width, height,
+                          len(polygons), len(points))
+    return header + offsets.tobytes() + deltas.tobytes()
+
+
+def decode_polygons(blob):
+    """(polygons, width, height) of a blob written by encode_polygons; polygons are (k, 2) int32 arrays."""
+    magic, version, size, _, width, height, count, vertices = _HEADER.unpack_from(blob)
+    if magic != POLYGON_MAGIC or version != POLYGON_VERSION:
+        raise ValueError("Not a polygon blob of a supported version")
+    offsets = np.frombuffer(blob, dtype='<u4', count=count + 1, offset=_HEADER.size)
+    deltas = np.frombuffer(blob, dtype='<i2' if size == 2 else '<i4', count=vertices * 2,
+                           offset=_HEADER.size + offsets.nbytes)
+    points = np.cumsum(deltas.reshape(-1, 2), axis=0, dtype=np.int64).astype(np.int32)
+    if not count:
+        return [], width, height
+    return np.split(points, offsets[1:-1].astype(np.int64)), width, height
+
+
+def polygons_svg(polygons, width, height, color=OUTLINE_COLOR, thickness=OUTLINE_THICKNESS):
+    """SVG document with the polygons as closed outlines, drawn like the PNG renders."""
+    b, g, r = color
+    subpaths = []
+    for polygon in polygons:
+        points = np.asarray(polygon).reshape(-1, 2)
+        if len(points):
+            # after M, further coordinate pairs are implicit line-tos
+            subpaths.append('M' + ' '.join(f'{x} {y}' for x, y in points.tolist()) + 'Z')
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" width="{width}" height="{height}">'
+        f'<path fill="none" stroke="#{r:02x}{g:02x}{b:02x}" stroke-width="{thickness}" stroke-linejoin="round" '
+        f'd="{"".join(subpaths)}"/></svg>'
+    )
@@ -0,0 +1,55 @@
+import time
+from contextlib import contextmanager
+
+# Minimum seconds between two progress reports from inside a stage
+REPORT_INTERVAL = 0.1
+
+
+class ProgressTracker:
+    """Progress of a job that runs as a sequence of weighted stages.
+
+    stages maps stage names, in order, to their estimated share of the run time.
+    Inside `with tracker.stage(name) as progress:` the stage reports its own
+    fraction complete with progress(fraction); the tracker turns that into the
+    job's overall progress (0..100), an ETA from the elapsed time, and the
+    duration of every finished stage, and passes them to report(**fields)
+    (e.g. job_queue.report for a job). Reports from inside a stage are rate
+    limited to one per REPORT_INTERVAL seconds.
+    """
+
+    def __init__(self, stages, report):
+        self.report = report
+        self.timings = {}
+        self.stage_name = None
+        total = sum(stages.values())
+        self._spans = {}
+        done = 0
+        for name, weight in stages.items():
+            self._spans[name] = (done / total, weight / total)
+            done += weight
+        self._start = time.monotonic()
+        self._last = 0.0
+
+    @contextmanager
+    def stage(self, name):
+        started = time.monotonic()
+        self.stage_name = name
+        self.update(0.0, force=True)
+        yield self.update
+        self.timings[name] = round(time.monotonic() - started, 4)
+
+    def update(self, fraction, force=False):
+        """Report the current stage as fraction (0..1) complete."""
+        now = time.monotonic()
+        if not force and now - self._last < REPORT_INTERVAL:
+            return
+        self._last = now
+        offset, share = self._spans[self.stage_name]
+        done = offset + share * min(max(fraction, 0.0), 1.0)
+        elapsed = now - self._start
+        self.report(
+            progress=int(100 * done),
+            stage=self.stage_name,
+            timings=dict(self.timings),
+            eta=round(elapsed * (1 - done) / done, 2) if done > 0 else None,
+        )
@@ -0,0 +1,122 @@
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+
+from polygonOutline import draw_polygons
+
+# Fast PNG compression; slider renders are short-lived and encoding time dominates
+PNG_PARAMS = [cv2.IMWRITE_PNG_COMPRESSION, 1]
+
+
+class JobRender:
+    """Decoded image and simplified polygons (in the job's sort order) of one job."""
+
+    def __init__(self, image, polygons):
+        if len(image.shape) == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        self.image = image
+        self.polygons = polygons
+        self.total = len(self.polygons)
+
+
+class RenderCache:
+    """Caches for /jobs/<id>/render.
+
+    Three LRU layers: per-job decoded image + simplified polygons, encoded PNGs keyed by
+    (job, n), and drawn canvases keyed by (job, n). A render of the largest n
+    polygons starts from the cached canvas with the nearest lower n and only
+    draws the additional (smaller) polygons on top of it. All outlines share one
+    colour, so the drawing order does not change the result.
+
+    on_timing(step, seconds), when given, receives the time spent drawing ('draw')
+    and encoding ('imencode') every render that is not served from the cache.
+    """
+
+    def __init__(self, max_jobs=4, max_canvases=8, max_renders=64, on_timing=None):
+        self.max_jobs = max_jobs
+        self.on_timing = on_timing
+        self.max_canvases = max_canvases
+        self.max_renders = max_renders
+        self._jobs = OrderedDict()
+        self._canvases = OrderedDict()
+        self._renders = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _put(cache, key, value, limit):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > limit:
+            cache.popitem(last=False)
+
+    def job(self, job_id, load):
+        """Cached JobRender for job_id; load() -> (image, polygons) is called on a miss.
+
+        Returns None when load() cannot provide the image.
+        """
+        with self._lock:
+            state = self._jobs.get(job_id)
+            if state is not None:
+                self._jobs.move_to_end(job_id)
+                return state
+        image, polygons = load()
+        if image is None:
+            return None
+        state = JobRender(image, polygons)
+        with self._lock:
+            self._put(self._jobs, job_id, state, self.max_jobs)
+        return state
+
+    def render(self, job_id, state, n):
+        """PNG bytes of the image with the n largest polygons of state drawn on it."""
+        key = (job_id, n)
+        with self._lock:
+            png = self._renders.get(key)
+            if png is not None:
+                self.hits += 1
+                self._renders.move_to_end(key)
+                return png
+            self.misses += 1
+            # nearest cached canvas below n for this job
+            base_n = max((cn for cid, cn in self._canvases if cid == job_id and cn <= n), default=None)
+            base = self._canvases[(job_id, base_n)] if base_n is not None else None
+
+        started = time.perf_counter()
+        if base is None:
+            base_n, canvas = 0, state.image.copy()
+        else:
+            canvas = base.copy()
+        # polygons are in ascending sort order, the n largest are the last n
+        draw_polygons(canvas, state.polygons[state.total - n:state.total - base_n])
+        drawn = time.perf_counter()
+
+        ok, encoded = cv2.imencode('.png', canvas, PNG_PARAMS)
+        if self.on_timing:
+            self.on_timing('draw', drawn - started)
+            self.on_timing('imencode', time.perf_counter() - drawn)
+        if not ok:
+            return None
+        png = encoded.tobytes()
+        with self._lock:
+            self._put(self._canvases, key, canvas, self.max_canvases)
+            self._put(self._renders, key, png, self.max_renders)
+        return png
+
+    def nbytes(self):
+        """Memory held by the cached images, canvases and PNGs."""
+        with self._lock:
+            return (sum(state.image.nbytes for state in self._jobs.values())
+                    + sum(canvas.nbytes for canvas in self._canvases.values())
+                    + sum(len(png) for png in self._renders.values()))
+
+    def discard(self, job_id):
+        """Forget everything cached for a job."""
+        with self._lock:
+            self._jobs.pop(job_id, None)
+            for cache in (self._canvases, self._renders):
+                for key in [key for key in cache if key[0] == job_id]:
+                    del cache[key]
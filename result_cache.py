@@ -0,0 +1,72 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from contour_geometry import ContourGeometry
+
+
+def content_key(data, params):
+    """Cache key of an upload: SHA-256 of its bytes and its processing parameters."""
+    digest = hashlib.sha256(data)
+    digest.update(json.dumps(params, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class CachedResult:
+    """Outcome of processing one (image, parameters) pair, shared by every job that uploads it."""
+
+    def __init__(self, job_id, fields, blob, result_path):
+        # job that computed it, and where it wrote the rendered result
+        self.job_id = job_id
+        self.fields = fields
+        self.blob = blob
+        self.result_path = result_path
+
+    def geometry(self):
+        return ContourGeometry.unpack(self.blob)
+
+
+class ResultCache:
+    """Results of finished jobs keyed by content_key, so identical uploads skip processing.
+
+    Entries keep the contour geometry as a packed blob (see ContourGeometry.pack)
+    next to the job fields to copy; the LRU is bounded by the total size of the
+    blobs. The rendered result stays on disk with the job that produced it.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            result = self._results.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._results.move_to_end(key)
+            return result
+
+    def put(self, key, job_id, fields, geometry, result_path):
+        blob = geometry.pack()
+        if len(blob) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._results.pop(key, None)
+            if old is not None:
+                self.size -= len(old.blob)
+            self._results[key] = CachedResult(job_id, fields, blob, result_path)
+            self.size += len(blob)
+            while self.size > self.max_bytes:
+                _, dropped = self._results.popitem(last=False)
+                self.size -= len(dropped.blob)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._results)
@@ -0,0 +1,347 @@
+import heapq
+import math
+
+import numpy as np
+
+# Simplification algorithms of simplify_polyline
+SIMPLIFY_MODES = ('douglas-peucker', 'visvalingam')
+DEFAULT_MODE = 'douglas-peucker'
+
+# Tolerance in millimetres on the plotter, and the size of one image pixel there.
+# gCode.py writes pixel coordinates as millimetres, hence 1.0.
+DEFAULT_TOLERANCE_MM = 0.5
+DEFAULT_MM_PER_PX = 1.0
+
+# An arc replaces at least this many segments of the simplified polyline
+ARC_MIN_SEGMENTS = 3
+# Maximum distance between an arc and the chords drawn in its place for previews (px)
+ARC_PREVIEW_ERROR = 0.25
+
+
+def _offsets(lengths):
+    """Start index of every polyline in the concatenated points."""
+    return np.cumsum(lengths) - lengths
+
+
+def _merge_collinear_mask(pts, lengths, closed=True):
+    """merge_collinear for polylines concatenated in pts, as a keep mask."""
+    n = len(pts)
+    starts = _offsets(lengths)
+    first = np.repeat(starts, lengths)
+    last = first + np.repeat(lengths, lengths) - 1
+    index = np.arange(n)
+    incoming = pts - pts[np.where(index == first, last, index - 1)]
+    outgoing = pts[np.where(index == last, first, index + 1)] - pts
+    cross = incoming[:, 0] * outgoing[:, 1] - incoming[:, 1] * outgoing[:, 0]
+    straight = (np.abs(cross) <= 1e-9) & ((incoming * outgoing).sum(axis=1) > 0)
+    repeated = ~incoming.any(axis=1)
+    keep = ~(straight | repeated) | np.repeat(lengths < 3, lengths)
+    if not closed:
+        keep[starts] = keep[starts + lengths - 1] = True
+    # a polyline of one repeated point keeps that point
+    keep[starts[np.add.reduceat(keep, starts) == 0]] = True
+    return keep
+
+
+def merge_collinear(points, closed=True):
+    """Drop repeated points and points in the middle of straight runs (exact, no tolerance)."""
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(pts) < 3:
+        return np.arange(len(pts))
+    return np.flatnonzero(_merge_collinear_mask(pts, np.array([len(pts)]), closed))
+
+
+def _douglas_peucker_segments(pts, a, b, tolerance, keep):
+    """Run Douglas-Peucker between every pair of vertices a[k] < b[k] of pts, marking the kept
+    vertices in keep. All segments are processed at once, one level of the recursion at a time."""
+    while len(a):
+        inner = b - a - 1
+        split = inner > 0
+        a, b, inner = a[split], b[split], inner[split]
+        if not len(a):
+            break
+        group = np.cumsum(inner) - inner
+        seg = np.repeat(np.arange(len(a)), inner)
+        index = np.arange(inner.sum()) - group[seg] + a[seg] + 1
+        start = pts[a[seg]]
+        ab = pts[b[seg]] - start
+        ap = pts[index] - start
+        length2 = (ab * ab).sum(axis=1)
+        t = np.clip((ap * ab).sum(axis=1) / np.where(length2 == 0, 1, length2), 0.0, 1.0)
+        d = np.hypot(*(pts[index] - (start + t[:, None] * ab)).T)
+        dmax = np.maximum.reduceat(d, group)
+        # first vertex at the maximum distance of every segment
+        hits = np.flatnonzero(d == dmax[seg])
+        _, first = np.unique(seg[hits], return_index=True)
+        split = dmax > tolerance
+        m = index[hits[first]][split]
+        keep[m] = True
+        a, b = np.concatenate([a[split], m]), np.concatenate([m, b[split]])
+
+
+def _douglas_peucker_mask(pts, lengths, tolerance, closed=True):
+    """douglas_peucker for polylines concatenated in pts, as a keep mask."""
+    starts = _offsets(lengths)
+    keep = np.repeat(lengths < 3, lengths)
+    keep[starts] = True
+    big = np.flatnonzero(lengths >= 3)
+    if not len(big):
+        return keep
+    if not closed:
+        ends = starts + lengths - 1
+        keep[ends] = True
+        _douglas_peucker_segments(pts, starts[big], ends[big], tolerance, keep)
+        return keep
+
+    # close every loop with a copy of its first point: point i of loop k is at i + k
+    ext = np.insert(pts, starts + lengths, pts[starts], axis=0)
+    ext_starts = starts + np.arange(len(lengths))
+    # split each loop at its first point and the point furthest from it
+    d = np.hypot(*(pts - np.repeat(pts[starts], lengths, axis=0)).T)
+    dmax = np.maximum.reduceat(d, starts)
+    hits = np.flatnonzero(d == np.repeat(dmax, lengths))
+    loop = np.repeat(np.arange(len(lengths)), lengths)[hits]
+    _, first = np.unique(loop, return_index=True)
+    far = hits[first] - starts
+    big = big[dmax[big] > 0]
+    ext_keep = np.zeros(len(ext), dtype=bool)
+    a = ext_starts[big]
+    m = a + far[big]
+    ext_keep[m] = True
+    _douglas_peucker_segments(ext, np.concatenate([a, m]), np.concatenate([m, a + lengths[big]]),
+                              tolerance, ext_keep)
+    keep |= np.delete(ext_keep, ext_starts + lengths)
+    return keep
+
+
+def douglas_peucker(points, tolerance, closed=True):
+    """Indices of the vertices kept by Douglas-Peucker: no point is further than tolerance from the result."""
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(pts) < 3:
+        return np.arange(len(pts))
+    return np.flatnonzero(_douglas_peucker_mask(pts, np.array([len(pts)]), tolerance, closed))
+
+
+def _segment_distance(pts, a, b):
+    """Distance of every point in pts to the segment a-b."""
+    ab = b - a
+    length2 = float(ab @ ab)
+    if length2 == 0:
+        return np.hypot(*(pts - a).T)
+    t = np.clip((pts - a) @ ab / length2, 0.0, 1.0)
+    return np.hypot(*(pts - (a + t[:, None] * ab)).T)
+
+
+def visvalingam(points, tolerance, closed=True):
+    """Indices of the vertices kept by Visvalingam-Whyatt.
+
+    Vertices are removed smallest-first while the triangle they form with their
+    neighbours is smaller than tolerance ** 2. A vertex further than tolerance
+    from the segment joining its neighbours is kept whatever its area: the tips
+    of one-pixel lines traced out and back have no area at all.
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    n = len(pts)
+    min_keep = 3 if closed else 2
+    if n <= min_keep:
+        return np.arange(n)
+    prev = np.arange(n) - 1
+    nxt = np.arange(n) + 1
+    prev[0], nxt[-1] = n - 1, 0
+
+    def area(i):
+        p, q = pts[prev[i]], pts[nxt[i]]
+        if _segment_distance(pts[i:i + 1], p, q)[0] > tolerance:
+            return np.inf
+        (ax, ay), (bx, by) = p - pts[i], q - pts[i]
+        return 0.5 * abs(ax * by - ay * bx)
+
+    fixed = set() if closed else {0, n - 1}
+    current = np.full(n, np.inf)
+    heap = []
+    for i in range(n):
+        if i not in fixed:
+            current[i] = area(i)
+            heap.append((current[i], i))
+    heapq.heapify(heap)
+
+    alive = np.ones(n, dtype=bool)
+    count = n
+    threshold = tolerance * tolerance
+    while heap and count > min_keep:
+        a, i = heapq.heappop(heap)
+        if not alive[i] or a != current[i]:
+            continue
+        if a >= threshold:
+            break
+        alive[i] = False
+        count -= 1
+        p, q = prev[i], nxt[i]
+        nxt[p], prev[q] = q, p
+        for j in (p, q):
+            if j not in fixed:
+                # effective areas never drop below the last removed one
+                current[j] = max(area(j), a)
+                heapq.heappush(heap, (current[j], j))
+    return np.flatnonzero(alive)
+
+
+SIMPLIFIERS = {
+    'douglas-peucker': douglas_peucker,
+    'visvalingam': visvalingam,
+}
+
+
+def _fit_arc(pts, tolerance):
+    """(cx, cy, direction) of a circle through pts within tolerance, or None.
+
+    direction is +1 counter-clockwise (G3) and -1 clockwise (G2) in the x/y
+    coordinates of pts.
+    """
+    a, m, b = pts[0], pts[len(pts) // 2], pts[-1]
+    d = 2 * ((a[0] - b[0]) * (m[1] - b[1]) - (m[0] - b[0]) * (a[1] - b[1]))
+    if abs(d) < 1e-9:
+        return None
+    sa, sm, sb = a @ a, m @ m, b @ b
+    cx = ((sa - sb) * (m[1] - b[1]) - (sm - sb) * (a[1] - b[1])) / d
+    cy = ((a[0] - b[0]) * (sm - sb) - (m[0] - b[0]) * (sa - sb)) / d
+    offsets = pts - (cx, cy)
+    radius = math.hypot(*(a - (cx, cy)))
+    if np.abs(np.hypot(*offsets.T) - radius).max() > tolerance:
+        return None
+    angles = np.unwrap(np.arctan2(offsets[:, 1], offsets[:, 0]))
+    sweep = angles[-1] - angles[0]
+    direction = 1 if sweep > 0 else -1
+    turn = (m[0] - a[0]) * (b[1] - m[1]) - (m[1] - a[1]) * (b[0] - m[0])
+    if abs(sweep) >= 2 * math.pi - 1e-3 or turn * direction <= 0:
+        return None
+    # the points must go around the circle one way (up to the tolerance)
+    if (np.diff(angles) * direction).min() < -tolerance / radius:
+        return None
+    return cx, cy, direction
+
+
+def fit_arcs(points, kept, tolerance, closed=True):
+    """Replace runs of kept vertices that lie on a circle with arcs.
+
+    points are the full polyline and kept the indices of its simplified vertices;
+    an arc is accepted when every original point it spans is within tolerance of
+    it. Returns (kept, arcs) with arcs rows (segment, cx, cy, direction): the
+    segment from vertex `segment` to the next one is an arc around (cx, cy).
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    kept = list(kept)
+    if closed and len(kept) > 1:
+        pts = np.vstack([pts, pts[:1]])
+        kept.append(len(pts) - 1)
+
+    out, arcs = [kept[0]], []
+    s = 0
+    while s < len(kept) - 1:
+        best = None
+        for e in range(s + ARC_MIN_SEGMENTS, len(kept)):
+            fit = _fit_arc(pts[kept[s]:kept[e] + 1], tolerance)
+            if fit is None:
+                break
+            best = e, fit
+        if best is None:
+            s += 1
+        else:
+            s, (cx, cy, direction) = best
+            arcs.append((len(out) - 1, cx, cy, direction))
+        out.append(kept[s])
+
+    if closed and len(kept) > 1:
+        out.pop()
+    return np.array(out, dtype=np.int64), np.array(arcs, dtype=np.float64).reshape(-1, 4)
+
+
+def simplify_polyline(points, tolerance, mode=DEFAULT_MODE, closed=True, merge=True, arcs=False):
+    """Simplify one polyline with a tolerance in its own units.
+
+    Returns (vertices, arcs): a subset of the input points (same dtype) and the
+    arc rows of fit_arcs (empty unless arcs=True).
+    """
+    if mode not in SIMPLIFIERS:
+        raise ValueError(f"Unknown simplification mode: {mode}")
+    pts = np.asarray(points).reshape(-1, 2)
+    index = merge_collinear(pts, closed) if merge else np.arange(len(pts))
+    kept = index[SIMPLIFIERS[mode](pts[index], tolerance, closed)]
+    arc_rows = np.zeros((0, 4))
+    if arcs and len(kept) > ARC_MIN_SEGMENTS:
+        kept, arc_rows = fit_arcs(pts, kept, tolerance, closed)
+    return pts[kept], arc_rows
+
+
+def simplify_contours(contours, tolerance=DEFAULT_TOLERANCE_MM, mm_per_px=DEFAULT_MM_PER_PX,
+                      mode=DEFAULT_MODE, merge=True, arcs=False, on_progress=None):
+    """Simplify closed OpenCV contours with a tolerance in millimetres on the plotter.
+
+    Returns (polygons, arcs): polygons shaped (k, 1, 2) like approxPolyDP output,
+    and one (m, 4) arc table per polygon (see fit_arcs). Douglas-Peucker runs on
+    all contours at once. on_progress(fraction) is called as contours are done.
+    """
+    tolerance_px = tolerance / mm_per_px
+    contours = [c for c in contours if len(c)]
+    on_progress = on_progress or (lambda fraction: None)
+    if mode != 'douglas-peucker' or not contours:
+        polygons, arc_tables = [], []
+        for i, contour in enumerate(contours):
+            vertices, arc_rows = simplify_polyline(contour, tolerance_px, mode, True, merge, arcs)
+            polygons.append(vertices.reshape(-1, 1, 2))
+            arc_tables.append(arc_rows)
+            on_progress((i + 1) / len(contours))
+        return polygons, arc_tables
+
+    if mode not in SIMPLIFIERS:
+        raise ValueError(f"Unknown simplification mode: {mode}")
+    lengths = np.array([len(c) for c in contours])
+    starts = _offsets(lengths)
+    pts = np.concatenate([c.reshape(-1, 2) for c in contours])
+    fpts = pts.astype(np.float64)
+    keep = _merge_collinear_mask(fpts, lengths) if merge else np.ones(len(pts), dtype=bool)
+    index = np.flatnonzero(keep)
+    kept = index[_douglas_peucker_mask(fpts[index], np.add.reduceat(keep, starts), tolerance_px)]
+    counts = np.add.reduceat(np.isin(np.arange(len(pts)), kept), starts)
+    groups = np.split(kept, np.cumsum(counts)[:-1])
+    # the batch pass is the bulk of the work unless arcs are fitted per contour
+    batch = 0.3 if arcs else 0.9
+    on_progress(batch)
+
+    polygons, arc_tables = [], []
+    for i, (contour, start, group) in enumerate(zip(contours, starts, groups)):
+        local = group - start
+        arc_rows = np.zeros((0, 4))
+        if arcs and len(local) > ARC_MIN_SEGMENTS:
+            local, arc_rows = fit_arcs(contour, local, tolerance_px)
+        polygons.append(contour.reshape(-1, 2)[local].reshape(-1, 1, 2))
+        arc_tables.append(arc_rows)
+        on_progress(batch + (1 - batch) * (i + 1) / len(contours))
+    return polygons, arc_tables
+
+
+def arc_points(start, end, arc, max_error=ARC_PREVIEW_ERROR):
+    """Points on an arc row from start to end (both excluded), at most max_error from the arc."""
+    _, cx, cy, direction = arc
+    radius = math.hypot(start[0] - cx, start[1] - cy)
+    a0 = math.atan2(start[1] - cy, start[0] - cx)
+    a1 = math.atan2(end[1] - cy, end[0] - cx)
+    sweep = (a1 - a0) % (2 * math.pi) if direction > 0 else -((a0 - a1) % (2 * math.pi))
+    step = 2 * math.acos(max(1 - max_error / radius, -1.0)) if radius > max_error else math.pi
+    count = max(int(math.ceil(abs(sweep) / step)), 1)
+    angles = a0 + sweep * np.arange(1, count) / count
+    return np.column_stack([cx + radius * np.cos(angles), cy + radius * np.sin(angles)])
+
+
+def densify(vertices, arcs, max_error=ARC_PREVIEW_ERROR):
+    """Closed polygon with its arcs replaced by chords at most max_error from them."""
+    vertices = np.asarray(vertices).reshape(-1, 2)
+    if not len(arcs):
+        return vertices
+    by_segment = {int(row[0]): row for row in arcs}
+    pieces = []
+    for s, point in enumerate(vertices):
+        pieces.append(point[None, :].astype(np.float64))
+        if s in by_segment:
+            pieces.append(arc_points(point, vertices[(s + 1) % len(vertices)], by_segment[s], max_error))
+    return np.vstack(pieces)
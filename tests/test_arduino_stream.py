@@ -0,0 +1,90 @@
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import arduino-interface module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from arduino_interface import ArduinoInterface
+from fake_arduino import FakeArduino
+from tests.test_arduino_interface import generate_large_gcode
+from tests.test_gcode_wire import expected_commands
+
+
+def test_stream_gcode_fake_arduino():
+    lines = generate_large_gcode(500).splitlines()
+    with FakeArduino(rx_buffer=64, line_delay=0.0005) as device:
+        con = ArduinoInterface(port=device.port, reset_delay=0)
+        stats = con.stream_gcode(lines, rx_buffer=64)
+        con.ser.close()
+
+        assert stats['ok'] and stats['lines'] == len(lines)
+        assert device.received == lines
+        # several lines were in flight, but never more than the device holds
+        assert device.overflows == 0
+        assert device.max_buffered > len(lines[-2]) + 1
+        assert stats['lines_per_sec'] > 0
+
+
+def test_stream_gcode_resends_failed_lines():
+    lines = [f"G1 X{i}.00 Y{i}.00" for i in range(50)]
+    with FakeArduino(corrupt_lines={3, 20, 21}) as device:
+        con = ArduinoInterface(port=device.port, reset_delay=0)
+        assert con.negotiate_wire(('compact',)) == 'compact'
+        stats = con.stream_gcode(lines)
+        con.ser.close()
+
+        assert stats['ok'] and stats['lines'] == len(lines) and stats['resends'] >= 1
+        # the device dropped the units behind a damaged one and ran everything once, in order
+        assert device.commands == ["WIRE compact"] + expected_commands(lines)
+
+
+def test_stream_gcode_does_not_resend_on_ascii_links():
+    lines = [f"G1 X{i}.00 Y{i}.00" for i in range(50)]
+    with FakeArduino(corrupt_lines={3}) as device:
+        con = ArduinoInterface(port=device.port, reset_delay=0)
+        stats = con.stream_gcode(lines)
+        # the link is left in step for the next stream
+        assert con.stream_gcode(["G0 Z100.000"])['ok']
+        con.ser.close()
+
+        assert not stats['ok'] and stats['resends'] == 0
+        assert stats['error'].startswith('Checksum mismatch on unit 4')
+        # the lines in flight behind the damaged one ran once, nothing was written after them
+        assert 3 < stats['lines'] < len(lines) - 1
+        assert device.received == lines[:stats['lines'] + 1] + ["G0 Z100.000"]
+
+
+def test_stream_gcode_gives_up():
+    # everything after the negotiation line arrives damaged
+    with FakeArduino(corrupt_lines=range(1, 100)) as device:
+        con = ArduinoInterface(port=device.port, reset_delay=0)
+        assert con.negotiate_wire(('compact',)) == 'compact'
+        stats = con.stream_gcode(["G0 Z1", "G0 Z0"], max_retries=2)
+        con.ser.close()
+
+        assert not stats['ok'] and stats['lines'] == 0
+        assert 'Checksum mismatch' in stats['error']
+
+
+def test_fake_arduino_link_simulation():
+    lines = [f"G1 X{i}.00 Y{i}.00" for i in range(100)]
+    with FakeArduino(baudrate=115200, latency=0.002, error_rate=0.05, seed=1) as device:
+        con = ArduinoInterface(port=device.port, reset_delay=0)
+        assert con.negotiate_wire(('binary',)) == 'binary'
+        stats = con.stream_gcode(lines, max_retries=10)
+        con.ser.close()
+
+        assert stats['ok'] and stats['lines'] == len(lines)
+        # a damaged unit that was in flight behind another damaged one is resent with it
+        assert 0 < stats['resends'] <= device.errors
+        # 10 bits per byte on the wire
+        assert stats['bytes_per_sec'] < 115200 / 10
+        assert min(stats['latencies']) >= 0.002
+
+
+def test_send_gcode_fake_arduino():
+    with FakeArduino(corrupt_lines={1}) as device:
+        con = ArduinoInterface(port=device.port, reset_delay=0)
+        assert con.send_gcode("G0 Z1")
+        assert not con.send_gcode("G0 Z0")
+        con.ser.close()
@@ -0,0 +1,54 @@
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import the async interface module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from async_arduino import AsyncArduinoInterface, parse_message
+from fake_arduino import FakeArduino
+
+
+def test_parse_message():
+    assert parse_message("OK 42") == ('ok', "OK 42", 42)
+    assert parse_message("ok").kind == 'ok' and parse_message("ok").checksum is None
+    assert parse_message("Ready for G-code").kind == 'ready'
+    assert parse_message("start").kind == 'other'
+
+
+async def send_all(port, lines):
+    async with await AsyncArduinoInterface.open(port, reset_delay=0) as con:
+        # concurrent senders are serialized by the interface
+        return await asyncio.gather(*(con.send(line) for line in lines))
+
+
+def test_async_send_fake_arduino():
+    lines = [f"G1 X{i}.00 Y{i}.00" for i in range(20)]
+    with FakeArduino(corrupt_lines={5}) as device:
+        results = asyncio.run(send_all(device.port, lines))
+        assert results == [i != 5 for i in range(len(lines))]
+        assert device.received == lines
+
+
+def test_async_reader_thread_fallback(monkeypatch):
+    def no_add_reader(self, *args):
+        raise NotImplementedError
+
+    monkeypatch.setattr(asyncio.SelectorEventLoop, 'add_reader', no_add_reader)
+    with FakeArduino() as device:
+        assert asyncio.run(send_all(device.port, ["G0 Z1", "G0 Z0"])) == [True, True]
+
+
+def test_async_wait_ready_timeout():
+    async def run(port):
+        async with await AsyncArduinoInterface.open(port, reset_delay=0) as con:
+            assert await con.send("G0 Z1")
+            # the ready after the ack is pending, then the device stays silent
+            assert await con.wait_ready(0.5)
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            assert not await con.wait_ready(0.2)
+            assert loop.time() - start < 0.5
+
+    with FakeArduino() as device:
+        asyncio.run(run(device.port))
@@ -0,0 +1,55 @@
+import pickle
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+# Add parent directory to path to import the contour geometry module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from contour_geometry import ContourGeometry
+from tests.test_render_cache import make_contours
+
+
+def test_columns_match_opencv():
+    contours = make_contours(count=20)
+    geometry = ContourGeometry.from_contours(contours)
+    for i, c in enumerate(contours):
+        assert geometry.area[i] == cv2.contourArea(c)
+        assert geometry.perimeter[i] == cv2.arcLength(c, True)
+        assert tuple(geometry.bbox[i]) == cv2.boundingRect(c)
+        assert geometry.point_count[i] == len(c)
+        np.testing.assert_array_equal(geometry.simplified[i], cv2.approxPolyDP(c, 0.0005 * geometry.perimeter[i], True))
+
+
+def test_sort_filter_and_pack():
+    line = np.array([[[0, 0]], [[9, 0]]], dtype=np.int32)  # zero area
+    geometry = ContourGeometry.from_contours(make_contours(count=20) + [line], min_area=0)
+    assert len(geometry) == 20
+
+    for mode, column in (('area', 'area'), ('perimeter', 'perimeter'), ('points', 'point_count')):
+        values = getattr(geometry.sorted(mode), column)
+        assert np.all(np.diff(values) >= 0)
+    with pytest.raises(ValueError):
+        geometry.sorted('colour')
+
+    by_area = geometry.sorted('area')
+    restored = ContourGeometry.unpack(by_area.pack())
+    np.testing.assert_array_equal(restored.perimeter, by_area.perimeter)
+    np.testing.assert_array_equal(restored.bbox, by_area.bbox)
+    for got, expected in zip(restored.simplified, by_area.simplified):
+        np.testing.assert_array_equal(got, expected)
+    assert len(ContourGeometry.unpack(ContourGeometry.from_contours([]).pack())) == 0
+
+
+def test_pickles_as_its_packed_blob():
+    geometry = ContourGeometry.from_contours(make_contours(count=20))
+    blob = geometry.pack()
+    assert geometry.pack() is blob
+    # a worker process sends the blob, the server keeps it for the job store and result cache
+    restored = pickle.loads(pickle.dumps(geometry))
+    assert restored.pack() == blob
+    for got, expected in zip(restored.contours, geometry.contours):
+        np.testing.assert_array_equal(got, expected)
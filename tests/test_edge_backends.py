@@ -0,0 +1,50 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add parent directory to path to import the edge backend module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from CannyEdge import Canny_detector
+from edge_backends import EDGE_BACKENDS, detect_edges
+from tests.test_canny_edge import make_test_image
+
+
+def test_custom_backend_matches_detector():
+    img = make_test_image()
+    mask = detect_edges(img, 'custom')
+    assert mask.dtype == np.uint8
+    np.testing.assert_array_equal(mask > 0, Canny_detector(img, use_hysteresis=True) > 0)
+
+
+def test_custom_and_tiled_backends_use_hysteresis():
+    img = make_test_image(noise=10)
+    with_hysteresis = Canny_detector(img, use_hysteresis=True) > 0
+    # the noise leaves weak pixels that are not connected to any edge
+    assert (with_hysteresis != (Canny_detector(img) > 0)).any()
+    for name in ('custom', 'tiled'):
+        np.testing.assert_array_equal(detect_edges(img, name) > 0, with_hysteresis, err_msg=name)
+
+
+def test_all_backends_return_full_size_masks():
+    img = make_test_image(noise=10)
+    for name in EDGE_BACKENDS:
+        mask = detect_edges(img, name)
+        assert mask.shape == img.shape[:2], name
+        assert mask.dtype == np.uint8, name
+        assert set(np.unique(mask)) <= {0, 255}, name
+        assert mask.any(), name
+
+
+def test_preview_backend_downscales():
+    img = np.repeat(np.repeat(make_test_image(), 4, axis=0), 4, axis=1)
+    mask = detect_edges(img, 'preview', max_side=128)
+    assert mask.shape == img.shape[:2]
+    assert mask.any()
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        detect_edges(make_test_image(), 'nope')
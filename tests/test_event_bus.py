@@ -0,0 +1,34 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add parent directory to path to import the event bus module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from event_bus import EventBus
+
+
+def test_wait_returns_on_publish_or_timeout():
+    bus = EventBus()
+    assert bus.latest('job') == (0, None)
+    assert bus.publish('job', {'progress': 10}) == 1
+
+    start = time.monotonic()
+    assert bus.wait('job', 1, 0.1) == (1, {'progress': 10})
+    assert time.monotonic() - start >= 0.1
+    # an older version returns right away
+    assert bus.wait('job', 0, 10) == (1, {'progress': 10})
+
+    threading.Timer(0.05, bus.publish, ('job', {'progress': 50})).start()
+    threading.Timer(0.1, bus.publish, ('other', {'progress': 1})).start()
+    start = time.monotonic()
+    assert bus.wait('job', 1, 10) == (2, {'progress': 50})
+    assert time.monotonic() - start < 5
+
+
+def test_forget_wakes_waiters():
+    bus = EventBus()
+    bus.publish('job', {'status': 'completed'})
+    threading.Timer(0.05, bus.forget, ('job',)).start()
+    assert bus.wait('job', 1, 10) == (0, None)
@@ -0,0 +1,46 @@
+import pickle
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path to import the frame store module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from frame_store import FrameStore, SpilledFrame, load_frame
+
+
+def make_frame(value, side=10):
+    return np.full((side, side, 3), value, dtype=np.uint8)
+
+
+def test_frames_stay_in_memory_within_budget(tmp_path):
+    frames = FrameStore(str(tmp_path), max_bytes=700, spill_bytes=0)
+    frames.put('a', make_frame(1))
+    frames.put('b', make_frame(2))
+    assert frames.size == 600 and not list(tmp_path.iterdir())
+    assert frames.handle('a') is frames.get('a')
+
+    # 'b' is the least recently used
+    frames.put('c', make_frame(3))
+    assert frames.size == 600
+    handle = frames.handle('b')
+    assert isinstance(handle, SpilledFrame)
+    spilled = load_frame(pickle.loads(pickle.dumps(handle)))
+    assert isinstance(spilled, np.memmap) and (spilled == 2).all()
+
+    frames.discard('b')
+    assert frames.handle('b') is None and frames.get('b') is None
+    assert load_frame(handle) is None
+
+
+def test_large_frames_are_spilled_right_away(tmp_path):
+    frames = FrameStore(str(tmp_path), max_bytes=10 ** 6, spill_bytes=1000)
+    frames.put('small', make_frame(1))
+    frames.put('large', make_frame(5, side=20))
+    assert frames.size == 300
+    assert (tmp_path / 'large_frame.npy').exists()
+    np.testing.assert_array_equal(frames.get('large'), make_frame(5, side=20))
+
+    # spill files outlive the store, e.g. a restart of the server
+    assert (FrameStore(str(tmp_path)).get('large') == 5).all()
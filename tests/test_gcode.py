@@ -0,0 +1,68 @@
+import sys
+from io import StringIO
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path to import the gCode module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from gCode import format_moves, iter_gcode_chunks, path_to_gcode, read_coords, write_gcode
+
+
+def make_paths(seed=0):
+    rng = np.random.default_rng(seed)
+    paths = [rng.uniform(-500, 5000, (n, 2)) for n in (1, 2, 50, 700)]
+    paths.append([(17, 335), (17, 334), (18.5, 333.25)])
+    paths.append([])
+    return paths
+
+
+def test_format_moves_matches_fstrings():
+    rng = np.random.default_rng(1)
+    xy = np.concatenate([
+        rng.uniform(-10000, 10000, (5000, 2)),
+        rng.integers(0, 4000, (5000, 2)),
+        [[0, -0.0], [-0.00001, 9.99996], [123456.5, 1e-5], [np.inf, 1]],
+    ])
+    expected = "".join(f"G1 X{x:.4f} Y{y:.4f} F1500\n" for x, y in xy.tolist())
+    assert format_moves(xy, "G1", " F1500") == expected
+    assert format_moves(np.zeros((0, 2)), "G1") == ""
+
+
+def test_streamed_output_matches_file(tmp_path):
+    paths = make_paths()
+    ids = list(range(len(paths)))
+    fname = path_to_gcode(tmp_path / "out.gcode", paths, ids)
+    expected = Path(fname).read_text()
+
+    for vectorized in (False, True):
+        out = StringIO()
+        write_gcode(out, paths, ids, vectorized=vectorized)
+        assert out.getvalue() == expected
+
+    chunks = list(iter_gcode_chunks(paths, ids, chunk_size=4096))
+    assert "".join(chunks) == expected
+    assert len(chunks) > 1
+    assert expected.startswith("(generated by gCode.py)\nG21\nG90\n")
+    assert expected.endswith("G0 Z100.000 ; final retract\n")
+
+
+def test_read_coords_grouped():
+    df = pd.DataFrame({
+        "ID": ["b", "a", "b", None, "c", "a", "d"],
+        "X": [1, 2, "x", 4, None, 6, "7"],
+        "Y": [1, 2, 3, 4, 5, 6, 7],
+    })
+    paths, ids = read_coords(df, None, None, "ID")
+    # grouped in order of first appearance, unparseable rows and empty groups dropped
+    assert ids == ["b", "a", "d"]
+    assert [p.tolist() for p in paths] == [[[1, 1]], [[2, 2], [6, 6]], [[7, 7]]]
+
+
+def test_read_coords_split_on_missing():
+    df = pd.DataFrame({"X": [None, 1, 2, None, None, 3, "q", 4, None], "Y": [1] * 9})
+    paths, ids = read_coords(df, None, None, None)
+    assert ids == [None, None]
+    assert [p.tolist() for p in paths] == [[[1, 1], [2, 1]], [[3, 1], [4, 1]]]
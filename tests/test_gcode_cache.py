@@ -0,0 +1,128 @@
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path to import the G-code cache module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from contour_geometry import ContourGeometry
+from gCode import iter_gcode_chunks
+from gcode_cache import GcodeCache
+from tests.test_render_cache import make_contours
+
+
+def test_cached_program_matches_generated():
+    geometry = ContourGeometry.from_contours(make_contours())
+    paths, arcs = geometry.toolpaths()
+    # closed: every path ends on its first vertex
+    assert all(len(p) == len(s) + 1 and (p[0] == p[-1]).all() for p, s in zip(paths, geometry.simplified))
+
+    cache = GcodeCache()
+    calls = []
+
+    def generate():
+        calls.append(1)
+        return iter_gcode_chunks(paths, chunk_size=256)
+
+    expected = "".join(iter_gcode_chunks(paths)).encode('ascii')
+    first = cache.stream(('job', 60), generate)
+    # nothing is cached before the program was generated completely
+    next(first)
+    assert cache.size == 0
+    # an aborted download stores nothing either
+    first.close()
+    assert cache.size == 0
+    assert b"".join(cache.stream(('job', 60), generate)) == expected
+    assert b"".join(cache.stream(('job', 60), generate)) == expected
+    assert len(calls) == 2 and cache.hits == 1 and cache.size == len(expected)
+
+    cache.discard('job')
+    assert cache.size == 0 and b"".join(cache.stream(('job', 60), generate)) == expected
+    assert len(calls) == 3
+
+
+def test_cache_stays_within_budget():
+    cache = GcodeCache(max_bytes=100)
+    for n in range(5):
+        b"".join(cache.stream(('job', n), lambda: iter(["x" * 40])))
+    assert cache.size == 80 and cache.misses == 5
+    # too large to keep
+    b"".join(cache.stream(('job', 9), lambda: iter(["x" * 60, "x" * 60])))
+    assert cache.size == 80
+    assert b"".join(cache.stream(('job', 4), lambda: iter([]))) == b"x" * 40
+
+
+def test_optimized_order_is_computed_once_per_key():
+    cache = GcodeCache(max_orders=2)
+    calls = []
+
+    def compute(n):
+        calls.append(n)
+        return [np.zeros((2, 2))] * n, list(range(n))
+
+    assert cache.order(('job', 3), lambda: compute(3)) is cache.order(('job', 3), lambda: compute(3))
+    cache.order(('job', 4), lambda: compute(4))
+    cache.order(('other', 1), lambda: compute(1))
+    # the least recently used order was dropped
+    cache.order(('job', 3), lambda: compute(3))
+    assert calls == [3, 4, 1, 3]
+
+    cache.discard('job')
+    cache.order(('other', 1), lambda: compute(1))
+    cache.order(('job', 3), lambda: compute(3))
+    assert calls == [3, 4, 1, 3, 3]
+
+
+def test_concurrent_requests_build_a_program_once():
+    cache = GcodeCache()
+    calls = []
+    started, release = threading.Event(), threading.Event()
+
+    def generate():
+        calls.append(1)
+        started.set()
+        release.wait()
+        yield "G0 Z100.000\n"
+        yield "G1 X1 Y1\n"
+
+    with ThreadPoolExecutor(4) as pool:
+        results = [pool.submit(lambda: b"".join(cache.stream(('job', 5), generate))) for _ in range(4)]
+        # the others wait for the first build instead of starting their own
+        started.wait()
+        release.set()
+        assert {result.result() for result in results} == {b"G0 Z100.000\nG1 X1 Y1\n"}
+    assert len(calls) == 1 and cache.misses == 1 and cache.hits == 3
+
+
+def test_aborted_build_is_taken_over():
+    cache = GcodeCache()
+    first = cache.stream(('job', 5), lambda: iter(["a", "b"]))
+    assert next(first) == b"a"
+    with ThreadPoolExecutor(1) as pool:
+        waiting = pool.submit(lambda: b"".join(cache.stream(('job', 5), lambda: iter(["c"]))))
+        # a closed download stores nothing, the waiting request builds the program itself
+        first.close()
+        assert waiting.result(timeout=10) == b"c"
+    assert cache.misses == 2
+
+
+def test_concurrent_requests_optimize_an_order_once():
+    cache = GcodeCache()
+    calls = []
+    started, release = threading.Event(), threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return [np.zeros((2, 2))], [0]
+
+    with ThreadPoolExecutor(3) as pool:
+        results = [pool.submit(cache.order, ('job', 1), compute) for _ in range(3)]
+        started.wait()
+        release.set()
+        orders = [result.result() for result in results]
+    assert len(calls) == 1 and all(order is orders[0] for order in orders)
@@ -0,0 +1,106 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path to import the wire format module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from arduino_interface import ArduinoInterface
+from fake_arduino import FakeArduino
+from gCode import iter_gcode
+from gcode_wire import WIRE_MODES, ModalState, WireDecoder, encode_units, format_units
+from tests.test_gcode import make_paths
+
+EDGE_CASES = """\
+G21
+G90
+X5 Y5
+G0 X-12.345 Y0.004 F5000 ; comment
+G1 X-12.345 Y0.004
+G1X1000Y-1000F1500
+G1 X1000 Y-1000
+F2000
+G2 X10 Y10 I5 J0
+X20 Y20 I5 J0
+G1 X10 Y10
+G92 X0 Y0
+G1 X0.5 Y0.5
+G91
+G1 X1 Y1
+G1 X1 Y1
+G90
+G28
+G1 X3 Y3 Z-1.5
+M2
+""".splitlines()
+
+
+def make_lines():
+    return "".join(iter_gcode(make_paths())).splitlines() + EDGE_CASES
+
+
+def expected_commands(lines, precision=2):
+    state = ModalState(precision)
+    return [c for c in map(state.command, lines) if c is not None]
+
+
+def decode_all(units, mode):
+    decoder = WireDecoder(mode)
+    stream = b"".join(data for data, _, _ in units)
+    commands = []
+    while True:
+        unit, stream = decoder.split(stream)
+        if unit is None:
+            return commands
+        commands.extend(decoder.decode(unit)[1])
+
+
+def test_format_units():
+    assert [format_units(v) for v in (1700, -1725, 5, -5, 0)] == ["17", "-17.25", "0.05", "-0.05", "0"]
+    assert format_units(17, 0) == "17"
+
+
+@pytest.mark.parametrize("mode", WIRE_MODES)
+def test_round_trip(mode):
+    lines = make_lines()
+    units = list(encode_units(lines, mode, max_frame=64))
+    assert decode_all(units, mode) == expected_commands(lines)
+    assert all(len(data) <= 64 for data, _, _ in units)
+
+
+def test_compact_is_smaller():
+    lines = (Path(__file__).parent.parent / "output.gcode").read_text().splitlines()
+    sizes = {mode: sum(len(data) for data, _, _ in encode_units(lines, mode)) for mode in WIRE_MODES}
+    assert sizes['binary'] < sizes['compact'] < sizes['ascii'] / 2
+
+
+def test_corrupt_frame_is_rejected():
+    (data, csum, _), *_ = encode_units(["G1 X1 Y1", "G1 X2 Y2"], 'binary')
+    decoder = WireDecoder('binary')
+    corrupt = data[:3] + bytes([data[3] ^ 0x10]) + data[4:]
+    ack, commands = decoder.decode(corrupt)
+    assert ack != csum and commands == []
+    assert decoder.decode(data) == (csum, expected_commands(["G1 X1 Y1", "G1 X2 Y2"]))
+
+
+@pytest.mark.parametrize("mode", ['compact', 'binary'])
+def test_stream_negotiated_mode(mode):
+    lines = make_lines()
+    with FakeArduino(rx_buffer=64, corrupt_lines={2, 7}) as device:
+        con = ArduinoInterface(port=device.port, reset_delay=0)
+        assert con.negotiate_wire((mode,)) == mode
+        stats = con.stream_gcode(lines)
+        con.ser.close()
+
+        assert stats['ok'] and stats['resends'] == 2
+        # the negotiation line, then the program
+        assert device.commands == ["WIRE " + mode] + expected_commands(lines)
+
+
+def test_negotiation_falls_back_to_ascii():
+    with FakeArduino(wire_modes=('ascii',)) as device:
+        con = ArduinoInterface(port=device.port, reset_delay=0)
+        assert con.negotiate_wire() == 'ascii'
+        assert con.send_gcode("G0 Z1")
+        con.ser.close()
@@ -0,0 +1,166 @@
+import importlib
+import os
+import sys
+import threading
+import time
+from io import BytesIO
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+# Add parent directory to path to import the job queue and main modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from job_queue import JobQueue, QueueFull, report
+
+
+def slow_job(job_id, steps, delay):
+    for i in range(steps):
+        report(job_id, progress=i)
+        time.sleep(delay)
+    return {'status': 'completed'}
+
+
+def crashing_job(job_id):
+    # a worker killed by the OOM killer or a segfault in native code
+    report(job_id, progress=0)
+    os._exit(1)
+
+
+class Recorder:
+    def __init__(self):
+        self.updates = {}
+        self.done = threading.Event()
+
+    def __call__(self, job_id, fields):
+        self.updates.setdefault(job_id, []).append(fields)
+        if fields.get('status') == 'completed':
+            self.done.set()
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached before timeout")
+        time.sleep(0.01)
+
+
+def test_queue_positions_capacity_and_cancel():
+    recorder = Recorder()
+    queue = JobQueue(on_update=recorder, workers=1, max_queued=2)
+
+    queue.submit('a', slow_job, 'a', 20, 0.05)
+    wait_for(lambda: queue.stats()['running'] == 1)
+
+    queue.submit('b', slow_job, 'b', 1, 0)
+    queue.submit('c', slow_job, 'c', 1, 0)
+    assert queue.position('b') == 1
+    assert queue.position('c') == 2
+    assert queue.is_full()
+    with pytest.raises(QueueFull):
+        queue.submit('d', slow_job, 'd', 1, 0)
+
+    # cancel a waiting job and the running one
+    assert queue.cancel('b')
+    assert queue.position('c') == 1
+    assert queue.cancel('a')
+    assert not queue.cancel('unknown')
+
+    wait_for(recorder.done.is_set)
+    assert 'b' not in recorder.updates
+    assert recorder.updates['c'][-1] == {'status': 'completed'}
+    # the running job stopped at its next report() and never completed
+    assert {'status': 'completed'} not in recorder.updates.get('a', [])
+    assert len(recorder.updates.get('a', [])) < 20
+
+
+def test_positions_follow_the_queue():
+    recorder = Recorder()
+    queue = JobQueue(on_update=recorder, workers=1, max_queued=4)
+
+    queue.submit('a', slow_job, 'a', 10, 0.05)
+    wait_for(lambda: queue.stats()['running'] == 1)
+    queue.submit('b', slow_job, 'b', 10, 0.05)
+    queue.submit('c', slow_job, 'c', 1, 0)
+
+    # a running job has no position, waiting ones count from 1
+    assert queue.position('a') is None
+    assert queue.waiting() == ['b', 'c']
+    assert (queue.position('b'), queue.position('c')) == (1, 2)
+    assert queue.stats() == {'queued': 2, 'running': 1, 'workers': 1}
+
+    # c moves up once a is done and b has taken the worker
+    wait_for(lambda: 'b' in recorder.updates)
+    assert queue.position('b') is None
+    assert queue.position('c') == 1
+    wait_for(lambda: {'status': 'completed'} in recorder.updates.get('c', []))
+    assert queue.position('c') is None
+    assert queue.waiting() == []
+
+
+def test_cancel_stops_a_running_job_at_its_next_report():
+    recorder = Recorder()
+    queue = JobQueue(on_update=recorder, workers=1, max_queued=2)
+
+    queue.submit('a', slow_job, 'a', 200, 0.02)
+    wait_for(lambda: len(recorder.updates.get('a', [])) >= 3)
+    assert queue.cancel('a')
+    wait_for(lambda: queue.stats()['running'] == 0)
+
+    # report() raised JobCancelled in the worker: no final update and no error
+    updates = recorder.updates['a']
+    assert len(updates) < 200
+    assert all(set(fields) == {'progress'} for fields in updates)
+    count = len(updates)
+    time.sleep(0.1)
+    assert len(recorder.updates['a']) == count
+
+    # the worker is free for the next job, which is not affected by the cancel
+    queue.submit('b', slow_job, 'b', 2, 0)
+    wait_for(recorder.done.is_set)
+    assert recorder.updates['b'][-1] == {'status': 'completed'}
+
+
+def test_crashed_worker_fails_only_its_job():
+    recorder = Recorder()
+    queue = JobQueue(on_update=recorder, workers=1, max_queued=2)
+
+    queue.submit('a', crashing_job, 'a')
+    queue.submit('b', slow_job, 'b', 2, 0)
+    wait_for(recorder.done.is_set, timeout=30)
+
+    assert recorder.updates['a'][-1] == {'status': 'failed', 'error': 'The worker process stopped unexpectedly'}
+    assert recorder.updates['b'][-1] == {'status': 'completed'}
+
+    # the replacement worker keeps taking jobs
+    recorder.done.clear()
+    queue.submit('c', slow_job, 'c', 1, 0)
+    wait_for(recorder.done.is_set, timeout=30)
+    assert recorder.updates['c'][-1] == {'status': 'completed'}
+
+
+def test_full_queue_answers_503_with_retry_after(tmp_path, monkeypatch):
+    monkeypatch.setenv('HYDRAWLICS_JOB_STORE', 'memory')
+    monkeypatch.chdir(tmp_path)
+    main = importlib.import_module('main')
+    recorder = Recorder()
+    queue = JobQueue(on_update=recorder, workers=1, max_queued=1)
+    monkeypatch.setattr(main, 'job_queue', queue)
+
+    queue.submit('a', slow_job, 'a', 20, 0.05)
+    wait_for(lambda: queue.stats()['running'] == 1)
+    queue.submit('b', slow_job, 'b', 1, 0)
+    assert queue.is_full()
+
+    ok, png = cv2.imencode('.png', np.zeros((32, 32, 3), dtype=np.uint8))
+    response = main.app.test_client().post('/upload', data={'file': (BytesIO(png.tobytes()), 'full.png')})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '5'
+    assert response.get_json() == {'error': 'Too many jobs queued, try again later'}
+    # nothing of the rejected upload is kept
+    assert list(main.jobs.items()) == []
+    assert list((tmp_path / 'uploads').iterdir()) == []
+    queue.cancel('a')
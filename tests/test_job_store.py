@@ -0,0 +1,116 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path to import the job store module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from contour_geometry import ContourGeometry
+from job_store import MemoryJobStore, SQLiteJobStore
+
+
+def make_geometry():
+    return ContourGeometry.from_contours([
+        np.array([[[0, 0]], [[5, 0]], [[5, 5]]], dtype=np.int32),
+        np.array([[[10, 10]], [[12, 10]], [[12, 14]], [[10, 14]]], dtype=np.int32),
+    ])
+
+
+def check_store(store):
+    store['a'] = {'id': 'a', 'status': 'queued'}
+    assert 'a' in store and 'b' not in store
+
+    store.update('a', {'status': 'completed', 'geometry': make_geometry()})
+    assert store['a'] == {'id': 'a', 'status': 'completed'}
+    np.testing.assert_array_equal(store.geometry('a').area, make_geometry().area)
+
+    # records are snapshots
+    store.get('a')['status'] = 'changed'
+    assert store['a']['status'] == 'completed'
+
+    store['b'] = {'id': 'b', 'status': 'processing'}
+    store['c'] = {'id': 'c', 'status': 'failed'}
+    # over capacity: the least recently used finished job goes first, active jobs stay
+    store.max_jobs = 2
+    assert [job['id'] for job in store.evict_expired()] == ['a']
+    # everything finished is past a zero TTL
+    store.ttl = -1
+    assert [job['id'] for job in store.evict_expired()] == ['c']
+    assert [job_id for job_id, _ in store.items()] == ['b']
+
+
+def test_memory_store():
+    check_store(MemoryJobStore(ttl=3600, max_jobs=10))
+
+
+def test_sqlite_store(tmp_path):
+    check_store(SQLiteJobStore(tmp_path / 'jobs.sqlite3', ttl=3600, max_jobs=10))
+
+
+def test_sqlite_store_survives_restart(tmp_path):
+    store = SQLiteJobStore(tmp_path / 'jobs.sqlite3', ttl=3600, max_jobs=10)
+    store['done'] = {'id': 'done', 'status': 'completed', 'geometry': make_geometry()}
+    store['busy'] = {'id': 'busy', 'status': 'processing'}
+    store.close()
+
+    store = SQLiteJobStore(tmp_path / 'jobs.sqlite3', ttl=3600, max_jobs=10)
+    assert store['done']['status'] == 'completed'
+    assert len(store.geometry('done')) == 2
+    # its worker is gone after a restart
+    assert store['busy']['status'] == 'failed'
+
+
+def test_sqlite_second_store_leaves_running_jobs_alone(tmp_path):
+    server = SQLiteJobStore(tmp_path / 'jobs.sqlite3', ttl=3600, max_jobs=10)
+    server['busy'] = {'id': 'busy', 'status': 'processing'}
+    assert server.owner
+
+    # another process opening the same file while the server still runs the job
+    other = SQLiteJobStore(tmp_path / 'jobs.sqlite3', ttl=3600, max_jobs=10)
+    assert not other.owner
+    assert other['busy']['status'] == 'processing'
+    assert server['busy']['status'] == 'processing'
+    other.close()
+
+    # once the server is gone the next store owns the file and fails the job
+    server.close()
+    store = SQLiteJobStore(tmp_path / 'jobs.sqlite3', ttl=3600, max_jobs=10)
+    assert store.owner
+    assert store['busy']['status'] == 'failed'
+
+
+def check_guarded_update(store):
+    store['a'] = {'id': 'a', 'status': 'processing'}
+    assert store.update('a', {'status': 'cancelled'}, unless={'completed', 'cancelled'})
+    # a late result of the worker does not overwrite the cancellation
+    assert not store.update('a', {'status': 'completed', 'geometry': make_geometry()},
+                            unless={'completed', 'cancelled'})
+    assert store['a']['status'] == 'cancelled' and store.geometry('a') is None
+    assert not store.update('missing', {'status': 'completed'})
+
+
+def test_guarded_update():
+    check_guarded_update(MemoryJobStore(ttl=3600, max_jobs=10))
+
+
+def test_sqlite_guarded_update(tmp_path):
+    check_guarded_update(SQLiteJobStore(tmp_path / 'jobs.sqlite3', ttl=3600, max_jobs=10))
+
+
+def test_sqlite_reads_do_not_write(tmp_path):
+    store = SQLiteJobStore(tmp_path / 'jobs.sqlite3', ttl=3600, max_jobs=1)
+    store['old'] = {'id': 'old', 'status': 'completed'}
+    store['new'] = {'id': 'new', 'status': 'completed'}
+    changes = store._db.total_changes
+    assert store['old']['status'] == 'completed'
+    assert store._db.total_changes == changes
+    # the access still counts for the LRU order once the reaper runs
+    assert [job['id'] for job in store.evict_expired()] == ['new']
+
+
+def test_sqlite_existing_database_gets_auto_vacuum(tmp_path):
+    sqlite3.connect(tmp_path / 'jobs.sqlite3').execute("CREATE TABLE t (x)").connection.close()
+    store = SQLiteJobStore(tmp_path / 'jobs.sqlite3', ttl=3600, max_jobs=10)
+    assert store._db.execute("PRAGMA auto_vacuum").fetchone()[0] == 1
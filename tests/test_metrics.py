@@ -0,0 +1,42 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path to import the metrics module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from metrics import MetricsRegistry
+
+
+def test_render_prometheus_text():
+    metrics = MetricsRegistry(prefix='app_')
+    finished = metrics.counter('jobs_total', 'Finished jobs', labels=('status',))
+    finished.inc(status='completed')
+    finished.inc(2, status='failed')
+    metrics.gauge('queue_depth', 'Waiting jobs', collect=lambda: 3)
+    metrics.gauge('unknown', 'Not available here', collect=lambda: None)
+    seconds = metrics.histogram('stage_seconds', 'Stage durations', labels=('stage',), buckets=(0.1, 1.0))
+    seconds.observe(0.05, stage='edges')
+    seconds.observe(0.5, stage='edges')
+
+    text = metrics.render()
+    assert '# TYPE app_jobs_total counter\n' in text
+    assert 'app_jobs_total{status="completed"} 1\n' in text
+    assert 'app_jobs_total{status="failed"} 2\n' in text
+    assert 'app_queue_depth 3\n' in text
+    assert '\napp_unknown ' not in text
+    assert 'app_stage_seconds_bucket{stage="edges",le="0.1"} 1\n' in text
+    assert 'app_stage_seconds_bucket{stage="edges",le="1.0"} 2\n' in text
+    assert 'app_stage_seconds_bucket{stage="edges",le="+Inf"} 2\n' in text
+    assert 'app_stage_seconds_sum{stage="edges"} 0.55\n' in text
+    assert 'app_stage_seconds_count{stage="edges"} 2\n' in text
+
+
+def test_registry_returns_existing_metrics():
+    metrics = MetricsRegistry()
+    assert metrics.counter('hits', 'Hits') is metrics.counter('hits', 'Hits')
+    with pytest.raises(ValueError):
+        metrics.gauge('hits', 'Hits')
+    with pytest.raises(ValueError):
+        metrics.counter('hits', 'Hits').inc(status='x')
@@ -0,0 +1,74 @@
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import the plotter module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from arduino_interface import ArduinoInterface
+from fake_arduino import FakeArduino
+from plotter import PlotterManager
+
+
+def make_lines(count, prefix="G1"):
+    return [f"{prefix} X{i}.00 Y{i}.00" for i in range(count)]
+
+
+def wait_for(manager, condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    status = manager.status()
+    while not condition(status):
+        assert time.monotonic() < deadline, status
+        manager.wait(status['version'], 0.1)
+        status = manager.status()
+    return status
+
+
+def test_prints_run_in_order_from_generators():
+    with FakeArduino() as device:
+        manager = PlotterManager(lambda: ArduinoInterface(port=device.port, reset_delay=0))
+        started = []
+
+        def source(prefix, count):
+            def make():
+                started.append(prefix)
+                return (line for line in make_lines(count, prefix))
+            return make
+
+        first = manager.submit('a', 'a.png', source("G1", 300), 300)
+        wait_for(manager, lambda s: s['current'] is not None)
+        second = manager.submit('b', 'b.png', source("G0", 50), 50)
+        dropped = manager.submit('c', 'c.png', source("G2", 10), 10)
+        assert manager.position(second.id) == 1 and manager.abort(dropped.id)
+
+        status = wait_for(manager, lambda s: len(s['history']) == 3)
+        assert [(p['print_id'], p['status'], p['line']) for p in status['history']] == [
+            (second.id, 'completed', 50), (first.id, 'completed', 300), (dropped.id, 'aborted', 0)]
+        assert device.received == make_lines(300) + make_lines(50, "G0")
+        # every source is prepared once; the second while the first print is running
+        assert sorted(started) == ["G0", "G1"]
+
+
+def test_pause_resume_and_abort():
+    with FakeArduino(line_delay=0.002) as device:
+        manager = PlotterManager(lambda: ArduinoInterface(port=device.port, reset_delay=0))
+        job = manager.submit('a', 'a.png', lambda: iter(make_lines(5000)), 5000)
+        wait_for(manager, lambda s: s['current'] and s['current']['line'] > 20)
+
+        manager.pause()
+        time.sleep(0.2)
+        paused_at = len(device.received)
+        time.sleep(0.2)
+        # only lines already in the device buffer arrived after pausing
+        assert len(device.received) == paused_at
+        manager.resume()
+        status = wait_for(manager, lambda s: s['current']['line'] > paused_at + 20)
+        assert status['current']['lines_per_sec'] > 0 and status['current']['eta'] > 0
+
+        assert manager.abort()
+        status = wait_for(manager, lambda s: s['history'])
+        assert status['history'][0]['status'] == 'aborted'
+        # the pen is lifted after the lines that were already sent
+        assert device.received[-1] == 'G0 Z100.000'
+        assert status['history'][0]['line'] == len(device.received) - 1 < 5000
+        assert manager.status()['connected']
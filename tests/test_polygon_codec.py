@@ -0,0 +1,68 @@
+import re
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path to import the polygon codec module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from polygon_codec import POLYGON_HEADER_SIZE, POLYGON_MAGIC, decode_polygons, encode_polygons, polygons_svg
+from tests.test_render_cache import make_contours
+
+
+def test_roundtrip_keeps_every_vertex():
+    polygons = make_contours()
+    blob = encode_polygons(polygons, 200, 150)
+    assert blob[:4] == POLYGON_MAGIC
+
+    decoded, width, height = decode_polygons(blob)
+    assert (width, height) == (200, 150)
+    assert [p.tolist() for p in decoded] == [p.reshape(-1, 2).tolist() for p in polygons]
+    # two bytes per coordinate for image-sized polygons
+    vertices = sum(len(p) for p in polygons)
+    assert len(blob) == POLYGON_HEADER_SIZE + 4 * (len(polygons) + 1) + 4 * vertices
+
+
+def decode_like_the_frontend(blob):
+    """decodePolygons of hydrawlics-frontend/src/polygons.ts, with the header size it uses"""
+    source = (Path(__file__).parent.parent / 'hydrawlics-frontend' / 'src' / 'polygons.ts').read_text()
+    header_size = int(re.search(r'const HEADER_SIZE = (\d+);', source).group(1))
+    size, count, vertices = blob[6], *np.frombuffer(blob, dtype='<u4', count=2, offset=16)
+    offsets = np.frombuffer(blob, dtype='<u4', count=count + 1, offset=header_size)
+    start = header_size + offsets.nbytes
+    # the typed array views must end inside the buffer
+    assert start + vertices * 2 * size == len(blob)
+    deltas = np.frombuffer(blob, dtype='<i2' if size == 2 else '<i4', count=vertices * 2, offset=start)
+    points = np.cumsum(deltas.reshape(-1, 2), axis=0)
+    return [points[offsets[i]:offsets[i + 1]].tolist() for i in range(count)]
+
+
+def test_frontend_layout_matches_the_server():
+    polygons = make_contours()
+    assert decode_like_the_frontend(encode_polygons(polygons, 200, 150)) == [p.reshape(-1, 2).tolist() for p in polygons]
+    jumps = [np.array([[0, 0], [40000, 5], [40000, 70000]], dtype=np.int32)]
+    assert decode_like_the_frontend(encode_polygons(jumps)) == [jumps[0].tolist()]
+
+
+def test_large_jumps_fall_back_to_int32():
+    polygons = [np.array([[0, 0], [40000, 5], [40000, 70000]], dtype=np.int32)]
+    blob = encode_polygons(polygons)
+    decoded, _, _ = decode_polygons(blob)
+    assert decoded[0].tolist() == polygons[0].tolist()
+    assert blob[6] == 4
+
+
+def test_empty_input():
+    decoded, width, height = decode_polygons(encode_polygons([], 10, 20))
+    assert decoded == []
+    assert (width, height) == (10, 20)
+
+
+def test_svg_has_one_closed_subpath_per_polygon():
+    polygons = make_contours()
+    svg = polygons_svg(polygons, 200, 150)
+    assert svg.startswith('<svg') and 'viewBox="0 0 200 150"' in svg
+    assert svg.count('M') == len(polygons) and svg.count('Z') == len(polygons)
+    first = polygons[0].reshape(-1, 2)[0]
+    assert f'M{first[0]} {first[1]}' in svg
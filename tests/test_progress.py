@@ -0,0 +1,41 @@
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import the progress module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from contour_geometry import ContourGeometry
+from edge_backends import EDGE_BACKENDS, detect_edges
+from progress import ProgressTracker
+from tests.test_canny_edge import make_test_image
+from tests.test_render_cache import make_contours
+
+
+def test_tracker_weights_stages_and_records_timings():
+    reports = []
+    tracker = ProgressTracker({'a': 1, 'b': 3}, lambda **fields: reports.append(fields))
+    with tracker.stage('a') as progress:
+        progress(1.0, force=True)
+    with tracker.stage('b') as progress:
+        progress(0.5, force=True)
+        # rate limited
+        progress(0.6)
+
+    assert [r['progress'] for r in reports] == [0, 25, 25, 62]
+    assert [r['stage'] for r in reports] == ['a', 'a', 'b', 'b']
+    assert reports[0]['eta'] is None and reports[-1]['eta'] >= 0
+    assert list(reports[-1]['timings']) == ['a'] and list(tracker.timings) == ['a', 'b']
+
+
+def test_detectors_report_monotonic_progress():
+    img = make_test_image()
+    for name in EDGE_BACKENDS:
+        fractions = []
+        detect_edges(img, name, on_progress=fractions.append)
+        assert fractions and fractions[-1] == 1.0, name
+        assert fractions == sorted(fractions), name
+
+    for simplify in (None, {'tolerance': 0.5}, {'tolerance': 0.5, 'arcs': True}):
+        fractions = []
+        ContourGeometry.from_contours(make_contours(), simplify=simplify, on_progress=fractions.append)
+        assert fractions[-1] == 1.0 and fractions == sorted(fractions)
@@ -0,0 +1,55 @@
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Add parent directory to path to import the render cache module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from polygonOutline import draw_polygon_outlines
+from render_cache import RenderCache
+from tests.test_canny_edge import make_test_image
+
+
+def make_contours(count=60, seed=1):
+    """Random overlapping rectangles sorted ascending by area"""
+    rng = np.random.default_rng(seed)
+    contours = []
+    for _ in range(count):
+        x, y = rng.integers(0, 100), rng.integers(0, 70)
+        w, h = rng.integers(3, 28), rng.integers(3, 26)
+        contours.append(np.array([[[x, y]], [[x + w, y]], [[x + w, y + h]], [[x, y + h]]], dtype=np.int32))
+    return sorted(contours, key=cv2.contourArea)
+
+
+def decode(png):
+    return cv2.imdecode(np.frombuffer(png, np.uint8), cv2.IMREAD_COLOR)
+
+
+def test_incremental_render_matches_full_render():
+    img = make_test_image()
+    contours = make_contours()
+    cache = RenderCache(max_canvases=3)
+    loads = []
+
+    def load():
+        loads.append(1)
+        return img, contours
+
+    # scrub up and down so renders start from different cached canvases
+    for n in (10, 25, 24, 60, 5, 40, 25):
+        state = cache.job('job', load)
+        expected = draw_polygon_outlines(img, contours[-n:])
+        np.testing.assert_array_equal(decode(cache.render('job', state, n)), expected)
+
+    assert len(loads) == 1
+    assert cache.hits == 1 and cache.misses == 6
+
+
+def test_discard_and_missing_image():
+    cache = RenderCache()
+    state = cache.job('job', lambda: (make_test_image(), make_contours()))
+    cache.render('job', state, 3)
+    cache.discard('job')
+    assert cache.job('job', lambda: (None, [])) is None
@@ -0,0 +1,42 @@
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import the result cache module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from contour_geometry import ContourGeometry
+from result_cache import ResultCache, content_key
+from tests.test_render_cache import make_contours
+
+
+def test_key_covers_content_and_parameters():
+    params = {'detector': 'custom', 'simplify': {'mode': 'douglas-peucker', 'tolerance': 0.5}}
+    key = content_key(b'image', params)
+    assert key == content_key(b'image', dict(reversed(params.items())))
+    assert key != content_key(b'image2', params)
+    assert key != content_key(b'image', {**params, 'detector': 'opencv'})
+
+
+def test_hits_return_the_geometry_and_respect_the_budget():
+    geometry = ContourGeometry.from_contours(make_contours())
+    size = len(geometry.pack())
+    cache = ResultCache(max_bytes=2 * size)
+
+    assert cache.get('a') is None
+    cache.put('a', 'job-a', {'contour_count': len(geometry)}, geometry, 'processed/a.png')
+    result = cache.get('a')
+    assert result.job_id == 'job-a' and result.fields == {'contour_count': len(geometry)}
+    assert [p.tolist() for p in result.geometry().simplified] == [p.tolist() for p in geometry.simplified]
+    assert cache.hits == 1 and cache.misses == 1
+
+    cache.put('b', 'job-b', {}, geometry, 'processed/b.png')
+    cache.get('a')
+    # 'b' is the least recently used
+    cache.put('c', 'job-c', {}, geometry, 'processed/c.png')
+    assert len(cache) == 2 and cache.size == 2 * size
+    assert cache.get('b') is None and cache.get('a') is not None
+
+    # too large to keep
+    small = ResultCache(max_bytes=size - 1)
+    small.put('d', 'job-d', {}, geometry, 'processed/d.png')
+    assert len(small) == 0 and small.size == 0
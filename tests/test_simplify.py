@@ -0,0 +1,72 @@
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+# Add parent directory to path to import the simplify module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from contour_geometry import ContourGeometry
+from gCode import iter_gcode
+from simplify import ARC_PREVIEW_ERROR, SIMPLIFY_MODES, densify, merge_collinear, simplify_polyline
+
+
+def make_shapes():
+    img = np.zeros((400, 400), dtype=np.uint8)
+    cv2.circle(img, (250, 200), 120, 255, -1)
+    cv2.rectangle(img, (10, 10), (60, 300), 255, -1)
+    # one-pixel line, traced out and back by findContours
+    cv2.line(img, (20, 350), (380, 390), 255, 1)
+    contours, _ = cv2.findContours(img, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+    return contours
+
+
+def max_error(contour, polygon):
+    polygon = np.asarray(polygon, dtype=np.float32).reshape(-1, 1, 2)
+    return max(abs(cv2.pointPolygonTest(polygon, (float(x), float(y)), True)) for x, y in contour.reshape(-1, 2))
+
+
+def test_merge_collinear_keeps_corners():
+    square = np.array([[0, 0], [1, 0], [2, 0], [2, 0], [2, 1], [2, 2], [1, 2], [0, 2], [0, 1]])
+    assert square[merge_collinear(square)].tolist() == [[0, 0], [2, 0], [2, 2], [0, 2]]
+
+
+@pytest.mark.parametrize("mode", SIMPLIFY_MODES)
+def test_simplify_reduces_within_tolerance(mode):
+    for contour in make_shapes():
+        vertices, arcs = simplify_polyline(contour, 1.0, mode)
+        assert len(vertices) < len(contour) and not len(arcs)
+        assert vertices.dtype == contour.dtype
+        # the tip of the one-pixel line survives, so the error stays bounded
+        assert max_error(contour, vertices) <= (1.0 if mode == 'douglas-peucker' else 2.5)
+
+
+def test_arcs_replace_circle_segments():
+    circle = max(make_shapes(), key=cv2.contourArea)
+    lines, _ = simplify_polyline(circle, 1.0)
+    vertices, arcs = simplify_polyline(circle, 1.0, arcs=True)
+    assert len(arcs) and len(vertices) < len(lines) / 4
+    assert max_error(circle, densify(vertices, arcs)) <= 1.0 + ARC_PREVIEW_ERROR
+
+    # arc moves end on the next vertex, with the centre relative to the start
+    path = np.vstack([vertices, vertices[:1]])
+    gcode = "".join(iter_gcode([path], arcs=[arcs]))
+    moves = [line for line in gcode.splitlines() if line.startswith(("G2 ", "G3 "))]
+    assert len(moves) == len(arcs)
+    s, cx, cy, _ = arcs[0]
+    x0, y0 = path[int(s)]
+    x1, y1 = path[int(s) + 1]
+    assert f"X{x1:.4f} Y{y1:.4f} I{cx - x0:.4f} J{cy - y0:.4f}" in moves[0]
+
+
+def test_geometry_simplification_round_trip():
+    geometry = ContourGeometry.from_contours(make_shapes(), simplify={'tolerance': 1.0, 'arcs': True})
+    report = geometry.simplification()
+    assert report['vertices_before'] == sum(len(c) for c in make_shapes())
+    assert report['vertices_after'] < report['vertices_before'] and report['arcs'] > 0
+
+    restored = ContourGeometry.unpack(geometry.sorted('area').pack())
+    assert restored.simplification() == report
+    assert [len(p) for p in restored.outlines()] == [len(p) for p in geometry.sorted('area').outlines()]
@@ -0,0 +1,53 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path to import the travel optimizer module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from travel_optimizer import _GridIndex, optimize_travel
+
+
+def test_grid_index_matches_brute_force():
+    rng = np.random.default_rng(0)
+    points = rng.uniform(0, 1000, (2000, 2))
+    alive = np.ones(len(points), dtype=bool)
+    index = _GridIndex(points, np.arange(len(points)), alive)
+    for _ in range(1500):
+        q = rng.uniform(-200, 1200, 2)
+        found = index.nearest(q)
+        expected = np.min(np.hypot(*(points[alive] - q).T))
+        assert np.isclose(np.hypot(*(points[found] - q)), expected)
+        alive[found] = False
+        index.remove_owner(1)
+
+
+def test_open_paths_are_reordered_and_reversed():
+    paths = [[(100, 0), (90, 0)], [(0, 0), (10, 0)], [(50, 0), (20, 0)]]
+    result, ids, report = optimize_travel(paths, ids=['far', 'near', 'middle'])
+    assert ids == ['near', 'middle', 'far']
+    assert [p.tolist() for p in result] == [[[0, 0], [10, 0]], [[20, 0], [50, 0]], [[90, 0], [100, 0]]]
+    assert report['travel_after'] == 40 + 10 + 0
+    assert report['travel_before'] > report['travel_after']
+
+
+def test_closed_paths_start_at_nearest_vertex():
+    square = [(10, 10), (20, 10), (20, 20), (10, 20), (10, 10)]
+    far = [(200, 200), (210, 200), (210, 210), (200, 200)]
+    result, _, _ = optimize_travel([far, square], start=(25, 25))
+    # the square is entered at its corner closest to the start and stays closed
+    assert result[0].tolist() == [[20, 20], [10, 20], [10, 10], [20, 10], [20, 20]]
+    assert result[1][0].tolist() == result[1][-1].tolist()
+
+
+def test_random_polygons_keep_geometry():
+    rng = np.random.default_rng(3)
+    paths = [rng.uniform(0, 500, 2) + rng.uniform(0, 20, (rng.integers(2, 8), 2)) for _ in range(300)]
+    result, ids, report = optimize_travel(paths, ids=list(range(300)), closed=True)
+    assert sorted(ids) == list(range(300))
+    for path, i in zip(result, ids):
+        # rotated (and possibly reversed) loop over the same vertices, explicitly closed
+        assert np.array_equal(path[0], path[-1])
+        assert sorted(map(tuple, path[:-1].tolist())) == sorted(map(tuple, paths[i].tolist()))
+    assert report['travel_after'] <= report['travel_nearest_neighbor'] < report['travel_before']
@@ -0,0 +1,211 @@
+import math
+import time
+
+import numpy as np
+
+# Window of the 2-opt refinement: segments of up to this many paths are tried for reversal
+TWO_OPT_WINDOW = 64
+
+
+class _GridIndex:
+    """Uniform grid over candidate entry points, for nearest-neighbour queries.
+
+    Every candidate belongs to an owner (a path); once an owner is drawn all of its
+    candidates are skipped. The grid is rebuilt from the remaining candidates when
+    most of its points are dead, so searches stay local until the end.
+    """
+
+    def __init__(self, points, owners, alive):
+        self.points = points
+        self.owners = owners
+        self.alive = alive
+        self._build(np.arange(len(points)))
+
+    def _build(self, members):
+        self.size = len(members)
+        self.dead = 0
+        if not len(members):
+            self.cells = {}
+            return
+        pts = self.points[members]
+        span = np.ptp(pts, axis=0).max()
+        # about two candidates per cell
+        self.cell = max(span / math.sqrt(len(members) / 2), 1e-9)
+        keys = np.floor(pts / self.cell).astype(np.int64)
+        self.lo = keys.min(axis=0)
+        self.hi = keys.max(axis=0)
+        order = np.lexsort((keys[:, 1], keys[:, 0]))
+        keys, members = keys[order], members[order]
+        bounds = np.flatnonzero(np.any(np.diff(keys, axis=0) != 0, axis=1)) + 1
+        starts, ends = np.r_[0, bounds], np.r_[bounds, len(keys)]
+        self.cells = {(int(keys[s, 0]), int(keys[s, 1])): members[s:e] for s, e in zip(starts, ends)}
+
+    def remove_owner(self, count):
+        """Record that count candidates died, rebuilding the grid when over half are dead."""
+        self.dead += count
+        if self.dead * 2 > self.size:
+            self._build(np.flatnonzero(self.alive[self.owners]))
+
+    def _ring(self, cx, cy, r):
+        """Cells at Chebyshev distance r from (cx, cy), clipped to the occupied grid."""
+        (lx, ly), (hx, hy) = self.lo, self.hi
+        x0, x1 = max(cx - r, lx), min(cx + r, hx)
+        for y in {cy - r, cy + r}:
+            if ly <= y <= hy:
+                for x in range(x0, x1 + 1):
+                    yield x, y
+        y0, y1 = max(cy - r + 1, ly), min(cy + r - 1, hy)
+        for x in {cx - r, cx + r} if r else ():
+            if lx <= x <= hx:
+                for y in range(y0, y1 + 1):
+                    yield x, y
+
+    def nearest(self, q):
+        """Index of the nearest live candidate to q, or None when none are left."""
+        if not self.cells:
+            return None
+        cx, cy = (int(v) for v in np.floor(q / self.cell))
+        (lx, ly), (hx, hy) = self.lo, self.hi
+        # rings closer than r_min miss the grid, rings beyond r_max are outside it
+        r_min = max(0, lx - cx, cx - hx, ly - cy, cy - hy)
+        r_max = max(cx - lx, hx - cx, cy - ly, hy - cy)
+        best, best_d = None, math.inf
+        for r in range(r_min, r_max + 1):
+            # everything in ring r is at least (r - 1) cells away
+            if best is not None and best_d <= (r - 1) * self.cell:
+                break
+            for key in self._ring(cx, cy, r):
+                members = self.cells.get(key)
+                if members is None:
+                    continue
+                members = members[self.alive[self.owners[members]]]
+                if not len(members):
+                    continue
+                d = np.hypot(*(self.points[members] - q).T)
+                k = int(np.argmin(d))
+                if d[k] < best_d:
+                    best, best_d = int(members[k]), float(d[k])
+        return best
+
+
+def _is_closed(pts):
+    return len(pts) > 2 and np.array_equal(pts[0], pts[-1])
+
+
+def travel_distance(entries, exits, start=(0.0, 0.0)):
+    """Total pen-up travel: start -> entry of the first path, then exit[i] -> entry[i + 1]."""
+    if not len(entries):
+        return 0.0
+    previous = np.vstack([np.asarray(start, dtype=np.float64), exits[:-1]])
+    return float(np.hypot(*(entries - previous).T).sum())
+
+
+def _two_opt(entries, exits, order, start, window, time_limit):
+    """Windowed 2-opt over the path sequence; reversing a segment also reverses each path in it."""
+    n = len(order)
+    deadline = time.monotonic() + time_limit
+    start = np.asarray(start, dtype=np.float64)
+    flipped = np.zeros(n, dtype=bool)
+    improved = True
+    while improved and time.monotonic() < deadline:
+        improved = False
+        for i in range(n - 1):
+            prev_exit = exits[i - 1] if i else start
+            j = np.arange(i + 1, min(n, i + window + 1))
+            # current edges into i and out of j, versus the edges after reversing i..j
+            before = np.hypot(*(entries[i] - prev_exit)) + np.where(
+                j + 1 < n, np.hypot(*(entries[np.minimum(j + 1, n - 1)] - exits[j]).T), 0.0)
+            after = np.hypot(*(exits[j] - prev_exit).T) + np.where(
+                j + 1 < n, np.hypot(*(entries[np.minimum(j + 1, n - 1)] - entries[i]).T), 0.0)
+            gain = before - after
+            k = int(np.argmax(gain))
+            if gain[k] > 1e-9:
+                j = j[k]
+                seg = slice(i, j + 1)
+                entries[seg], exits[seg] = exits[seg][::-1].copy(), entries[seg][::-1].copy()
+                order[seg] = order[seg][::-1].copy()
+                flipped[seg] = ~flipped[seg][::-1]
+                improved = True
+            if time.monotonic() > deadline:
+                break
+    return flipped
+
+
+def optimize_travel(paths, ids=None, start=(0.0, 0.0), closed=None, two_opt=True,
+                    window=TWO_OPT_WINDOW, time_limit=10.0):
+    """Reorder paths to minimize pen-up travel before G-code emission.
+
+    Greedy nearest-neighbour ordering (on a grid index) followed by a windowed 2-opt
+    refinement. Closed paths (first point == last point, or every path when
+    closed=True) may start at any vertex and are rotated to the best entry vertex;
+    with closed=True unclosed paths are closed. Open paths may be drawn in reverse.
+
+    Returns (paths, ids, report) where report holds the travel distance before and
+    after optimization.
+    """
+    pts_list = [np.asarray(p, dtype=np.float64).reshape(-1, 2) for p in paths]
+    keep = [i for i, p in enumerate(pts_list) if len(p)]
+    pts_list = [pts_list[i] for i in keep]
+    ids = [ids[i] if ids and i < len(ids) else None for i in keep] if ids is not None else None
+    n = len(pts_list)
+
+    report = {'paths': n}
+    if not n:
+        report.update(travel_before=0.0, travel_after=0.0)
+        return [], ids, report
+
+    loops = [closed if closed is not None else _is_closed(p) for p in pts_list]
+    rings = [p[:-1] if is_loop and _is_closed(p) else p for p, is_loop in zip(pts_list, loops)]
+
+    report['travel_before'] = travel_distance(
+        np.array([p[0] for p in pts_list]), np.array([p[-1] for p in pts_list]), start)
+
+    # candidate entry points: every vertex of a loop, both ends of an open path
+    cand_points, cand_owners, cand_vertex = [], [], []
+    for i, (ring, is_loop) in enumerate(zip(rings, loops)):
+        vertices = np.arange(len(ring)) if is_loop else np.unique([0, len(ring) - 1])
+        cand_points.append(ring[vertices])
+        cand_owners.append(np.full(len(vertices), i))
+        cand_vertex.append(vertices)
+    cand_points = np.concatenate(cand_points)
+    cand_owners = np.concatenate(cand_owners)
+    cand_vertex = np.concatenate(cand_vertex)
+    owner_counts = np.bincount(cand_owners, minlength=n)
+
+    alive = np.ones(n, dtype=bool)
+    index = _GridIndex(cand_points, cand_owners, alive)
+    order, entry_vertex = [], []
+    current = np.asarray(start, dtype=np.float64)
+    for _ in range(n):
+        c = index.nearest(current)
+        owner, vertex = int(cand_owners[c]), int(cand_vertex[c])
+        alive[owner] = False
+        index.remove_owner(owner_counts[owner])
+        order.append(owner)
+        entry_vertex.append(vertex)
+        ring = rings[owner]
+        current = ring[vertex] if loops[owner] else ring[-1 if vertex == 0 else 0]
+
+    # orient every path so it starts at its entry vertex
+    oriented = []
+    for owner, vertex in zip(order, entry_vertex):
+        ring = rings[owner]
+        if loops[owner]:
+            ring = np.roll(ring, -vertex, axis=0)
+            oriented.append(np.vstack([ring, ring[:1]]))
+        else:
+            oriented.append(ring[::-1] if vertex else ring)
+
+    entries = np.array([p[0] for p in oriented])
+    exits = np.array([p[-1] for p in oriented])
+    report['travel_nearest_neighbor'] = travel_distance(entries, exits, start)
+
+    order_idx = np.arange(n)
+    if two_opt and n > 2:
+        flipped = _two_opt(entries, exits, order_idx, start, window, time_limit)
+        oriented = [oriented[k][::-1] if f else oriented[k] for k, f in zip(order_idx, flipped)]
+    report['travel_after'] = travel_distance(
+        np.array([p[0] for p in oriented]), np.array([p[-1] for p in oriented]), start)
+
+    new_ids = [ids[order[k]] for k in order_idx] if ids is not None else None
+    return oriented, new_ids, report